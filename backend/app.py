@@ -22,8 +22,15 @@ sys.path.append(current_dir)
 # 导入项目模块
 try:
     from config.config import config
-    from models.database import db, DetectionTask, DetectionResult, AlertRecord, SystemConfig, SystemLog, create_tables
+    from models.database import db, DetectionTask, DetectionResult, BehaviorSegment, TaskSummary, DetectionRollup, AlertRollup, AlertRecord, DetectionZone, SystemConfig, SystemLog, create_tables
     from services.detection_service import get_detection_service
+    from services.result_sink import ResultSink, DetectionRowWriter
+    from services.behavior_segments import BehaviorSegmentWriter, rebuild_frame_results, segment_task_ids
+    from services.track_artifact import TrackArtifactWriter, open_artifact, remove_artifact
+    from services.task_summary import TaskSummaryWriter, get_task_summary
+    from services.rollups import RollupWriter, record_alert, remove_task_from_rollups, hour_bucket, to_beijing_naive
+    from services.zones import validate_points
+    from services.action_profiles import list_action_profiles, resolve_action_profile
     from utils.logger import setup_logger
     from utils.file_utils import allowed_file, get_file_size, cleanup_old_files
     from utils.time_utils import get_beijing_datetime, get_beijing_now, datetime_to_iso_beijing, get_today_start_end_beijing
@@ -65,6 +72,11 @@ def create_app(config_name='development'):
     # 创建数据库表
     with app.app_context():
         create_tables()
+
+    def sync_zones(detection_service, source):
+        """把数据库中该视频源启用的检测区域同步到检测服务"""
+        zones = DetectionZone.query.filter_by(source=str(source), is_active=True).all()
+        detection_service.set_zones(source, [zone.to_dict() for zone in zones])
     
     # ========================= REST API 路由 =========================
     
@@ -134,18 +146,36 @@ def create_app(config_name='development'):
                     device = config.get('device', 'auto')
                     alert_behaviors = config.get('alert_behaviors', [])
 
+                    # 任务级检测选项（检测步长k、自适应步长等）
+                    detection_options = {}
+                    if 'detection_stride' in config:
+                        detection_options['detection_stride'] = max(1, int(config['detection_stride']))
+                    if 'adaptive_stride' in config:
+                        detection_options['adaptive_stride'] = bool(config['adaptive_stride'])
+                    if 'max_detection_stride' in config:
+                        detection_options['max_detection_stride'] = max(1, int(config['max_detection_stride']))
+                    if 'parallel_segments' in config:
+                        detection_options['parallel_segments'] = max(0, int(config['parallel_segments']))
+                    if config.get('action_profile'):
+                        resolve_action_profile(config['action_profile'])
+                        detection_options['action_profile'] = config['action_profile']
+
                 except json.JSONDecodeError as e:
                     logger.warning(f"配置JSON解析失败: {e}，使用默认配置")
                     confidence_threshold = 0.5
                     input_size = 640
                     device = 'auto'
                     alert_behaviors = []
+                    detection_options = {}
             else:
                 # 兼容旧的单独参数格式
                 confidence_threshold = float(request.form.get('confidence', 0.5))
                 input_size = int(request.form.get('input_size', 640))
                 device = request.form.get('device', 'auto')
                 alert_behaviors = []
+                detection_options = {}
+                if request.form.get('detection_stride'):
+                    detection_options['detection_stride'] = max(1, int(request.form.get('detection_stride')))
 
             # 创建检测任务
             task = DetectionTask(
@@ -155,7 +185,8 @@ def create_app(config_name='development'):
                 confidence_threshold=confidence_threshold,
                 input_size=input_size,
                 device=device,
-                alert_behaviors=json.dumps(alert_behaviors) if alert_behaviors else None
+                alert_behaviors=json.dumps(alert_behaviors) if alert_behaviors else None,
+                detection_options=json.dumps(detection_options) if detection_options else None
             )
             
             db.session.add(task)
@@ -232,6 +263,20 @@ def create_app(config_name='development'):
                             'alert_behaviors': alert_behaviors
                         })
                         
+                        # 任务级检测选项
+                        detection_options = {
+                            'pipeline_mode': app.config.get('PIPELINE_MODE', False),
+                            'pipeline_queue_size': app.config.get('PIPELINE_QUEUE_SIZE', 8),
+                            'yolo_batch_size': app.config.get('YOLO_BATCH_SIZE', 1),
+                            'parallel_segments': app.config.get('PARALLEL_SEGMENTS', 0),
+                            'action_profile': app.config.get('ACTION_PROFILE', 'balanced')
+                        }
+                        if current_task.detection_options:
+                            try:
+                                detection_options.update(json.loads(current_task.detection_options))
+                            except json.JSONDecodeError:
+                                logger.warning(f"任务{current_task.id}的检测选项解析失败")
+                        
                         def progress_callback(task_id, progress):
                             # 确保在应用上下文中更新数据库
                             with app.app_context():
@@ -246,55 +291,51 @@ def create_app(config_name='development'):
                                 'progress': progress
                             }, namespace='/detection')
                         
-                        # 执行检测
-                        result = detection_service.detect_video(
-                            current_task.source_path,
-                            output_path,
-                            progress_callback
+                        # 检测结果在检测过程中分批写入数据库：逐帧结果压缩为行为片段，异常行为写入报警记录，
+                        # 同时在输出视频旁写入列式跟踪结果供按帧/按目标切片查询；
+                        # STORE_DETECTION_ROWS 开启时仍同时写入逐帧结果行
+                        row_writer = DetectionRowWriter(
+                            current_task.id,
+                            store_detections=app.config.get('STORE_DETECTION_ROWS', False)
                         )
+                        segment_writer = BehaviorSegmentWriter(
+                            current_task.id,
+                            keyframe_interval=app.config.get('SEGMENT_KEYFRAME_INTERVAL', 5)
+                        )
+                        writers = [
+                            row_writer, segment_writer,
+                            TaskSummaryWriter(current_task.id),
+                            RollupWriter(current_task.created_at)
+                        ]
+                        if app.config.get('TRACK_ARTIFACT_ENABLED', True):
+                            writers.append(TrackArtifactWriter(output_path))
+                        result_sink = ResultSink(
+                            app, writers,
+                            batch_size=app.config.get('RESULT_BATCH_SIZE', 500)
+                        )
+                        
+                        # 执行检测
+                        try:
+                            result = detection_service.detect_video(
+                                current_task.source_path,
+                                output_path,
+                                progress_callback,
+                                options=detection_options,
+                                result_sink=result_sink
+                            )
+                        finally:
+                            result_sink.close()
                     
                         if result['success']:
-                            # 保存检测结果到数据库 (在应用上下文中)
+                            # 更新任务状态 (在应用上下文中)
                             with app.app_context():
                                 task_obj = DetectionTask.query.get(current_task.id)
                                 if task_obj:
-                                    for detection in result['results']:
-                                        detection_result = DetectionResult(
-                                            task_id=task_obj.id,
-                                            frame_number=detection['frame_number'],
-                                            timestamp=detection['timestamp'],
-                                            object_id=detection.get('object_id'),
-                                            object_type=detection['object_type'],
-                                            confidence=detection['confidence'],
-                                            bbox_x1=detection['bbox']['x1'],
-                                            bbox_y1=detection['bbox']['y1'],
-                                            bbox_x2=detection['bbox']['x2'],
-                                            bbox_y2=detection['bbox']['y2'],
-                                            behavior_type=detection.get('behavior_type'),
-                                            is_anomaly=detection.get('is_anomaly', False)
-                                        )
-                                        db.session.add(detection_result)
-                                        
-                                        # 如果是异常行为，创建报警记录
-                                        if detection.get('is_anomaly'):
-                                            alert = AlertRecord(
-                                                task_id=task_obj.id,
-                                                alert_type=detection['behavior_type'],
-                                                trigger_frame=detection['frame_number'],
-                                                trigger_timestamp=detection['timestamp'],
-                                                trigger_object_id=detection.get('object_id'),
-                                                trigger_behavior=detection['behavior_type'],
-                                                trigger_confidence=detection['confidence'],
-                                                description=f"检测到异常行为: {detection['behavior_type']}"
-                                            )
-                                            db.session.add(alert)
-                                    
-                                    # 更新任务状态
                                     task_obj.status = 'completed'
                                     task_obj.completed_at = get_beijing_datetime()
                                     task_obj.progress = 100.0
-                                    task_obj.detected_objects = len(result['results'])
-                                    task_obj.detected_behaviors = len([r for r in result['results'] if r.get('behavior_type')])
+                                    task_obj.detected_objects = row_writer.detected_objects
+                                    task_obj.detected_behaviors = row_writer.detected_behaviors
                                     db.session.commit()
                                     
                                     print(f"✓ 任务 {task_obj.id} 检测完成，结果已保存")
@@ -358,6 +399,13 @@ def create_app(config_name='development'):
             # 🔧 修复：获取报警行为配置
             alert_behaviors = data.get('alert_behaviors', ['fall down', 'fight', 'enter', 'exit'])
 
+            # 行为识别配置档（SlowFast输入尺寸和时间采样）
+            action_profile = data.get('action_profile') or app.config.get('ACTION_PROFILE')
+            try:
+                resolve_action_profile(action_profile)
+            except (TypeError, ValueError) as e:
+                return jsonify({'error': f'参数错误: {str(e)}'}), 400
+
             # 创建实时检测任务
             task = DetectionTask(
                 task_name=f"实时检测_{int(time.time())}",
@@ -397,6 +445,7 @@ def create_app(config_name='development'):
                         description=f"实时检测到异常行为: {data['alert_type']}"
                     )
                     db.session.add(alert)
+                    record_alert(data['alert_type'])
                     db.session.commit()
 
                 # 🔧 新增：处理统计数据推送
@@ -405,7 +454,10 @@ def create_app(config_name='development'):
                     # 统计数据是实时的，用于前端界面显示
                     pass
             
-            service_task_id = detection_service.start_realtime_detection(source, websocket_callback)
+            sync_zones(detection_service, source)
+            service_task_id = detection_service.start_realtime_detection(
+                source, websocket_callback, stream_id=f"task_{task.id}", action_profile=action_profile
+            )
             
             # 更新任务状态
             task.status = 'running'
@@ -434,11 +486,10 @@ def create_app(config_name='development'):
             if task.status not in ['running', 'pending']:
                 return jsonify({'error': f'任务状态错误: {task.status}'}), 400
             
-            # 如果是实时检测，停止检测服务
+            # 如果是实时检测，只停止该任务对应的实时流
             if task.source_type == 'camera':
                 detection_service = get_detection_service()
-                # 这里需要实现停止实时检测的逻辑
-                pass
+                detection_service.stop_stream(f"task_{task.id}")
             
             # 更新任务状态
             task.status = 'stopped'
@@ -474,11 +525,26 @@ def create_app(config_name='development'):
                 if not detection_service.initialize_models():
                     return Response("模型初始化失败", status=503)
 
-            logger.info("开始返回视频流响应")
-            return Response(
-                detection_service.generate_realtime_frames(source),
+            sync_zones(detection_service, source)
+
+            # 同一视频源共享一条流水线，本请求只是其中一个观看者
+            try:
+                subscriber = detection_service.subscribe_stream(
+                    source, viewer_id=request.args.get('stream_id'),
+                    action_profile=request.args.get('action_profile') or app.config.get('ACTION_PROFILE')
+                )
+            except ValueError as e:
+                return Response(str(e), status=400)
+            except RuntimeError as e:
+                return Response(str(e), status=503)
+
+            logger.info(f"开始返回视频流响应，观看者: {subscriber.viewer_id}，流ID: {subscriber.broadcaster.stream_id}")
+            response = Response(
+                subscriber.frames(),
                 mimetype='multipart/x-mixed-replace; boundary=frame'
             )
+            response.headers['X-Stream-Id'] = subscriber.viewer_id
+            return response
         except Exception as e:
             logger.error(f"实时视频流错误: {e}")
             return Response(f"服务器错误: {e}", status=500)
@@ -543,30 +609,48 @@ def create_app(config_name='development'):
                     """WebSocket回调函数"""
                     socketio.emit('realtime_result', data, namespace='/detection')
 
-            return Response(
-                detection_service.generate_realtime_frames(source, preview_only=preview_only, websocket_callback=websocket_callback),
+            if not preview_only:
+                sync_zones(detection_service, source)
+
+            # 同一视频源只运行一条流水线，每个请求作为观看者订阅；stream_id由前端生成以便单独断开
+            try:
+                subscriber = detection_service.subscribe_stream(
+                    source, preview_only=preview_only, websocket_callback=websocket_callback,
+                    viewer_id=request.args.get('stream_id'),
+                    action_profile=(config.get('action_profile') or request.args.get('action_profile')
+                                    or app.config.get('ACTION_PROFILE'))
+                )
+            except ValueError as e:
+                return Response(str(e), status=400)
+            except RuntimeError as e:
+                return Response(str(e), status=503)
+
+            response = Response(
+                subscriber.frames(),
                 mimetype='multipart/x-mixed-replace; boundary=frame'
             )
+            response.headers['X-Stream-Id'] = subscriber.viewer_id
+            return response
         except Exception as e:
             logger.error(f"video_feed错误: {e}")
             return Response(f"服务器错误: {e}", status=500)
 
     @app.route('/api/stop_monitoring', methods=['POST'])
     def stop_monitoring():
-        """停止实时监控 - 使用标准接口"""
+        """停止实时监控（传入stream_id时只停止该路流，否则停止所有流）"""
         try:
-            print("🛑 收到停止监控API请求")
+            data = request.get_json(silent=True) or {}
+            stream_id = data.get('stream_id') or request.args.get('stream_id')
+            print(f"🛑 收到停止监控API请求，流ID: {stream_id or '全部'}")
             detection_service = get_detection_service()
-            print(f"🛑 获取到检测服务实例: {detection_service is not None}")
 
-            # 调用标准的停止监控方法（按照分析文档的标准实现）
-            detection_service.stop_monitoring()
+            stopped = detection_service.stop_monitoring(stream_id)
 
-            print("🛑 停止监控API调用完成")
-            logger.info("实时监控已停止")
+            logger.info(f"实时监控已停止: {stream_id or '全部'}")
             return jsonify({
                 'success': True,
-                'message': '监控已停止'
+                'stream_id': stream_id,
+                'message': '监控已停止' if stopped else '流已结束'
             })
 
         except Exception as e:
@@ -574,6 +658,227 @@ def create_app(config_name='development'):
             logger.error(f"停止监控失败: {str(e)}")
             return jsonify({'error': f'停止失败: {str(e)}'}), 500
 
+    @app.route('/api/streams')
+    def get_streams():
+        """获取所有实时流会话的状态和统计"""
+        try:
+            detection_service = get_detection_service()
+            streams = detection_service.list_streams()
+            for stream in streams:
+                stream['statistics'] = detection_service.get_stream_statistics(stream['stream_id'])
+            return jsonify({
+                'success': True,
+                'total': len(streams),
+                'max_streams': detection_service.stream_sessions.max_sessions,
+                'streams': streams
+            })
+        except Exception as e:
+            logger.error(f"获取实时流状态失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+    @app.route('/api/inference/broker', methods=['GET', 'POST'])
+    def yolo_broker_settings():
+        """获取或调整实时流共享YOLO推理代理的最大批量和等待截止时间"""
+        try:
+            detection_service = get_detection_service()
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                new_config = {}
+                if 'max_batch_size' in data:
+                    new_config['yolo_broker_max_batch'] = int(data['max_batch_size'])
+                if 'max_wait_ms' in data:
+                    new_config['yolo_broker_max_wait_ms'] = float(data['max_wait_ms'])
+                if new_config:
+                    detection_service.update_config(new_config)
+            
+            return jsonify({
+                'success': True,
+                'broker': detection_service.get_yolo_broker_stats()
+            })
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数错误: {str(e)}'}), 400
+        except Exception as e:
+            logger.error(f"获取推理代理状态失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+    @app.route('/api/motion_gate', methods=['GET', 'POST'])
+    def motion_gate_settings():
+        """获取或调整运动门控参数（传入source时只调整该摄像头），并返回各路流的跳过帧统计"""
+        try:
+            detection_service = get_detection_service()
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                params = {key: value for key, value in data.items() if key != 'source'}
+                detection_service.set_motion_gate_config(params, data.get('source'))
+
+            streams = [
+                {
+                    'stream_id': stream['stream_id'],
+                    'source': stream['source'],
+                    'motion_gate': stream.get('motion_gate')
+                }
+                for stream in detection_service.list_streams()
+            ]
+            return jsonify({
+                'success': True,
+                'defaults': detection_service.get_motion_gate_config(),
+                'cameras': detection_service.motion_gate_cameras,
+                'streams': streams
+            })
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数错误: {str(e)}'}), 400
+        except Exception as e:
+            logger.error(f"获取运动门控状态失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+    @app.route('/api/zones', methods=['GET'])
+    def get_zones():
+        """获取检测区域列表（可按视频源过滤）"""
+        try:
+            query = DetectionZone.query
+            source = request.args.get('source')
+            if source is not None:
+                query = query.filter_by(source=str(source))
+            zones = query.order_by(DetectionZone.id).all()
+            return jsonify({
+                'success': True,
+                'zones': [zone.to_dict() for zone in zones]
+            })
+        except Exception as e:
+            logger.error(f"获取检测区域失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+    @app.route('/api/zones', methods=['POST'])
+    def create_zone():
+        """新建检测区域"""
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': '缺少请求数据'}), 400
+            if data.get('source') is None or not data.get('name'):
+                return jsonify({'error': '缺少视频源或区域名称'}), 400
+
+            try:
+                points = validate_points(data.get('points'))
+            except (TypeError, ValueError) as e:
+                return jsonify({'error': f'区域顶点错误: {str(e)}'}), 400
+
+            zone = DetectionZone(
+                source=str(data['source']),
+                name=data['name'],
+                points=json.dumps(points),
+                is_active=bool(data.get('is_active', True))
+            )
+            db.session.add(zone)
+            db.session.commit()
+
+            sync_zones(get_detection_service(), zone.source)
+            logger.info(f"新建检测区域 {zone.id}: {zone.name}，视频源: {zone.source}")
+            return jsonify({
+                'success': True,
+                'zone': zone.to_dict()
+            })
+        except Exception as e:
+            logger.error(f"新建检测区域失败: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': f'创建失败: {str(e)}'}), 500
+
+    @app.route('/api/zones/<int:zone_id>', methods=['PUT'])
+    def update_zone(zone_id):
+        """修改检测区域（名称、顶点、是否启用）"""
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': '缺少请求数据'}), 400
+
+            zone = DetectionZone.query.get(zone_id)
+            if not zone:
+                return jsonify({'error': '检测区域不存在'}), 404
+
+            if 'points' in data:
+                try:
+                    zone.points = json.dumps(validate_points(data['points']))
+                except (TypeError, ValueError) as e:
+                    return jsonify({'error': f'区域顶点错误: {str(e)}'}), 400
+            if data.get('name'):
+                zone.name = data['name']
+            if 'is_active' in data:
+                zone.is_active = bool(data['is_active'])
+            db.session.commit()
+
+            sync_zones(get_detection_service(), zone.source)
+            return jsonify({
+                'success': True,
+                'zone': zone.to_dict()
+            })
+        except Exception as e:
+            logger.error(f"修改检测区域失败: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': f'更新失败: {str(e)}'}), 500
+
+    @app.route('/api/zones/<int:zone_id>', methods=['DELETE'])
+    def delete_zone(zone_id):
+        """删除检测区域"""
+        try:
+            zone = DetectionZone.query.get(zone_id)
+            if not zone:
+                return jsonify({'error': '检测区域不存在'}), 404
+
+            source = zone.source
+            db.session.delete(zone)
+            db.session.commit()
+
+            sync_zones(get_detection_service(), source)
+            return jsonify({
+                'success': True,
+                'message': '检测区域已删除'
+            })
+        except Exception as e:
+            logger.error(f"删除检测区域失败: {str(e)}")
+            db.session.rollback()
+            return jsonify({'error': f'删除失败: {str(e)}'}), 500
+
+    @app.route('/api/action_profiles', methods=['GET'])
+    def get_action_profiles():
+        """获取可选的行为识别配置档和当前默认配置档"""
+        try:
+            detection_service = get_detection_service()
+            return jsonify({
+                'success': True,
+                'profiles': list_action_profiles(),
+                'default': app.config.get('ACTION_PROFILE') or detection_service.action_profile
+            })
+        except Exception as e:
+            logger.error(f"获取行为识别配置档失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
+    @app.route('/api/inference/actions', methods=['GET', 'POST'])
+    def action_service_settings():
+        """获取或调整共享行为识别服务的单批clip数、框数上限和等待时间"""
+        try:
+            detection_service = get_detection_service()
+            if request.method == 'POST':
+                data = request.get_json(silent=True) or {}
+                new_config = {}
+                if 'max_batch_clips' in data:
+                    new_config['action_max_batch_clips'] = int(data['max_batch_clips'])
+                if 'max_batch_boxes' in data:
+                    new_config['action_max_batch_boxes'] = int(data['max_batch_boxes'])
+                if 'max_wait_ms' in data:
+                    new_config['action_max_wait_ms'] = float(data['max_wait_ms'])
+                if new_config:
+                    detection_service.update_config(new_config)
+
+            return jsonify({
+                'success': True,
+                'actions': detection_service.get_action_service_stats()
+            })
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'参数错误: {str(e)}'}), 400
+        except Exception as e:
+            logger.error(f"获取行为识别服务状态失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+
     # ========================= 数据查询API =========================
 
     @app.route('/api/tasks', methods=['GET'])
@@ -675,38 +980,25 @@ def create_app(config_name='development'):
             if not task:
                 return jsonify({'error': '任务不存在'}), 404
             
-            # 获取检测结果
-            results = DetectionResult.query.filter_by(task_id=task_id).all()
-            
-            # 计算统计信息
-            total_detections = len(results)
-            detected_frames = len(set(result.frame_number for result in results))
-            alert_count = sum(1 for result in results if result.is_anomaly)
-            
-            # 行为分析
-            behavior_stats = {}
-            for result in results:
-                behavior = result.behavior_type or 'unknown'
-                if behavior not in behavior_stats:
-                    behavior_stats[behavior] = {
-                        'count': 0,
-                        'confidence_sum': 0,
-                        'frames': []
-                    }
-                behavior_stats[behavior]['count'] += 1
-                behavior_stats[behavior]['confidence_sum'] += result.confidence
-                behavior_stats[behavior]['frames'].append(result.frame_number)
-            
-            behaviors = []
-            for behavior, stats in behavior_stats.items():
-                avg_confidence = stats['confidence_sum'] / stats['count'] if stats['count'] > 0 else 0
-                duration = (max(stats['frames']) - min(stats['frames'])) / 25.0 if stats['frames'] else 0
-                behaviors.append({
-                    'behavior': behavior,
-                    'count': stats['count'],
-                    'confidence': f"{avg_confidence:.2f}",
-                    'duration': f"{duration:.1f}s"
-                })
+            # 统计信息直接读取预先计算的任务摘要
+            summary = get_task_summary(task)
+            summary_dict = summary.to_dict() if summary else {}
+            total_detections = summary_dict.get('total_detections', 0)
+            detected_frames = summary_dict.get('detected_frames', 0)
+            alert_count = summary_dict.get('alert_count', 0)
+            behaviors = summary_dict.get('behaviors', [])
+            
+            # 结果预览只读取最前面的少量片段/结果行
+            preview_segments = BehaviorSegment.query.filter_by(task_id=task_id).order_by(
+                BehaviorSegment.start_frame, BehaviorSegment.object_id
+            ).limit(50).all()
+            if preview_segments:
+                result_dicts = rebuild_frame_results(preview_segments, limit=50)
+            else:
+                preview_rows = DetectionResult.query.filter_by(task_id=task_id).order_by(
+                    DetectionResult.frame_number, DetectionResult.object_id
+                ).limit(50).all()
+                result_dicts = [result.to_dict() for result in preview_rows]
             
             # 构建视频URL
             video_url = None
@@ -726,13 +1018,134 @@ def create_app(config_name='development'):
                 'alertCount': alert_count,
                 'behaviors': behaviors,
                 'task': task.to_dict(),
-                'results': [result.to_dict() for result in results[:50]]  # 限制返回数量
+                'results': result_dicts  # 限制返回数量
             })
             
         except Exception as e:
             logger.error(f"获取任务结果失败: {str(e)}")
             return jsonify({'error': f'获取失败: {str(e)}'}), 500
     
+    @app.route('/api/tasks/<int:task_id>/segments')
+    def get_task_segments(task_id):
+        """获取任务的行为片段"""
+        try:
+            task = DetectionTask.query.get(task_id)
+            if not task:
+                return jsonify({'error': '任务不存在'}), 404
+            
+            query = BehaviorSegment.query.filter_by(task_id=task_id)
+            object_id = request.args.get('object_id', type=int)
+            if object_id is not None:
+                query = query.filter(BehaviorSegment.object_id == object_id)
+            behavior = request.args.get('behavior')
+            if behavior:
+                query = query.filter(BehaviorSegment.behavior_type == behavior)
+            
+            segments = query.order_by(BehaviorSegment.start_frame, BehaviorSegment.object_id).all()
+            
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'total': len(segments),
+                'segments': [segment.to_dict() for segment in segments]
+            })
+            
+        except Exception as e:
+            logger.error(f"获取行为片段失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+    
+    @app.route('/api/tasks/<int:task_id>/frames')
+    def get_task_frames(task_id):
+        """按帧范围获取逐帧检测结果（由行为片段按需重建）"""
+        try:
+            task = DetectionTask.query.get(task_id)
+            if not task:
+                return jsonify({'error': '任务不存在'}), 404
+            
+            start_frame = request.args.get('start_frame', 1, type=int)
+            end_frame = request.args.get('end_frame', start_frame + 249, type=int)
+            limit = min(request.args.get('limit', 5000, type=int), 50000)
+            if end_frame < start_frame:
+                return jsonify({'error': '帧范围错误'}), 400
+            
+            segments = BehaviorSegment.query.filter(
+                BehaviorSegment.task_id == task_id,
+                BehaviorSegment.start_frame <= end_frame,
+                BehaviorSegment.end_frame >= start_frame
+            ).all()
+            
+            if segments:
+                results = rebuild_frame_results(segments, start_frame, end_frame, limit)
+            else:
+                # 旧任务直接读取逐帧检测结果
+                rows = DetectionResult.query.filter(
+                    DetectionResult.task_id == task_id,
+                    DetectionResult.frame_number >= start_frame,
+                    DetectionResult.frame_number <= end_frame
+                ).order_by(DetectionResult.frame_number, DetectionResult.object_id).limit(limit).all()
+                results = [row.to_dict() for row in rows]
+            
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'start_frame': start_frame,
+                'end_frame': end_frame,
+                'total': len(results),
+                'results': results
+            })
+            
+        except Exception as e:
+            logger.error(f"获取逐帧结果失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+    
+    @app.route('/api/tasks/<int:task_id>/tracks')
+    def get_task_tracks(task_id):
+        """从列式跟踪结果按帧范围或跟踪ID切片读取（内存映射，不查询检测结果表）"""
+        try:
+            task = DetectionTask.query.get(task_id)
+            if not task:
+                return jsonify({'error': '任务不存在'}), 404
+            
+            artifact = open_artifact(task.output_path) if task.output_path else None
+            if artifact is None:
+                return jsonify({'error': '该任务没有列式跟踪结果'}), 404
+            
+            track_id = request.args.get('track_id', type=int)
+            start_frame = request.args.get('start_frame', type=int)
+            end_frame = request.args.get('end_frame', type=int)
+            limit = min(request.args.get('limit', 50000, type=int), 500000)
+            
+            if track_id is not None:
+                rows = artifact.track_rows(track_id, start_frame, end_frame)
+            else:
+                start_frame = start_frame if start_frame is not None else 1
+                end_frame = end_frame if end_frame is not None else start_frame + 249
+                if end_frame < start_frame:
+                    return jsonify({'error': '帧范围错误'}), 400
+                rows = artifact.frame_range(start_frame, end_frame)
+            
+            total = len(rows)
+            rows = rows[:limit]
+            if request.args.get('format', 'columns') == 'records':
+                data = artifact.to_records(rows)
+            else:
+                data = artifact.to_columns(rows)
+            
+            return jsonify({
+                'success': True,
+                'task_id': task_id,
+                'track_id': track_id,
+                'start_frame': start_frame,
+                'end_frame': end_frame,
+                'total': total,
+                'returned': len(rows),
+                'data': data
+            })
+            
+        except Exception as e:
+            logger.error(f"获取跟踪结果失败: {str(e)}")
+            return jsonify({'error': f'获取失败: {str(e)}'}), 500
+    
     @app.route('/api/tasks/<int:task_id>', methods=['DELETE'])
     def delete_task(task_id):
         """删除任务及相关数据"""
@@ -741,8 +1154,13 @@ def create_app(config_name='development'):
             if not task:
                 return jsonify({'error': '任务不存在'}), 404
             
+            # 从统计汇总表中扣除该任务的数据
+            remove_task_from_rollups(task_id)
+            
             # 删除相关的检测结果
             DetectionResult.query.filter_by(task_id=task_id).delete()
+            BehaviorSegment.query.filter_by(task_id=task_id).delete()
+            TaskSummary.query.filter_by(task_id=task_id).delete()
             
             # 删除相关的报警记录
             AlertRecord.query.filter_by(task_id=task_id).delete()
@@ -754,6 +1172,8 @@ def create_app(config_name='development'):
                     logger.info(f"删除输出文件: {task.output_path}")
                 except Exception as e:
                     logger.warning(f"删除输出文件失败: {e}")
+            if task.output_path:
+                remove_artifact(task.output_path)
             
             # 删除上传文件
             if task.source_path and os.path.exists(task.source_path):
@@ -922,8 +1342,14 @@ def create_app(config_name='development'):
                 AlertRecord.created_at >= today_start
             ).count()
             
-            # 总检测数（从检测结果表统计）
-            total_detections = DetectionResult.query.count()
+            # 总检测数（行为片段的帧数 + 没有行为片段的旧任务的逐帧检测结果）
+            segment_detections = db.session.query(
+                db.func.coalesce(db.func.sum(BehaviorSegment.frame_count), 0)
+            ).scalar()
+            row_detections = DetectionResult.query.filter(
+                DetectionResult.task_id.notin_(segment_task_ids())
+            ).count()
+            total_detections = row_detections + int(segment_detections or 0)
             
             return jsonify({
                 'success': True,
@@ -966,13 +1392,17 @@ def create_app(config_name='development'):
                 except ValueError:
                     pass
             
+            # 图表数据只读取小时汇总表
+            bucket_start = hour_bucket(to_beijing_naive(start_dt))
+            bucket_end = to_beijing_naive(end_dt)
+            
             # --- 行为分布数据 (全局统计) ---
             behavior_query = db.session.query(
-                DetectionResult.behavior_type,
-                db.func.count(DetectionResult.id).label('count')
+                DetectionRollup.behavior_type,
+                db.func.sum(DetectionRollup.count).label('count')
             ).filter(
-                DetectionResult.behavior_type.isnot(None)
-            ).group_by(DetectionResult.behavior_type).all()
+                DetectionRollup.behavior_type != ''
+            ).group_by(DetectionRollup.behavior_type).all()
             
             behavior_data = []
             behavior_names = {
@@ -983,41 +1413,43 @@ def create_app(config_name='development'):
             for behavior, count in behavior_query:
                 behavior_data.append({
                     'name': behavior_names.get(behavior, behavior),
-                    'value': count,
+                    'value': int(count or 0),
                     'behavior_type': behavior
                 })
             
-            # --- 时间趋势数据 (基于任务创建时间) ---
+            # 时间范围内每小时的检测数和异常数 (基于任务创建时间)
+            bucket_query = db.session.query(
+                DetectionRollup.hour_bucket,
+                DetectionRollup.is_anomaly,
+                db.func.sum(DetectionRollup.count).label('count')
+            ).filter(
+                DetectionRollup.hour_bucket >= bucket_start,
+                DetectionRollup.hour_bucket <= bucket_end
+            ).group_by(DetectionRollup.hour_bucket, DetectionRollup.is_anomaly).all()
+            
+            hour_stats = {}
+            day_counts = {}
+            for bucket, is_anomaly, count in bucket_query:
+                count = int(count or 0)
+                stats = hour_stats.setdefault(bucket.strftime('%H'), {'detections': 0, 'alerts': 0})
+                stats['detections'] += count
+                if is_anomaly:
+                    stats['alerts'] += count
+                date_str = bucket.strftime('%Y-%m-%d')
+                day_counts[date_str] = day_counts.get(date_str, 0) + count
+            
+            # --- 时间趋势数据 ---
+            trend_data = []
             if period == '24h':
                 # 24小时趋势，按小时分组
-                trend_query = db.session.query(
-                    db.func.strftime('%H', DetectionTask.created_at).label('hour'),
-                    db.func.count(DetectionResult.id).label('count')
-                ).join(DetectionTask, DetectionResult.task_id == DetectionTask.id).filter(
-                    DetectionTask.created_at >= start_dt,
-                    DetectionTask.created_at <= end_dt
-                ).group_by(db.func.strftime('%H', DetectionTask.created_at)).all()
-                
-                trend_data = []
-                hours_data = {item.hour: item.count for item in trend_query}
                 for hour in range(24):
                     hour_str = f"{hour:02d}"
                     trend_data.append({
                         'time': f"{hour_str}:00",
-                        'value': hours_data.get(hour_str, 0)
+                        'value': hour_stats.get(hour_str, {}).get('detections', 0)
                     })
             else:
                 # 多日趋势，按日分组
-                trend_query = db.session.query(
-                    db.func.strftime('%Y-%m-%d', DetectionTask.created_at).label('date'),
-                    db.func.count(DetectionResult.id).label('count')
-                ).join(DetectionTask, DetectionResult.task_id == DetectionTask.id).filter(
-                    DetectionTask.created_at >= start_dt,
-                    DetectionTask.created_at <= end_dt
-                ).group_by(db.func.strftime('%Y-%m-%d', DetectionTask.created_at)).all()
-                
-                trend_data = []
-                day_counts = {item.date: item.count for item in trend_query}
                 current_day = start_dt.date()
                 while current_day <= end_dt.date():
                     date_str = current_day.strftime('%Y-%m-%d')
@@ -1036,32 +1468,24 @@ def create_app(config_name='development'):
             high_risk_behaviors = ['fall down', 'fight', 'enter']
             medium_risk_behaviors = ['run', 'exit']
             
-            for alert in alert_levels:
-                query = AlertRecord.query.filter(
-                    AlertRecord.created_at >= start_dt,
-                    AlertRecord.created_at <= end_dt
-                )
-                if alert['level'] == 'high':
-                    alert['value'] = query.filter(AlertRecord.alert_type.in_(high_risk_behaviors)).count()
-                elif alert['level'] == 'medium':
-                    alert['value'] = query.filter(AlertRecord.alert_type.in_(medium_risk_behaviors)).count()
+            alert_query = db.session.query(
+                AlertRollup.alert_type,
+                db.func.sum(AlertRollup.count).label('count')
+            ).filter(
+                AlertRollup.hour_bucket >= bucket_start,
+                AlertRollup.hour_bucket <= bucket_end
+            ).group_by(AlertRollup.alert_type).all()
+            
+            for alert_type, count in alert_query:
+                if alert_type in high_risk_behaviors:
+                    alert_levels[0]['value'] += int(count or 0)
+                elif alert_type in medium_risk_behaviors:
+                    alert_levels[1]['value'] += int(count or 0)
                 else:
-                    alert['value'] = query.filter(~AlertRecord.alert_type.in_(high_risk_behaviors + medium_risk_behaviors)).count()
+                    alert_levels[2]['value'] += int(count or 0)
             
             # --- 24小时时段分析 (基于任务创建时间) ---
-            hourly_query = db.session.query(
-                db.func.strftime('%H', DetectionTask.created_at).label('hour'),
-                db.func.count(DetectionResult.id).label('detections'),
-                db.func.count(
-                    db.case((DetectionResult.is_anomaly == True, 1), else_=None)
-                ).label('alerts')
-            ).join(DetectionTask, DetectionResult.task_id == DetectionTask.id).filter(
-                DetectionTask.created_at >= start_dt,
-                DetectionTask.created_at <= end_dt
-            ).group_by(db.func.strftime('%H', DetectionTask.created_at)).all()
-            
             hourly_data = []
-            hour_stats = {item.hour: {'detections': item.detections, 'alerts': item.alerts} for item in hourly_query}
             for hour in range(24):
                 hour_str = f"{hour:02d}"
                 stats = hour_stats.get(hour_str, {'detections': 0, 'alerts': 0})
@@ -1164,10 +1588,23 @@ def create_app(config_name='development'):
             ).filter(
                 DetectionResult.timestamp >= start_dt,
                 DetectionResult.timestamp <= end_dt,
-                DetectionResult.behavior_type.isnot(None)
+                DetectionResult.behavior_type.isnot(None),
+                DetectionResult.task_id.notin_(segment_task_ids())
             ).group_by(DetectionResult.behavior_type).all()
+            segment_behavior_query = db.session.query(
+                BehaviorSegment.behavior_type,
+                db.func.sum(BehaviorSegment.frame_count).label('count')
+            ).join(DetectionTask, BehaviorSegment.task_id == DetectionTask.id).filter(
+                DetectionTask.created_at >= start_dt,
+                DetectionTask.created_at <= end_dt,
+                BehaviorSegment.behavior_type.isnot(None)
+            ).group_by(BehaviorSegment.behavior_type).all()
             
-            for behavior, count in behavior_query:
+            behavior_counts = {}
+            for behavior, count in list(behavior_query) + list(segment_behavior_query):
+                behavior_counts[behavior] = behavior_counts.get(behavior, 0) + int(count or 0)
+            
+            for behavior, count in behavior_counts.items():
                 csv_data.append(['行为统计', behavior, count, f"{start_dt.date()} - {end_dt.date()}"])
             
             # 生成CSV字符串
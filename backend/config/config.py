@@ -48,6 +48,32 @@ class Config:
     CONFIDENCE_THRESHOLD = 0.5
     IOU_THRESHOLD = 0.4
     INPUT_SIZE = 640
+
+    # 离线视频流水线配置（解码/检测/跟踪/行为识别/绘制/编码分线程执行）
+    PIPELINE_MODE = os.environ.get('PIPELINE_MODE', 'false').lower() == 'true'
+    PIPELINE_QUEUE_SIZE = 8
+
+    # 离线视频YOLO批量检测帧数（1表示逐帧检测）
+    YOLO_BATCH_SIZE = int(os.environ.get('YOLO_BATCH_SIZE', 1))
+
+    # 长视频分段并行处理的分段数（<=1 表示不分段，每个分段一个工作进程）
+    PARALLEL_SEGMENTS = int(os.environ.get('PARALLEL_SEGMENTS', 0))
+
+    # 默认的行为识别配置档（SlowFast输入尺寸和时间采样：accurate / balanced / fast）
+    ACTION_PROFILE = os.environ.get('ACTION_PROFILE', 'balanced')
+
+    # 检测结果批量写库的行数
+    RESULT_BATCH_SIZE = 500
+
+    # 检测结果压缩为行为片段存储，片段内每隔多少帧保留一个边界框
+    SEGMENT_KEYFRAME_INTERVAL = 5
+
+    # 是否同时写入逐帧检测结果行（detection_results）；读取方均已改为读取行为片段，
+    # 仅供仍直接查询该表的旧部署按需开启
+    STORE_DETECTION_ROWS = os.environ.get('STORE_DETECTION_ROWS', 'false').lower() == 'true'
+
+    # 在输出视频旁写入列式跟踪结果（<视频名>.tracks 目录）
+    TRACK_ARTIFACT_ENABLED = True
     
     # 设备配置 - 自动检测GPU
     @staticmethod
@@ -4,7 +4,7 @@
 import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 # 导入时间工具
@@ -37,6 +37,7 @@ class DetectionTask(db.Model):
     input_size = Column(Integer, default=640)
     device = Column(String(20), default='cpu')
     alert_behaviors = Column(Text, nullable=True)  # JSON格式存储报警行为列表
+    detection_options = Column(Text, nullable=True)  # JSON格式存储任务级检测选项（检测步长等）
     
     # 统计信息
     total_frames = Column(Integer, default=0)
@@ -65,6 +66,7 @@ class DetectionTask(db.Model):
             'input_size': self.input_size,
             'device': self.device,
             'alert_behaviors': json.loads(self.alert_behaviors) if self.alert_behaviors else [],
+            'detection_options': json.loads(self.detection_options) if self.detection_options else {},
             'total_frames': self.total_frames,
             'processed_frames': self.processed_frames,
             'detected_objects': self.detected_objects,
@@ -129,6 +131,163 @@ class DetectionResult(db.Model):
         }
 
 
+class BehaviorSegment(db.Model):
+    """行为片段表（同一跟踪目标连续保持同一行为的帧区间）"""
+    __tablename__ = 'behavior_segments'
+    
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey('detection_tasks.id'), nullable=False, index=True)
+    object_id = Column(Integer, nullable=True)  # 跟踪ID
+    object_type = Column(String(50), nullable=False)  # 目标类型（person等）
+    behavior_type = Column(String(100), nullable=True)  # 行为类型
+    is_anomaly = Column(Boolean, default=False)  # 是否为异常行为
+    
+    # 片段区间
+    start_frame = Column(Integer, nullable=False)
+    end_frame = Column(Integer, nullable=False)
+    start_timestamp = Column(Float, nullable=False)  # 视频时间戳（秒）
+    end_timestamp = Column(Float, nullable=False)
+    frame_count = Column(Integer, nullable=False)  # 片段内出现的帧数
+    mean_confidence = Column(Float, nullable=False)  # 平均检测置信度
+    
+    # 稀疏关键帧边界框，JSON格式 [[frame, x1, y1, x2, y2], ...]
+    keyframes = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=get_beijing_datetime)
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'task_id': self.task_id,
+            'object_id': self.object_id,
+            'object_type': self.object_type,
+            'behavior_type': self.behavior_type,
+            'is_anomaly': self.is_anomaly,
+            'start_frame': self.start_frame,
+            'end_frame': self.end_frame,
+            'start_timestamp': self.start_timestamp,
+            'end_timestamp': self.end_timestamp,
+            'frame_count': self.frame_count,
+            'mean_confidence': self.mean_confidence,
+            'created_at': datetime_to_iso_beijing(self.created_at)
+        }
+
+
+class TaskSummary(db.Model):
+    """任务统计摘要表（检测过程中增量更新，查询结果时直接读取）"""
+    __tablename__ = 'task_summaries'
+    
+    task_id = Column(Integer, ForeignKey('detection_tasks.id'), primary_key=True)
+    total_detections = Column(Integer, default=0)  # 检测结果总数
+    detected_frames = Column(Integer, default=0)  # 有检测结果的帧数
+    alert_count = Column(Integer, default=0)  # 异常行为检测次数
+    last_frame = Column(Integer, default=0)  # 已统计到的最后一帧
+    
+    # 按行为统计，JSON格式 {behavior: {count, confidence_sum, first_frame, last_frame}}
+    behavior_stats = Column(Text, nullable=True)
+    is_final = Column(Boolean, default=False)  # 检测是否已结束
+    updated_at = Column(DateTime, default=get_beijing_datetime, onupdate=get_beijing_datetime)
+    
+    def get_behaviors(self):
+        """按行为汇总列表（与任务结果接口的 behaviors 字段格式一致）"""
+        stats = json.loads(self.behavior_stats) if self.behavior_stats else {}
+        behaviors = []
+        for behavior, item in stats.items():
+            avg_confidence = item['confidence_sum'] / item['count'] if item['count'] > 0 else 0
+            duration = (item['last_frame'] - item['first_frame']) / 25.0
+            behaviors.append({
+                'behavior': behavior,
+                'count': item['count'],
+                'confidence': f"{avg_confidence:.2f}",
+                'duration': f"{duration:.1f}s"
+            })
+        return behaviors
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'task_id': self.task_id,
+            'total_detections': self.total_detections or 0,
+            'detected_frames': self.detected_frames or 0,
+            'alert_count': self.alert_count or 0,
+            'last_frame': self.last_frame or 0,
+            'behaviors': self.get_behaviors(),
+            'is_final': self.is_final,
+            'updated_at': datetime_to_iso_beijing(self.updated_at)
+        }
+
+
+class DetectionRollup(db.Model):
+    """检测结果小时汇总表（按任务创建时间所在小时、行为类型和是否异常累计检测次数）"""
+    __tablename__ = 'detection_rollups'
+    __table_args__ = (UniqueConstraint('hour_bucket', 'behavior_type', 'is_anomaly'),)
+    
+    id = Column(Integer, primary_key=True)
+    hour_bucket = Column(DateTime, nullable=False, index=True)  # 整点时间
+    behavior_type = Column(String(100), nullable=False, default='')  # 行为类型，无行为为空字符串
+    is_anomaly = Column(Boolean, nullable=False, default=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'hour_bucket': datetime_to_iso_beijing(self.hour_bucket),
+            'behavior_type': self.behavior_type or None,
+            'is_anomaly': self.is_anomaly,
+            'count': self.count
+        }
+
+
+class AlertRollup(db.Model):
+    """报警记录小时汇总表（按报警创建时间所在小时和报警类型累计报警数）"""
+    __tablename__ = 'alert_rollups'
+    __table_args__ = (UniqueConstraint('hour_bucket', 'alert_type'),)
+    
+    id = Column(Integer, primary_key=True)
+    hour_bucket = Column(DateTime, nullable=False, index=True)  # 整点时间
+    alert_type = Column(String(100), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'hour_bucket': datetime_to_iso_beijing(self.hour_bucket),
+            'alert_type': self.alert_type,
+            'count': self.count
+        }
+
+
+class DetectionZone(db.Model):
+    """检测区域表（按视频源配置的多边形区域，区域外的目标不参与检测和行为识别）"""
+    __tablename__ = 'detection_zones'
+    
+    id = Column(Integer, primary_key=True)
+    source = Column(String(500), nullable=False, index=True)  # 摄像头ID或视频源
+    name = Column(String(100), nullable=False)
+    
+    # 多边形顶点，JSON格式 [[x, y], ...]，坐标为相对画面宽高的比例(0-1)
+    points = Column(Text, nullable=False)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=get_beijing_datetime)
+    updated_at = Column(DateTime, default=get_beijing_datetime, onupdate=get_beijing_datetime)
+    
+    def get_points(self):
+        """多边形顶点列表"""
+        return json.loads(self.points) if self.points else []
+    
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'source': self.source,
+            'name': self.name,
+            'points': self.get_points(),
+            'is_active': self.is_active,
+            'created_at': datetime_to_iso_beijing(self.created_at),
+            'updated_at': datetime_to_iso_beijing(self.updated_at)
+        }
+
+
 class AlertRecord(db.Model):
     """报警记录表"""
     __tablename__ = 'alert_records'
@@ -315,8 +474,29 @@ def init_default_configs():
         print(f"Error initializing default configs: {e}")
 
 
+def migrate_columns():
+    """为已存在的数据表补充模型中新增的列（create_all不会修改已有表结构）"""
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            print(f"✓ 数据表 {table.name} 新增列: {column.name}")
+
+    db.session.commit()
+
+
 def create_tables():
     """创建所有数据表"""
     db.create_all()
+    migrate_columns()
     init_default_configs()
     print("数据库表创建完成") 
\ No newline at end of file
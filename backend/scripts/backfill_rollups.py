@@ -0,0 +1,28 @@
+"""
+统计汇总表回填
+根据数据库中已有的检测结果、行为片段和报警记录重建小时汇总表，
+升级后首次启动或汇总数据不一致时执行一次
+
+用法:
+    python scripts/backfill_rollups.py
+"""
+import os
+import sys
+
+# 添加后端模块路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+sys.path.append(backend_dir)
+
+
+def main():
+    from app import create_app
+    from services.rollups import backfill_rollups
+
+    app = create_app('development')
+    with app.app_context():
+        backfill_rollups()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+行为识别配置档基准测试
+先用YOLO + DeepSort跑一遍参考视频并缓存每帧的跟踪结果，再对每个配置档按其clip长度切分clip，
+统计SlowFast预处理+推理的单clip延迟，以及逐帧行为标签与参考配置档（默认accurate）的一致率
+
+用法:
+    python scripts/benchmark_action_profiles.py --profiles accurate balanced fast --device cpu
+"""
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+# 添加算法模块路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+project_root = os.path.dirname(backend_dir)
+yolo_slowfast_path = os.path.join(project_root, 'yolo_slowfast-master')
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, yolo_slowfast_path)
+
+from services.action_profiles import ACTION_PROFILES, resolve_action_profile
+
+
+def load_frames(video_path: str, max_frames: int):
+    """预先解码视频帧，避免解码耗时影响测量"""
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, img = cap.read()
+        if not ret:
+            break
+        frames.append(img)
+    cap.release()
+    return frames
+
+
+def track_frames(frames, yolo_model, tracker, imsize: int, device: str, conf: float):
+    """
+    逐帧检测和跟踪，所有配置档共用同一份跟踪结果
+
+    Returns:
+        List[ndarray]: 每帧的跟踪结果 [x1, y1, x2, y2, cls, track_id, Vx, Vy]
+    """
+    from yolo_slowfast import deepsort_update
+
+    all_tracks = []
+    for img in frames:
+        result = yolo_model.predict(source=img, imgsz=imsize, device=device, conf=conf, verbose=False)[0]
+        boxes = result.boxes
+        if len(boxes) == 0:
+            tracker.skip_frame()
+            all_tracks.append(np.ones((0, 8)).astype(np.float32))
+            continue
+        pred = np.hstack((boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy().reshape(-1, 1),
+                          boxes.cls.cpu().numpy().reshape(-1, 1)))
+        xywh = np.hstack(((pred[:, 0:2] + pred[:, 2:4]) / 2, pred[:, 2:4] - pred[:, 0:2]))
+        temp = deepsort_update(tracker, pred, xywh, img)
+        all_tracks.append(temp if len(temp) else np.ones((0, 8)).astype(np.float32))
+    return all_tracks
+
+
+def run_profile(frames, all_tracks, video_model, profile, device: str):
+    """
+    按配置档切分clip并执行行为识别
+
+    Returns:
+        Tuple: (每个clip的耗时列表（秒）, 每帧的 {track_id: 类别下标} 标签)
+    """
+    import torch
+    from yolo_slowfast import ClipRingBuffer, ava_inference_transform
+
+    stack = ClipRingBuffer(profile['clip_len'], banks=2)
+    latencies = []
+    labels = {}
+    frame_labels = []
+    for img, tracks in zip(frames, all_tracks):
+        stack.append(img)
+        if len(stack) == stack.clip_len:
+            clip = stack.pop_clip()
+            persons = tracks[tracks[:, 4].astype(np.int32) == 0]
+            if persons.shape[0]:
+                start = time.perf_counter()
+                inputs, inp_boxes, _ = ava_inference_transform(
+                    clip, persons[:, 0:4].astype(np.float32),
+                    num_frames=profile['num_frames'],
+                    crop_size=profile['crop_size'],
+                    slow_fast_alpha=profile['alpha']
+                )
+                inputs = [inp.unsqueeze(0).to(device) for inp in inputs] if isinstance(inputs, list) \
+                    else inputs.unsqueeze(0).to(device)
+                inp_boxes = torch.cat([torch.zeros(inp_boxes.shape[0], 1), inp_boxes], dim=1).to(device)
+                with torch.no_grad():
+                    slowfaster_preds = video_model(inputs, inp_boxes)
+                pred_labels = (torch.argmax(slowfaster_preds, dim=1) + 1).tolist()
+                if device.startswith('cuda'):
+                    torch.cuda.synchronize()
+                latencies.append(time.perf_counter() - start)
+                for track_id, label in zip(persons[:, 5].astype(np.int32).tolist(), pred_labels):
+                    labels[track_id] = label
+
+        # 标签在下一个clip之前保持不变，只记录当前帧仍在跟踪的目标
+        visible = set(tracks[:, 5].astype(np.int32).tolist()) if tracks.shape[0] else set()
+        frame_labels.append({track_id: label for track_id, label in labels.items() if track_id in visible})
+    return latencies, frame_labels
+
+
+def agreement(frame_labels, reference_labels) -> float:
+    """两组逐帧标签在双方都有标签的 (帧, 目标) 上的一致率"""
+    matched = total = 0
+    for labels, reference in zip(frame_labels, reference_labels):
+        for track_id, label in labels.items():
+            if track_id in reference:
+                total += 1
+                matched += int(reference[track_id] == label)
+    return matched / total if total else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行为识别配置档延迟和标签一致率基准测试')
+    parser.add_argument('--input', type=str, default=os.path.join(project_root, 'fall_1.mp4'),
+                        help='参考视频路径')
+    parser.add_argument('--weights', type=str, default=os.path.join(yolo_slowfast_path, 'yolov8n.pt'),
+                        help='YOLO权重路径')
+    parser.add_argument('--slowfast-weights', type=str,
+                        default=os.path.join(yolo_slowfast_path, 'SLOWFAST_8x8_R50_DETECTION.pyth'),
+                        help='SlowFast权重路径（不存在时使用预训练模型）')
+    parser.add_argument('--deepsort-weights', type=str,
+                        default=os.path.join(yolo_slowfast_path, 'deep_sort/deep_sort/deep/checkpoint/ckpt.t7'),
+                        help='DeepSort权重路径')
+    parser.add_argument('--profiles', type=str, nargs='+', default=list(ACTION_PROFILES),
+                        help='要测试的配置档')
+    parser.add_argument('--reference', type=str, default='accurate', help='标签一致率的参考配置档')
+    parser.add_argument('--frames', type=int, default=500, help='参与测试的帧数')
+    parser.add_argument('--imsize', type=int, default=640, help='YOLO推理尺寸')
+    parser.add_argument('--conf', type=float, default=0.5, help='YOLO置信度阈值')
+    parser.add_argument('--device', type=str, default='cpu', help='推理设备')
+    config = parser.parse_args()
+
+    profiles = [resolve_action_profile(name) for name in config.profiles]
+    if config.reference not in [profile['name'] for profile in profiles]:
+        profiles.insert(0, resolve_action_profile(config.reference))
+
+    frames = load_frames(config.input, config.frames)
+    if not frames:
+        print(f"❌ 无法读取视频: {config.input}")
+        return 1
+    print(f"✓ 已解码 {len(frames)} 帧 ({frames[0].shape[1]}x{frames[0].shape[0]})，设备: {config.device}")
+
+    # yolo_slowfast 按算法目录下的相对路径加载资源
+    os.chdir(yolo_slowfast_path)
+    import torch
+    from ultralytics import YOLO
+    from pytorchvideo.models.hub import slowfast_r50_detection
+    from deep_sort.deep_sort import DeepSort
+
+    yolo_model = YOLO(config.weights)
+    if os.path.exists(config.slowfast_weights):
+        video_model = slowfast_r50_detection(False)
+        checkpoint = torch.load(config.slowfast_weights, map_location=config.device)
+        video_model.load_state_dict(checkpoint['model_state'])
+    else:
+        print(f"⚠ SlowFast权重文件不存在，使用预训练模型: {config.slowfast_weights}")
+        video_model = slowfast_r50_detection(True)
+    video_model = video_model.eval().to(config.device)
+
+    all_tracks = track_frames(frames, yolo_model, DeepSort(config.deepsort_weights),
+                              config.imsize, config.device, config.conf)
+    print(f"✓ 跟踪完成，含人员目标的帧数: {sum(1 for tracks in all_tracks if tracks.shape[0])}")
+
+    # 预热，排除首次推理的初始化开销
+    run_profile(frames[:profiles[0]['clip_len']], all_tracks[:profiles[0]['clip_len']],
+                video_model, profiles[0], config.device)
+
+    results = {}
+    for profile in profiles:
+        results[profile['name']] = run_profile(frames, all_tracks, video_model, profile, config.device)
+    reference_labels = results[config.reference][1]
+
+    print(f"{'profile':>10} | {'crop':>5} | {'clip':>4} | {'clips':>5} | {'avg ms':>8} | {'p95 ms':>8} | "
+          f"{'ms/frame':>8} | {'一致率':>6}")
+    print('-' * 82)
+    for profile in profiles:
+        latencies, frame_labels = results[profile['name']]
+        avg_ms = np.mean(latencies) * 1000 if latencies else 0.0
+        p95_ms = np.percentile(latencies, 95) * 1000 if latencies else 0.0
+        per_frame_ms = sum(latencies) * 1000 / len(frames)
+        print(f"{profile['name']:>10} | {profile['crop_size']:>5} | {profile['clip_len']:>4} | {len(latencies):>5} | "
+              f"{avg_ms:>8.1f} | {p95_ms:>8.1f} | {per_frame_ms:>8.2f} | "
+              f"{agreement(frame_labels, reference_labels):>6.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+DeepSort关联步骤基准测试
+构造N个跟踪目标和N个检测，比较矩阵化的IoU代价、马氏距离门控与逐行参考实现的耗时，
+并校验两者得到的匹配结果一致，观察目标数增长到200×200时耗时的变化
+
+用法:
+    python scripts/benchmark_association.py --sizes 10 25 50 100 200
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+# 添加算法模块路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+yolo_slowfast_path = os.path.join(project_root, 'yolo_slowfast-master')
+sys.path.insert(0, yolo_slowfast_path)
+
+from deep_sort.deep_sort.sort import iou_matching, kalman_filter, linear_assignment
+from deep_sort.deep_sort.sort.detection import Detection
+from deep_sort.deep_sort.sort.track import Track, TrackState
+
+
+def build_scene(size: int, seed: int = 0):
+    """
+    构造一帧场景：size个已确认的跟踪目标，以及每个目标附近的一个检测（约10%漏检，另有同等数量的误检）
+
+    Returns:
+        Tuple: (卡尔曼滤波器, 跟踪目标列表, 检测列表)
+    """
+    rng = np.random.RandomState(seed)
+    kf = kalman_filter.KalmanFilter()
+    states = kalman_filter.TrackStates()
+
+    # 画面随目标数放大，保持大致相同的拥挤程度
+    extent = 200 * np.sqrt(size)
+    tracks, detections = [], []
+    for track_id in range(size):
+        tlwh = np.r_[rng.uniform(0, extent, 2), rng.uniform(30, 60), rng.uniform(80, 160)]
+        detection = Detection(tlwh, 0.9, 0, np.zeros(1))
+        mean, covariance = kf.initiate(detection.to_xyah())
+        track = Track(mean, covariance, track_id + 1, 2, 70, states=states)
+        track.state = TrackState.Confirmed
+        track.mean, track.covariance = kf.predict(track.mean, track.covariance)
+        track.time_since_update = 1
+        tracks.append(track)
+
+        if rng.rand() < 0.9:
+            detections.append(Detection(tlwh + np.r_[rng.normal(0, 4, 2), 0, 0], 0.9, 0, np.zeros(1)))
+        if rng.rand() < 0.1:
+            detections.append(Detection(np.r_[rng.uniform(0, extent, 2), 40, 120], 0.5, 0, np.zeros(1)))
+    return kf, tracks, detections
+
+
+def iou_cost_rowwise(tracks, detections, track_indices, detection_indices):
+    """逐行计算IoU代价的参考实现"""
+    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
+    for row, track_idx in enumerate(track_indices):
+        if tracks[track_idx].time_since_update > 1:
+            cost_matrix[row, :] = linear_assignment.INFTY_COST
+            continue
+        candidates = np.asarray([detections[i].tlwh for i in detection_indices])
+        cost_matrix[row, :] = 1. - iou_matching.iou(tracks[track_idx].to_tlwh(), candidates)
+    return cost_matrix
+
+
+def gate_rowwise(kf, cost_matrix, tracks, detections, track_indices, detection_indices):
+    """逐个目标计算马氏距离门控的参考实现"""
+    gating_threshold = kalman_filter.chi2inv95[4]
+    measurements = np.asarray([detections[i].to_xyah() for i in detection_indices])
+    for row, track_idx in enumerate(track_indices):
+        track = tracks[track_idx]
+        gating_distance = kf.gating_distance(track.mean, track.covariance, measurements)
+        cost_matrix[row, gating_distance > gating_threshold] = linear_assignment.INFTY_COST
+    return cost_matrix
+
+
+def timed(func, rounds: int) -> float:
+    """
+    重复执行并返回单次平均耗时
+
+    Returns:
+        float: 毫秒
+    """
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DeepSort关联步骤耗时基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 25, 50, 100, 200],
+                        help='跟踪目标数（检测数与之相近）')
+    parser.add_argument('--rounds', type=int, default=20, help='每个规模重复测试的轮数')
+    config = parser.parse_args()
+
+    print(f"{'N×M':>9} | {'IoU ms':>8} | {'逐行IoU':>8} | {'门控 ms':>8} | {'逐行门控':>8} | "
+          f"{'匹配 ms':>8} | {'结果一致':>6}")
+    print('-' * 78)
+    for size in config.sizes:
+        kf, tracks, detections = build_scene(size)
+        track_indices = list(range(len(tracks)))
+        detection_indices = list(range(len(detections)))
+        base_cost = np.random.RandomState(1).uniform(0, 0.3, (len(tracks), len(detections)))
+
+        iou_ms = timed(lambda: iou_matching.iou_cost(
+            tracks, detections, track_indices, detection_indices), config.rounds)
+        iou_rowwise_ms = timed(lambda: iou_cost_rowwise(
+            tracks, detections, track_indices, detection_indices), config.rounds)
+        gate_ms = timed(lambda: linear_assignment.gate_cost_matrix(
+            kf, base_cost.copy(), tracks, detections, track_indices, detection_indices), config.rounds)
+        gate_rowwise_ms = timed(lambda: gate_rowwise(
+            kf, base_cost.copy(), tracks, detections, track_indices, detection_indices), config.rounds)
+        match_ms = timed(lambda: linear_assignment.min_cost_matching(
+            iou_matching.iou_cost, 0.7, tracks, detections, track_indices, detection_indices), config.rounds)
+
+        # 矩阵化实现与逐行参考实现的代价矩阵和匹配结果必须一致
+        same = np.allclose(
+            iou_matching.iou_cost(tracks, detections, track_indices, detection_indices),
+            iou_cost_rowwise(tracks, detections, track_indices, detection_indices))
+        same = same and np.array_equal(
+            linear_assignment.gate_cost_matrix(kf, base_cost.copy(), tracks, detections,
+                                               track_indices, detection_indices),
+            gate_rowwise(kf, base_cost.copy(), tracks, detections, track_indices, detection_indices))
+        same = same and linear_assignment.min_cost_matching(
+            iou_matching.iou_cost, 0.7, tracks, detections, track_indices, detection_indices
+        ) == linear_assignment.min_cost_matching(
+            iou_cost_rowwise, 0.7, tracks, detections, track_indices, detection_indices)
+
+        shape = f"{len(tracks)}×{len(detections)}"
+        print(f"{shape:>9} | {iou_ms:>8.3f} | {iou_rowwise_ms:>8.3f} | {gate_ms:>8.3f} | "
+              f"{gate_rowwise_ms:>8.3f} | {match_ms:>8.3f} | {'是' if same else '否':>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
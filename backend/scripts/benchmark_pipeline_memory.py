@@ -0,0 +1,144 @@
+"""
+流水线模式内存基准测试
+生成一段1080p测试视频，用固定耗时模拟YOLO和SlowFast推理（不加载模型），运行流水线模式检测，
+统计进程的峰值常驻内存（RSS），并校验每个clip送入行为识别时的内容仍是对应的帧
+
+用法:
+    python scripts/benchmark_pipeline_memory.py --queue-size 8 --batch-size 1 8
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+import cv2
+import numpy as np
+
+# 添加算法模块路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(current_dir)
+project_root = os.path.dirname(backend_dir)
+yolo_slowfast_path = os.path.join(project_root, 'yolo_slowfast-master')
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, yolo_slowfast_path)
+os.environ.setdefault('ENABLE_GUI', 'false')
+
+from services.detection_service import BehaviorDetectionService
+from services.action_profiles import resolve_action_profile
+
+
+def current_rss() -> int:
+    """当前进程的常驻内存（字节）"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        # 没有psutil时从 /proc 读取（仅Linux）
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def make_video(path: str, frames: int, width: int, height: int):
+    """生成纯色测试视频，第i帧的像素值为 i % 256"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (width, height))
+    for index in range(frames):
+        writer.write(np.full((height, width, 3), index % 256, dtype=np.uint8))
+    writer.release()
+
+
+def run_once(service, video_path: str, profile, queue_size: int, batch_size: int,
+             detect_ms: float, action_ms: float):
+    """
+    以模拟的推理耗时运行一次流水线模式检测
+
+    Returns:
+        Dict: 峰值RSS增量（MB）、识别的clip数、内容错位的clip数、总耗时
+    """
+    person = np.array([[100, 100, 300, 500, 0, 1, 0, 0]], dtype=np.float32)
+    state = {'clips': 0, 'wrong': 0}
+
+    def detect_batch(imgs, config, crops=None):
+        time.sleep(detect_ms / 1000 * len(imgs))
+        return [None] * len(imgs)
+
+    def recognize_actions(source_id, clip, tracks, action_profile):
+        # clip按顺序识别，第n个clip的首帧像素值应为 n*clip_len % 256（MJPG编码允许少量误差）
+        expected = (state['clips'] * action_profile['clip_len']) % 256
+        state['wrong'] += abs(int(clip[0, 0, 0, 0]) - expected) > 2
+        state['clips'] += 1
+        time.sleep(action_ms / 1000)
+        return [1], [1]
+
+    service._detect_batch = detect_batch
+    service._track_packet = lambda packet, last_tracks, scheduler=None, config=None: person
+    service._recognize_actions = recognize_actions
+
+    config = type('Config', (), {})()
+    config.input = video_path
+    config.output = None
+    config.task_id = 'benchmark'
+    config.action_profile = profile
+    config.queue_size = queue_size
+    config.batch_size = batch_size
+
+    baseline = current_rss()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], current_rss())
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    service._run_detection_pipelined(config, 'benchmark')
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler.join()
+
+    return {
+        'peak_mb': (peak[0] - baseline) / 2 ** 20,
+        'clips': state['clips'],
+        'wrong': state['wrong'],
+        'elapsed_s': elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流水线模式峰值内存基准测试（模拟推理耗时）')
+    parser.add_argument('--queue-size', type=int, default=8, help='阶段之间的队列长度')
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[1, 8], help='YOLO批量大小')
+    parser.add_argument('--profile', type=str, default='balanced', help='行为识别配置档（决定clip长度）')
+    parser.add_argument('--frames', type=int, default=250, help='测试视频帧数')
+    parser.add_argument('--width', type=int, default=1920, help='测试视频宽度')
+    parser.add_argument('--height', type=int, default=1080, help='测试视频高度')
+    parser.add_argument('--detect-ms', type=float, default=25.0, help='模拟的YOLO单帧耗时')
+    parser.add_argument('--action-ms', type=float, default=400.0, help='模拟的SlowFast单clip耗时')
+    config = parser.parse_args()
+
+    profile = resolve_action_profile(config.profile)
+    service = BehaviorDetectionService({'device': 'cpu'})
+    service.ava_labelnames = {index: f'action_{index}' for index in range(1, 82)}
+    frame_mb = config.width * config.height * 3 / 2 ** 20
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        video_path = os.path.join(temp_dir, 'benchmark.avi')
+        make_video(video_path, config.frames, config.width, config.height)
+        print(f"✓ 测试视频: {config.frames} 帧 {config.width}x{config.height}，每帧 {frame_mb:.1f} MB")
+
+        print(f"{'queue':>5} | {'batch':>5} | {'峰值RSS增量MB':>12} | {'clips':>5} | {'错位':>4} | {'耗时s':>6}")
+        print('-' * 56)
+        for batch_size in config.batch_size:
+            result = run_once(service, video_path, profile, config.queue_size, batch_size,
+                              config.detect_ms, config.action_ms)
+            print(f"{config.queue_size:>5} | {batch_size:>5} | {result['peak_mb']:>12.0f} | "
+                  f"{result['clips']:>5} | {result['wrong']:>4} | {result['elapsed_s']:>6.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
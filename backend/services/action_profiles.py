@@ -0,0 +1,95 @@
+"""
+行为识别配置档模块
+SlowFast的输入分辨率（crop_size）、采样帧数（num_frames）、clip长度（clip_len，
+即多少帧原始画面组成一个clip）和快慢通道比例（alpha）与YOLO的输入尺寸相互独立，
+按命名配置档选择，可以按任务或按流指定
+"""
+from typing import Any, Dict, List, Union
+
+
+# slowfast_r50_detection 的ROI头按固定的时间维池化核（慢通道8帧、快通道32帧）构建，
+# 偏离这组取值需要同时更换行为识别模型
+SLOWFAST_DETECTION_FRAMES = 32
+SLOWFAST_DETECTION_ALPHA = 4
+
+# 命名配置档
+ACTION_PROFILES = {
+    'accurate': {
+        'description': '原始设置：短边缩放到640，每秒（25帧）识别一次',
+        'crop_size': 640,
+        'num_frames': 32,
+        'clip_len': 25,
+        'alpha': 4
+    },
+    'balanced': {
+        'description': '短边缩放到256（AVA训练分辨率），每秒（25帧）识别一次',
+        'crop_size': 256,
+        'num_frames': 32,
+        'clip_len': 25,
+        'alpha': 4
+    },
+    'fast': {
+        'description': '短边缩放到224，每16帧识别一次，标签更新更及时',
+        'crop_size': 224,
+        'num_frames': 32,
+        'clip_len': 16,
+        'alpha': 4
+    }
+}
+
+DEFAULT_ACTION_PROFILE = 'balanced'
+
+_PROFILE_KEYS = ('crop_size', 'num_frames', 'clip_len', 'alpha')
+
+
+def list_action_profiles() -> List[Dict[str, Any]]:
+    """
+    列出所有命名配置档
+
+    Returns:
+        List[Dict]: 每项包含 name 和各参数
+    """
+    return [{'name': name, **profile} for name, profile in ACTION_PROFILES.items()]
+
+
+def resolve_action_profile(profile: Union[str, Dict[str, Any], None] = None) -> Dict[str, Any]:
+    """
+    解析行为识别配置档
+
+    Args:
+        profile: 配置档名称；或字典，可包含 name（作为基础配置档）和要覆盖的参数；为空时使用默认配置档
+
+    Returns:
+        Dict: name、crop_size、num_frames、clip_len、alpha
+
+    Raises:
+        ValueError: 未知的配置档名称或参数无效
+    """
+    if isinstance(profile, dict):
+        overrides = profile
+        name = profile.get('name') or DEFAULT_ACTION_PROFILE
+    else:
+        overrides = {}
+        name = profile or DEFAULT_ACTION_PROFILE
+
+    if name not in ACTION_PROFILES:
+        raise ValueError(f"未知的行为识别配置档: {name}，可选: {', '.join(ACTION_PROFILES)}")
+
+    resolved = {'name': name}
+    for key in _PROFILE_KEYS:
+        value = overrides.get(key, ACTION_PROFILES[name][key])
+        if key == 'alpha' and value is None:
+            resolved[key] = None  # 单通道（slow）模型
+            continue
+        value = int(value)
+        if value <= 0:
+            raise ValueError(f'{key} 必须为正整数')
+        resolved[key] = value
+
+    if resolved['alpha'] is not None and resolved['num_frames'] % resolved['alpha'] != 0:
+        raise ValueError('num_frames 必须是 alpha 的整数倍')
+
+    if resolved['num_frames'] != SLOWFAST_DETECTION_FRAMES or resolved['alpha'] != SLOWFAST_DETECTION_ALPHA:
+        print(f"⚠ 行为识别配置档 {name}: num_frames={resolved['num_frames']}, alpha={resolved['alpha']} "
+              f"与 slowfast_r50_detection 的固定取值（{SLOWFAST_DETECTION_FRAMES}/{SLOWFAST_DETECTION_ALPHA}）不一致")
+    return resolved
@@ -0,0 +1,286 @@
+"""
+跨流批量行为识别模块
+所有实时流和视频任务把预处理好的clip及ROI框提交给同一个行为识别服务，
+服务在各来源之间轮询取任务，把多个clip打包为一次 video_model(inputs, boxes) 调用
+（boxes第一列为clip在批内的下标），并限制单批的clip数和框数以控制CPU占用
+"""
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+
+class ActionJob:
+    """一个clip的行为识别任务"""
+
+    def __init__(self, source_id: str, inputs: List[torch.Tensor], boxes: torch.Tensor,
+                 track_ids: List[int], callback: Callable[['ActionJob'], None] = None):
+        """
+        初始化任务
+
+        Args:
+            source_id: 来源（流ID或视频任务ID），用于公平调度
+            inputs: 预处理后的 [slow, fast] 通路张量，形状 (C, T, H, W)
+            boxes: (N, 4) ROI框（已缩放到输入尺寸）
+            track_ids: 与boxes对应的跟踪ID
+            callback: 完成后在服务线程中调用
+        """
+        self.source_id = source_id
+        self.inputs = inputs
+        self.boxes = boxes.float()
+        self.track_ids = list(track_ids)
+        self.callback = callback
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.labels: Optional[List[int]] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def shape_key(self):
+        """同一批内各clip的张量形状必须一致"""
+        return tuple(tuple(inp.shape) for inp in self.inputs)
+
+    @property
+    def num_boxes(self) -> int:
+        return int(self.boxes.shape[0])
+
+
+class ActionRecognitionService:
+    """
+    共享的SlowFast批量行为识别服务
+
+    每个来源一个等待队列，服务线程按轮询顺序每轮从每个来源最多取一个任务，
+    直到达到 max_batch_clips / max_batch_boxes 上限或没有可合并的任务。
+    """
+
+    def __init__(self, model: Any, device: str, max_batch_clips: int = 4,
+                 max_batch_boxes: int = 32, max_wait_ms: float = 10.0):
+        """
+        初始化行为识别服务
+
+        Args:
+            model: SlowFast检测模型
+            device: 推理设备
+            max_batch_clips: 单批最大clip数
+            max_batch_boxes: 单批最大ROI框数
+            max_wait_ms: 取到第一个任务后等待其他任务加入的最长时间（毫秒）
+        """
+        self.model = model
+        self.device = device
+        self.max_batch_clips = max(1, int(max_batch_clips))
+        self.max_batch_boxes = max(1, int(max_batch_boxes))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        # 统计
+        self.batches = 0
+        self.batched_clips = 0
+        self.batched_boxes = 0
+        self.inference_time = 0.0
+        self.source_stats: Dict[str, Dict[str, float]] = {}
+
+        self._thread = threading.Thread(target=self._loop, name='action-recognition', daemon=True)
+        self._thread.start()
+
+    def set_params(self, max_batch_clips: int = None, max_batch_boxes: int = None, max_wait_ms: float = None):
+        """调整批量上限和等待时间"""
+        with self._cond:
+            if max_batch_clips is not None:
+                self.max_batch_clips = max(1, int(max_batch_clips))
+            if max_batch_boxes is not None:
+                self.max_batch_boxes = max(1, int(max_batch_boxes))
+            if max_wait_ms is not None:
+                self.max_wait_ms = max(0.0, float(max_wait_ms))
+        print(f"✓ 行为识别服务参数: max_batch_clips={self.max_batch_clips}, "
+              f"max_batch_boxes={self.max_batch_boxes}, max_wait_ms={self.max_wait_ms}")
+
+    def submit(self, job: ActionJob) -> ActionJob:
+        """
+        提交任务（不等待结果）
+
+        Raises:
+            RuntimeError: 服务已停止时
+        """
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError('行为识别服务已停止')
+            self._queues.setdefault(job.source_id, deque()).append(job)
+            self._cond.notify()
+        return job
+
+    def classify(self, job: ActionJob, timeout: float = None) -> List[int]:
+        """
+        提交任务并等待结果
+
+        Returns:
+            List[int]: 每个ROI框的预测类别下标
+
+        Raises:
+            RuntimeError: 推理失败或等待超时
+        """
+        self.submit(job)
+        if not job.done.wait(timeout):
+            raise RuntimeError('等待行为识别结果超时')
+        if job.error is not None:
+            raise RuntimeError(f'行为识别失败: {job.error}')
+        return job.labels
+
+    def drop_source(self, source_id: str):
+        """丢弃某个来源尚未处理的任务（流停止时调用）"""
+        with self._cond:
+            pending = self._queues.pop(source_id, None)
+            self.source_stats.pop(source_id, None)
+        for job in pending or ():
+            job.error = RuntimeError('来源已停止')
+            job.done.set()
+
+    def stop(self):
+        """停止服务线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+
+    def _pending_count(self) -> int:
+        return sum(len(jobs) for jobs in self._queues.values())
+
+    def _take_batch(self) -> List[ActionJob]:
+        """按来源轮询取出一批形状一致的任务（调用时已持有锁）"""
+        batch: List[ActionJob] = []
+        shape_key = None
+        num_boxes = 0
+
+        while len(batch) < self.max_batch_clips:
+            took_any = False
+            for source_id in list(self._queues.keys()):
+                jobs = self._queues[source_id]
+                if not jobs:
+                    continue
+                job = jobs[0]
+                if shape_key is not None and job.shape_key != shape_key:
+                    continue
+                if batch and num_boxes + job.num_boxes > self.max_batch_boxes:
+                    continue
+
+                jobs.popleft()
+                batch.append(job)
+                shape_key = job.shape_key
+                num_boxes += job.num_boxes
+                took_any = True
+
+                # 被服务过的来源移到队尾，下一批从其他来源开始
+                self._queues.move_to_end(source_id)
+                if not jobs:
+                    del self._queues[source_id]
+                if len(batch) >= self.max_batch_clips:
+                    break
+            if not took_any:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopped and self._pending_count() == 0:
+                    self._cond.wait()
+                if self._stopped:
+                    break
+
+                # 给其他来源一个短暂的窗口加入同一批
+                deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+                while (not self._stopped and self._pending_count() < self.max_batch_clips
+                       and len(self._queues) < self.max_batch_clips):
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+
+            if batch:
+                self._run_batch(batch)
+
+        # 唤醒停止后仍在等待的任务
+        with self._cond:
+            pending = [job for jobs in self._queues.values() for job in jobs]
+            self._queues.clear()
+        for job in pending:
+            job.error = RuntimeError('行为识别服务已停止')
+            job.done.set()
+
+    def _run_batch(self, batch: List[ActionJob]):
+        started = time.perf_counter()
+        try:
+            num_pathways = len(batch[0].inputs)
+            inputs = [torch.stack([job.inputs[p] for job in batch]).to(self.device, non_blocking=True)
+                      for p in range(num_pathways)]
+
+            # 第一列为clip在批内的下标
+            boxes = torch.cat([
+                torch.cat([torch.full((job.num_boxes, 1), float(i)), job.boxes], dim=1)
+                for i, job in enumerate(batch)
+            ]).to(self.device, non_blocking=True)
+
+            with torch.no_grad():
+                preds = self.model(inputs, boxes)
+            labels = torch.argmax(preds.cpu().float(), dim=1).tolist()
+
+            offset = 0
+            for job in batch:
+                job.labels = labels[offset:offset + job.num_boxes]
+                offset += job.num_boxes
+        except Exception as e:
+            print(f"❌ 批量行为识别失败: {e}")
+            for job in batch:
+                job.error = e
+
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.batches += 1
+            self.batched_clips += len(batch)
+            self.batched_boxes += sum(job.num_boxes for job in batch)
+            self.inference_time += elapsed
+            for job in batch:
+                stats = self.source_stats.setdefault(job.source_id, {'jobs': 0, 'boxes': 0, 'wait': 0.0})
+                stats['jobs'] += 1
+                stats['boxes'] += job.num_boxes
+                stats['wait'] += started - job.enqueued_at
+
+        for job in batch:
+            if job.callback is not None and job.error is None:
+                try:
+                    job.callback(job)
+                except Exception as e:
+                    print(f"行为识别回调出错: {e}")
+            job.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取批处理统计
+
+        Returns:
+            Dict: 统计信息
+        """
+        with self._cond:
+            return {
+                'max_batch_clips': self.max_batch_clips,
+                'max_batch_boxes': self.max_batch_boxes,
+                'max_wait_ms': self.max_wait_ms,
+                'pending': self._pending_count(),
+                'batches': self.batches,
+                'avg_batch_clips': round(self.batched_clips / self.batches, 2) if self.batches else 0.0,
+                'avg_batch_boxes': round(self.batched_boxes / self.batches, 2) if self.batches else 0.0,
+                'avg_inference_ms': round(self.inference_time / self.batches * 1000, 2) if self.batches else 0.0,
+                'sources': {
+                    source_id: {
+                        'jobs': stats['jobs'],
+                        'boxes': stats['boxes'],
+                        'avg_queue_ms': round(stats['wait'] / stats['jobs'] * 1000, 2) if stats['jobs'] else 0.0
+                    }
+                    for source_id, stats in self.source_stats.items()
+                }
+            }
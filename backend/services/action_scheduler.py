@@ -0,0 +1,137 @@
+"""
+行为识别调度模块
+每个clip只把需要识别的人员目标交给SlowFast：新目标和快速运动的目标每个clip都识别，
+行为标签连续稳定的目标按较慢的节奏重新识别，没有需要识别的目标时整段clip跳过
+"""
+import threading
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+# 默认调度参数
+DEFAULT_ACTION_SCHEDULE = {
+    'stable_after': 2,  # 连续多少次识别结果相同视为稳定
+    'stable_interval': 4,  # 稳定目标每隔多少个clip重新识别
+    'fast_speed': 0.02,  # 卡尔曼速度（每帧位移/框高）超过此值视为快速运动，每个clip都识别
+    'forget_after': 20  # 目标连续多少个clip未出现后清除其调度状态
+}
+
+
+class ActionScheduler:
+    """单个流或任务的SlowFast识别调度"""
+
+    def __init__(self, **params):
+        """
+        初始化调度器
+
+        Args:
+            params: 调度参数，未给出的使用 DEFAULT_ACTION_SCHEDULE
+        """
+        schedule = {**DEFAULT_ACTION_SCHEDULE, **{key: value for key, value in params.items()
+                                                  if key in DEFAULT_ACTION_SCHEDULE}}
+        self.stable_after = max(1, int(schedule['stable_after']))
+        self.stable_interval = max(1, int(schedule['stable_interval']))
+        self.fast_speed = max(0.0, float(schedule['fast_speed']))
+        self.forget_after = max(1, int(schedule['forget_after']))
+
+        self._lock = threading.Lock()
+        self._state: Dict[int, Dict[str, Any]] = {}
+        self.clip_index = 0
+
+        # 统计
+        self.clips = 0
+        self.skipped_clips = 0
+        self.candidate_rois = 0
+        self.selected_rois = 0
+
+    def _speed(self, rows: np.ndarray) -> np.ndarray:
+        """每帧位移相对框高的比例（跟踪输出的Vx、Vy为卡尔曼速度的10倍）"""
+        velocity = np.hypot(rows[:, 6].astype(np.float32), rows[:, 7].astype(np.float32)) / 10.0
+        heights = np.maximum(rows[:, 3].astype(np.float32) - rows[:, 1].astype(np.float32), 1.0)
+        return velocity / heights
+
+    def select(self, tracks: np.ndarray) -> np.ndarray:
+        """
+        为一个新clip挑选需要识别的目标
+
+        Args:
+            tracks: (N, 8) 跟踪结果 [x1, y1, x2, y2, cls, track_id, Vx, Vy]
+
+        Returns:
+            ndarray: 需要识别的行（为空表示本clip跳过）
+        """
+        with self._lock:
+            self.clip_index += 1
+            self.clips += 1
+
+            if tracks is None or tracks.shape[0] == 0:
+                self.skipped_clips += 1
+                self._prune()
+                return np.ones((0, 8)).astype(np.float32) if tracks is None else tracks
+
+            self.candidate_rois += int(tracks.shape[0])
+            persons = tracks[tracks[:, 4].astype(np.int32) == 0]
+            speeds = self._speed(persons) if persons.shape[0] else np.zeros(0)
+
+            due = np.zeros(persons.shape[0], dtype=bool)
+            for i, row in enumerate(persons):
+                track_id = int(row[5])
+                state = self._state.get(track_id)
+                if state is None:
+                    state = self._state[track_id] = {'label': None, 'streak': 0, 'last_clip': 0}
+                    due[i] = True
+                elif speeds[i] > self.fast_speed or state['streak'] < self.stable_after:
+                    due[i] = True
+                else:
+                    due[i] = self.clip_index - state['last_clip'] >= self.stable_interval
+
+                state['last_seen'] = self.clip_index
+                if due[i]:
+                    state['last_clip'] = self.clip_index
+
+            self._prune()
+            selected = persons[due]
+            self.selected_rois += int(selected.shape[0])
+            if selected.shape[0] == 0:
+                self.skipped_clips += 1
+            return selected
+
+    def record(self, track_ids: List[int], labels: List[Any]):
+        """
+        记录识别结果，用于判断目标的行为是否稳定
+
+        Args:
+            track_ids: 跟踪ID
+            labels: 对应的识别结果
+        """
+        with self._lock:
+            for track_id, label in zip(track_ids, labels):
+                state = self._state.get(int(track_id))
+                if state is None:
+                    continue
+                state['streak'] = state['streak'] + 1 if state['label'] == label else 1
+                state['label'] = label
+
+    def _prune(self):
+        expired = [track_id for track_id, state in self._state.items()
+                   if self.clip_index - state.get('last_seen', self.clip_index) > self.forget_after]
+        for track_id in expired:
+            del self._state[track_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取调度统计
+
+        Returns:
+            Dict: clip数、跳过的clip数、候选和实际识别的ROI数
+        """
+        with self._lock:
+            return {
+                'clips': self.clips,
+                'skipped_clips': self.skipped_clips,
+                'candidate_rois': self.candidate_rois,
+                'selected_rois': self.selected_rois,
+                'roi_ratio': round(self.selected_rois / self.candidate_rois, 3) if self.candidate_rois else 0.0,
+                'tracked': len(self._state)
+            }
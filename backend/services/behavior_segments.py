@@ -0,0 +1,285 @@
+"""
+行为片段压缩存储模块
+把逐帧的检测结果在线游程编码为 (跟踪目标, 行为) 片段：
+每个片段记录起止帧、平均置信度和稀疏的关键帧边界框，逐帧结果按需插值重建
+"""
+import json
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+
+from models.database import db, BehaviorSegment
+
+
+class BehaviorSegmentEncoder:
+    """
+    在线行为片段编码器
+
+    同一跟踪目标在连续帧（间隔不超过 max_gap_frames）保持同一行为时合并为一个片段，
+    行为变化或目标消失时结束片段。片段内每 keyframe_interval 帧保留一个边界框，
+    片段最后一帧的边界框总会保留。
+    """
+
+    def __init__(self, keyframe_interval: int = 5, max_gap_frames: int = 1):
+        """
+        初始化编码器
+
+        Args:
+            keyframe_interval: 片段内保留边界框的帧间隔
+            max_gap_frames: 同一片段内相邻两次出现允许的最大帧间隔
+        """
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.max_gap_frames = max(1, int(max_gap_frames))
+        self._open: Dict[int, Dict[str, Any]] = {}
+        self._last_frame = 0
+
+    def _start(self, detection: Dict[str, Any]) -> Dict[str, Any]:
+        bbox = detection['bbox']
+        return {
+            'object_id': detection.get('object_id'),
+            'object_type': detection['object_type'],
+            'behavior_type': detection.get('behavior_type'),
+            'is_anomaly': bool(detection.get('is_anomaly', False)),
+            'start_frame': detection['frame_number'],
+            'end_frame': detection['frame_number'],
+            'start_timestamp': detection['timestamp'],
+            'end_timestamp': detection['timestamp'],
+            'frame_count': 1,
+            'confidence_sum': float(detection['confidence']),
+            'keyframes': [[detection['frame_number'], bbox['x1'], bbox['y1'], bbox['x2'], bbox['y2']]],
+            'last_bbox': None
+        }
+
+    @staticmethod
+    def _finish(segment: Dict[str, Any]) -> Dict[str, Any]:
+        """结束片段并转换为数据库行"""
+        keyframes = segment['keyframes']
+        last_bbox = segment['last_bbox']
+        if last_bbox is not None and keyframes[-1][0] != last_bbox[0]:
+            keyframes.append(last_bbox)
+
+        return {
+            'object_id': segment['object_id'],
+            'object_type': segment['object_type'],
+            'behavior_type': segment['behavior_type'],
+            'is_anomaly': segment['is_anomaly'],
+            'start_frame': segment['start_frame'],
+            'end_frame': segment['end_frame'],
+            'start_timestamp': segment['start_timestamp'],
+            'end_timestamp': segment['end_timestamp'],
+            'frame_count': segment['frame_count'],
+            'mean_confidence': segment['confidence_sum'] / segment['frame_count'],
+            'keyframes': json.dumps(keyframes)
+        }
+
+    def push(self, results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        输入按帧顺序排列的检测结果
+
+        Returns:
+            List[Dict]: 本次输入后结束的片段行
+        """
+        closed = []
+        for detection in results:
+            frame_number = detection['frame_number']
+
+            # 进入新的一帧时结束已消失目标的片段
+            if frame_number != self._last_frame:
+                closed.extend(self._close_stale(frame_number))
+                self._last_frame = frame_number
+
+            object_id = detection.get('object_id')
+            segment = self._open.get(object_id)
+            if segment is not None and (segment['behavior_type'] != detection.get('behavior_type')
+                                        or frame_number - segment['end_frame'] > self.max_gap_frames):
+                closed.append(self._finish(self._open.pop(object_id)))
+                segment = None
+
+            if segment is None:
+                self._open[object_id] = self._start(detection)
+                continue
+
+            bbox = detection['bbox']
+            bbox_row = [frame_number, bbox['x1'], bbox['y1'], bbox['x2'], bbox['y2']]
+            segment['end_frame'] = frame_number
+            segment['end_timestamp'] = detection['timestamp']
+            segment['frame_count'] += 1
+            segment['confidence_sum'] += float(detection['confidence'])
+            if frame_number - segment['keyframes'][-1][0] >= self.keyframe_interval:
+                segment['keyframes'].append(bbox_row)
+                segment['last_bbox'] = None
+            else:
+                segment['last_bbox'] = bbox_row
+
+        return closed
+
+    def _close_stale(self, frame_number: int) -> List[Dict[str, Any]]:
+        stale_ids = [object_id for object_id, segment in self._open.items()
+                     if frame_number - segment['end_frame'] > self.max_gap_frames]
+        return [self._finish(self._open.pop(object_id)) for object_id in stale_ids]
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """结束所有未完成的片段"""
+        closed = [self._finish(segment) for segment in self._open.values()]
+        self._open = {}
+        return closed
+
+
+class BehaviorSegmentWriter:
+    """ResultSink写入器：把检测结果编码为行为片段后批量写入 behavior_segments 表"""
+
+    def __init__(self, task_id: int, keyframe_interval: int = 5):
+        self.task_id = task_id
+        self.encoder = BehaviorSegmentEncoder(keyframe_interval=keyframe_interval)
+        self.segment_count = 0
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        for row in rows:
+            row['task_id'] = self.task_id
+        db.session.execute(insert(BehaviorSegment.__table__), rows)
+        self.segment_count += len(rows)
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        self._insert(self.encoder.push(results))
+
+    def finish(self):
+        self._insert(self.encoder.flush())
+
+
+def segment_task_ids():
+    """
+    已按行为片段存储的任务ID子查询
+
+    开启 STORE_DETECTION_ROWS 时这些任务同时写有逐帧结果行，
+    同时统计两张表的地方需要用它排除这些行，避免重复计数
+    """
+    return select(BehaviorSegment.task_id).distinct()
+
+
+def _interpolate_timestamp(segment: BehaviorSegment, frame_number: int) -> float:
+    """按片段起止帧的时间戳线性插值，与写入时逐帧结果的时间戳一致（不假设帧率）"""
+    if segment.end_frame == segment.start_frame:
+        return segment.start_timestamp
+    ratio = (frame_number - segment.start_frame) / float(segment.end_frame - segment.start_frame)
+    return segment.start_timestamp + (segment.end_timestamp - segment.start_timestamp) * ratio
+
+
+def _interpolate_bbox(keyframes: List[List[float]], frame_number: int) -> List[float]:
+    """在关键帧之间线性插值边界框"""
+    previous = keyframes[0]
+    for keyframe in keyframes[1:]:
+        if keyframe[0] >= frame_number:
+            if keyframe[0] == previous[0]:
+                return keyframe[1:]
+            ratio = (frame_number - previous[0]) / float(keyframe[0] - previous[0])
+            return [p + (n - p) * ratio for p, n in zip(previous[1:], keyframe[1:])]
+        previous = keyframe
+    return previous[1:]
+
+
+def rebuild_frame_results(segments: Iterable[BehaviorSegment], start_frame: Optional[int] = None,
+                          end_frame: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    从行为片段重建逐帧检测结果（边界框按关键帧插值）
+
+    Args:
+        segments: 行为片段
+        start_frame: 起始帧（包含），None表示不限
+        end_frame: 结束帧（包含），None表示不限
+        limit: 最多返回的结果数
+
+    Returns:
+        List[Dict]: 按帧号排序的检测结果，格式与 DetectionResult.to_dict 一致
+    """
+    rows: List[Tuple[int, int, Dict[str, Any]]] = []
+    for segment in segments:
+        first = max(segment.start_frame, start_frame) if start_frame is not None else segment.start_frame
+        last = min(segment.end_frame, end_frame) if end_frame is not None else segment.end_frame
+        if first > last:
+            continue
+
+        keyframes = json.loads(segment.keyframes) if segment.keyframes else []
+        if not keyframes:
+            continue
+
+        for frame_number in range(first, last + 1):
+            x1, y1, x2, y2 = _interpolate_bbox(keyframes, frame_number)
+            rows.append((frame_number, segment.object_id or 0, {
+                'task_id': segment.task_id,
+                'frame_number': frame_number,
+                'timestamp': _interpolate_timestamp(segment, frame_number),
+                'object_id': segment.object_id,
+                'object_type': segment.object_type,
+                'confidence': segment.mean_confidence,
+                'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+                'behavior_type': segment.behavior_type,
+                'behavior_confidence': None,
+                'is_anomaly': segment.is_anomaly,
+                'segment_id': segment.id
+            }))
+
+    rows.sort(key=lambda row: (row[0], row[1]))
+    results = [row[2] for row in rows]
+    return results[:limit] if limit is not None else results
+
+
+def summarize_segments(segments: Iterable[BehaviorSegment]) -> Dict[str, Any]:
+    """
+    根据行为片段计算任务统计信息
+
+    Returns:
+        Dict: total_detections、detected_frames、alert_count 和 behaviors 列表
+    """
+    total_detections = 0
+    alert_count = 0
+    intervals = []
+    behavior_stats = defaultdict(lambda: {'count': 0, 'confidence_sum': 0.0, 'first': None, 'last': None,
+                                          'first_timestamp': None, 'last_timestamp': None})
+
+    for segment in segments:
+        total_detections += segment.frame_count
+        if segment.is_anomaly:
+            alert_count += segment.frame_count
+        intervals.append((segment.start_frame, segment.end_frame))
+
+        stats = behavior_stats[segment.behavior_type or 'unknown']
+        stats['count'] += segment.frame_count
+        stats['confidence_sum'] += segment.mean_confidence * segment.frame_count
+        if stats['first'] is None or segment.start_frame < stats['first']:
+            stats['first'], stats['first_timestamp'] = segment.start_frame, segment.start_timestamp
+        if stats['last'] is None or segment.end_frame > stats['last']:
+            stats['last'], stats['last_timestamp'] = segment.end_frame, segment.end_timestamp
+
+    # 合并区间计算有检测结果的帧数
+    detected_frames = 0
+    current_start, current_end = None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end + 1:
+            if current_end is not None:
+                detected_frames += current_end - current_start + 1
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        detected_frames += current_end - current_start + 1
+
+    behaviors = []
+    for behavior, stats in behavior_stats.items():
+        avg_confidence = stats['confidence_sum'] / stats['count'] if stats['count'] > 0 else 0
+        duration = stats['last_timestamp'] - stats['first_timestamp']
+        behaviors.append({
+            'behavior': behavior,
+            'count': stats['count'],
+            'confidence': f"{avg_confidence:.2f}",
+            'duration': f"{duration:.1f}s"
+        })
+
+    return {
+        'total_detections': total_detections,
+        'detected_frames': detected_frames,
+        'alert_count': alert_count,
+        'behaviors': behaviors
+    }
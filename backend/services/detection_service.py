@@ -6,14 +6,25 @@ import sys
 import cv2
 import time
 import json
+import shutil
+import tempfile
 import threading
 import queue
 from datetime import datetime
 import base64
 from typing import Dict, List, Optional, Tuple, Any
 
-# 导入实时统计服务
-from .realtime_statistics import get_realtime_statistics, reset_realtime_statistics
+from .pipeline_executor import PipelineExecutor
+from .keyframe_scheduler import KeyframeScheduler
+from .segment_parallel import plan_segments, run_segments, reconcile_track_ids, iter_merged_frames
+from .stream_session import StreamSession, StreamSessionManager
+from .inference_broker import DynamicBatchBroker
+from .frame_broadcaster import BroadcastHub, FrameSubscriber
+from .frame_pacer import FramePacer
+from .motion_gate import MotionGate, DEFAULT_MOTION_GATE
+from .zones import ZoneSet, ZoneEventTracker
+from .action_scheduler import ActionScheduler, DEFAULT_ACTION_SCHEDULE
+from .action_profiles import DEFAULT_ACTION_PROFILE, resolve_action_profile
 
 # 添加算法模块路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -80,16 +91,64 @@ class BehaviorDetectionService:
         
         self.input_size = config.get('input_size', 640)
         self.confidence_threshold = config.get('confidence_threshold', 0.5)
+
+        # 流水线执行配置（离线视频检测）
+        self.pipeline_mode = config.get('pipeline_mode', False)
+        self.pipeline_queue_size = config.get('pipeline_queue_size', 8)
+
+        # 离线视频YOLO批量检测的帧数（1表示逐帧检测）
+        self.yolo_batch_size = config.get('yolo_batch_size', 1)
+
+        # 长视频分段并行处理的分段数（<=1 表示不分段）
+        self.parallel_segments = config.get('parallel_segments', 0)
         
         # 初始化标志
         self.models_initialized = False
         self.task_lock = threading.Lock()
         self.stopped_tasks = set()
         self.current_tasks = {}
-        self.should_stop_realtime = False  # 停止实时监控的标志（对应标准实现的should_stop）
-        self.is_running = False  # 检测器运行状态标志（按照标准实现添加）
-        self.stop_event = threading.Event()  # 添加停止事件对象
-        self.active_streams = {}  # 活跃流跟踪
+
+        # 实时流会话：每路流独立的跟踪器、clip缓冲、行为标签、停止信号和统计，模型权重共享
+        self.stream_sessions = StreamSessionManager(config.get('max_streams', 8))
+
+        # 运动门控：默认参数和按摄像头（视频源）覆盖的参数
+        self.motion_gate_defaults = {**DEFAULT_MOTION_GATE, **config.get('motion_gate', {})}
+        self.motion_gate_cameras = {str(key): dict(value) for key, value in config.get('motion_gate_cameras', {}).items()}
+
+        # SlowFast识别调度：稳定目标降低识别频率，新目标和快速运动目标每个clip都识别
+        self.action_schedule = {**DEFAULT_ACTION_SCHEDULE, **config.get('action_schedule', {})}
+
+        # 默认的行为识别配置档（SlowFast输入尺寸和时间采样，与YOLO输入尺寸独立），可按任务或流覆盖
+        self.action_profile = config.get('action_profile', DEFAULT_ACTION_PROFILE)
+
+        # 选择性ReID：IoU能唯一确定匹配的检测复用轨迹已有的外观特征，每隔若干帧刷新一次
+        self.selective_reid = config.get('selective_reid', False)
+        self.reid_refresh_interval = config.get('reid_refresh_interval', 10)
+
+        # 按视频源配置的检测区域（由应用层从数据库加载）
+        self.zones_by_source: Dict[str, List[Dict[str, Any]]] = {}
+
+        # 实时流目标输出帧率（按截止时间控制，<=0 表示不限速）
+        self.realtime_target_fps = config.get('realtime_target_fps', 30.0)
+
+        # 同一视频源只运行一条流水线，编码后的帧广播给所有观看者
+        self.broadcasts = BroadcastHub(
+            idle_timeout=config.get('broadcast_idle_timeout', 5.0),
+            queue_size=config.get('broadcast_queue_size', 2)
+        )
+
+        # 实时流共享的YOLO动态批处理推理代理（最大批量、等待截止时间）
+        self.yolo_broker_max_batch = config.get('yolo_broker_max_batch', 8)
+        self.yolo_broker_max_wait_ms = config.get('yolo_broker_max_wait_ms', 15.0)
+        self.yolo_broker = None
+        self._broker_lock = threading.Lock()
+
+        # 所有流和视频任务共享的SlowFast批量行为识别服务（单批clip数、框数上限）
+        self.action_max_batch_clips = config.get('action_max_batch_clips', 4)
+        self.action_max_batch_boxes = config.get('action_max_batch_boxes', 32)
+        self.action_max_wait_ms = config.get('action_max_wait_ms', 10.0)
+        self.action_service = None
+        self._action_lock = threading.Lock()
         
         # 模型相关路径
         self.yolo_model_path = 'yolov8n.pt'
@@ -137,13 +196,15 @@ class BehaviorDetectionService:
             
             # 初始化DeepSort跟踪器
             if os.path.exists(self.deepsort_weights_path):
-                self.deepsort_tracker = DeepSort(self.deepsort_weights_path)
+                self.deepsort_tracker = DeepSort(self.deepsort_weights_path, selective_reid=self.selective_reid,
+                                                 reid_refresh_interval=self.reid_refresh_interval)
                 print(f"✓ DeepSort跟踪器已加载: {self.deepsort_weights_path}")
             else:
                 # 如果绝对路径不存在，尝试相对路径
                 relative_path = "deep_sort/deep_sort/deep/checkpoint/ckpt.t7"
                 if os.path.exists(relative_path):
-                    self.deepsort_tracker = DeepSort(relative_path)
+                    self.deepsort_tracker = DeepSort(relative_path, selective_reid=self.selective_reid,
+                                                     reid_refresh_interval=self.reid_refresh_interval)
                     print(f"✓ DeepSort跟踪器已加载: {relative_path}")
                 else:
                     print(f"⚠ DeepSort权重文件不存在: {self.deepsort_weights_path}")
@@ -178,7 +239,9 @@ class BehaviorDetectionService:
             return False
     
     def detect_video(self, video_path: str, output_path: str = None, 
-                    progress_callback: callable = None) -> Dict[str, Any]:
+                    progress_callback: callable = None,
+                    options: Dict[str, Any] = None,
+                    result_sink: Any = None) -> Dict[str, Any]:
         """
         检测视频文件
         
@@ -186,6 +249,10 @@ class BehaviorDetectionService:
             video_path: 视频文件路径
             output_path: 输出视频路径
             progress_callback: 进度回调函数
+            options: 单个任务的检测选项，覆盖服务级配置（如 pipeline_mode、yolo_batch_size、
+                     detection_stride、adaptive_stride、parallel_segments、action_profile）
+            result_sink: 结果写入通道（需实现 emit(frame_results)），提供时检测结果逐帧流式写出，
+                         返回值中的 results 为空列表
             
         Returns:
             Dict: 检测结果
@@ -215,12 +282,26 @@ class BehaviorDetectionService:
             config = type('Config', (), {})()
             config.input = video_path
             config.output = output_path or ''
+            config.task_id = task_id
+            config.action_scheduler = ActionScheduler(**self.action_schedule)
             config.imsize = self.input_size
             config.device = self.device
             config.show = False
             config.conf = self.confidence_threshold
             config.iou = 0.4
             config.classes = None
+
+            # 任务级检测选项
+            options = options or {}
+            config.options = options
+            config.result_sink = result_sink
+            config.pipeline = bool(options.get('pipeline_mode', self.pipeline_mode))
+            config.queue_size = int(options.get('pipeline_queue_size', self.pipeline_queue_size))
+            config.batch_size = max(1, int(options.get('yolo_batch_size', self.yolo_batch_size)))
+            config.parallel_segments = int(options.get('parallel_segments', self.parallel_segments) or 0)
+            config.parallel_workers = int(options.get('parallel_workers', 0) or 0)
+            config.action_profile = resolve_action_profile(options.get('action_profile', self.action_profile))
+            print(f"✓ 行为识别配置档: {config.action_profile}")
             
             # 存储任务信息
             with self.task_lock:
@@ -239,15 +320,21 @@ class BehaviorDetectionService:
             
             # 更新任务状态
             with self.task_lock:
+                pipeline_stats = None
+                keyframe_stats = None
                 if task_id in self.current_tasks:
                     self.current_tasks[task_id]['status'] = 'completed'
                     self.current_tasks[task_id]['end_time'] = time.time()
+                    pipeline_stats = self.current_tasks[task_id].get('pipeline_stats')
+                    keyframe_stats = self.current_tasks[task_id].get('keyframe_stats')
             
             return {
                 'success': True,
                 'task_id': task_id,
                 'results': results,
-                'output_path': output_path
+                'output_path': output_path,
+                'pipeline_stats': pipeline_stats,
+                'keyframe_stats': keyframe_stats
             }
             
         except Exception as e:
@@ -265,30 +352,55 @@ class BehaviorDetectionService:
             
             return {'success': False, 'error': str(e)}
     
+    def create_tracker(self):
+        """
+        创建一个独立的跟踪器（独立的轨迹和ID计数，共享ReID模型权重）
+
+        Returns:
+            DeepSort: 跟踪器实例
+        """
+        return self.deepsort_tracker.spawn()
+
+    @property
+    def is_running(self) -> bool:
+        """是否有正在运行的实时流"""
+        return len(self.stream_sessions) > 0
+
     def start_realtime_detection(self, source: int = 0, 
-                                websocket_callback: callable = None) -> str:
+                                websocket_callback: callable = None,
+                                stream_id: str = None,
+                                action_profile: Any = None) -> str:
         """
         启动实时检测
         
         Args:
             source: 摄像头ID
             websocket_callback: WebSocket回调函数
+            stream_id: 流ID，用于按流停止，为空时自动生成
+            action_profile: 行为识别配置档名称或参数，为空时使用服务默认配置档
             
         Returns:
-            str: 任务ID
+            str: 任务ID（同时也是流ID）
+
+        Raises:
+            ValueError: 行为识别配置档无效时
         """
+        profile = resolve_action_profile(action_profile or self.action_profile)
         if not self.models_initialized:
             if not self.initialize_models():
                 raise Exception('模型初始化失败')
         
-        task_id = f"realtime_{int(time.time())}"
+        session = self.stream_sessions.open(
+            source,
+            stream_id=stream_id or f"realtime_{int(time.time())}",
+            tracker_factory=self.create_tracker,
+            alert_behaviors=self.alert_behaviors
+        )
+        session.action_profile = profile
+        task_id = session.stream_id
         
         def realtime_worker():
             try:
-                # 切换到算法目录
-                original_cwd = os.getcwd()
-                os.chdir(yolo_slowfast_path)
-                
                 # 准备检测参数
                 config = type('Config', (), {})()
                 config.input = source
@@ -310,24 +422,19 @@ class BehaviorDetectionService:
                     }
                 
                 # 执行实时检测
-                self._run_realtime_detection(config, task_id, websocket_callback)
-                
-                # 恢复原始目录
-                os.chdir(original_cwd)
+                self._run_realtime_detection(config, session, websocket_callback)
                 
             except Exception as e:
                 print(f"实时检测错误: {e}")
-                # 恢复原始目录
-                try:
-                    os.chdir(original_cwd)
-                except:
-                    pass
+                session.status = 'failed'
                 
                 # 更新任务状态
                 with self.task_lock:
                     if task_id in self.current_tasks:
                         self.current_tasks[task_id]['status'] = 'failed'
                         self.current_tasks[task_id]['error'] = str(e)
+            finally:
+                self.stream_sessions.close(session)
         
         # 启动实时检测线程
         thread = threading.Thread(target=realtime_worker, daemon=True)
@@ -335,7 +442,64 @@ class BehaviorDetectionService:
         
         return task_id
 
-    def generate_realtime_frames(self, source: Any, preview_only: bool = False, websocket_callback=None):
+    def open_stream(self, source: Any, preview_only: bool = False, stream_id: str = None) -> StreamSession:
+        """
+        登记一路HTTP视频流会话（在返回流响应前调用，便于把流ID告知客户端）
+
+        Args:
+            source: 视频源
+            preview_only: 是否仅预览
+            stream_id: 流ID，为空时自动生成
+
+        Returns:
+            StreamSession: 流会话
+
+        Raises:
+            RuntimeError: 运行中的流数量已达上限时
+        """
+        return self.stream_sessions.open(
+            source,
+            stream_id=stream_id,
+            tracker_factory=self.create_tracker if self.models_initialized else None,
+            alert_behaviors=self.alert_behaviors,
+            preview_only=preview_only
+        )
+
+    def subscribe_stream(self, source: Any, preview_only: bool = False, websocket_callback=None,
+                         viewer_id: str = None, action_profile: Any = None) -> FrameSubscriber:
+        """
+        观看一个视频源：该源已有流水线在运行时直接加入，否则启动一条新流水线
+
+        Args:
+            source: 视频源
+            preview_only: 是否仅预览
+            websocket_callback: WebSocket回调函数（仅启动流水线的请求生效）
+            viewer_id: 观看者ID（前端生成，用于单独断开）
+            action_profile: 行为识别配置档名称或参数（仅启动流水线的请求生效，加入已有流水线时沿用其配置档）
+
+        Returns:
+            FrameSubscriber: 观看者，frames() 产出multipart帧
+
+        Raises:
+            RuntimeError: 运行中的流数量已达上限时
+            ValueError: 行为识别配置档无效时
+        """
+        profile = resolve_action_profile(action_profile or self.action_profile)
+        mode = 'preview' if preview_only else 'detect'
+        key = f"{mode}_{source}"
+
+        def start_pipeline():
+            session = self.open_stream(source, preview_only=preview_only, stream_id=f"feed_{key}")
+            session.action_profile = profile
+            frames = self.generate_realtime_frames(
+                source, preview_only=preview_only, websocket_callback=websocket_callback, session=session
+            )
+            return session, frames
+
+        return self.broadcasts.subscribe(key, start_pipeline, viewer_id)
+
+    def generate_realtime_frames(self, source: Any, preview_only: bool = False, websocket_callback=None,
+                                 session: StreamSession = None):
         """
         生成实时视频帧流，用于HTTP视频流传输
         这是从 behavior_identify 项目迁移的功能
@@ -344,6 +508,7 @@ class BehaviorDetectionService:
             source: 视频源（摄像头ID或视频文件路径）
             preview_only: 是否仅预览模式（不进行行为检测）
             websocket_callback: WebSocket回调函数，用于发送统计数据
+            session: 流会话，为空时新建（每路流独立的跟踪器、clip缓冲、标签和停止信号）
 
         Yields:
             bytes: JPEG格式的视频帧数据
@@ -351,36 +516,34 @@ class BehaviorDetectionService:
         mode_text = "仅预览" if preview_only else "实时检测"
         print(f"🎥 开始生成实时视频帧流，视频源: {source}，模式: {mode_text}")
 
-        # 按照标准实现：开始新会话时重置停止标志
-        self.should_stop_realtime = False  # 重置停止标志，开始新的监控会话
-        self.stop_event.clear()  # 清除停止事件
-        self.is_running = True  # 设置运行状态
-        print(f"🎥 开始新监控会话 - should_stop: {self.should_stop_realtime}, is_running: {self.is_running}")
+        if not preview_only and not self.models_initialized:
+            print("模型未初始化，尝试初始化...")
+            if not self.initialize_models():
+                print("模型初始化失败，无法生成视频帧")
+                if session is not None:
+                    self.stream_sessions.close(session)
+                return
+
+        if session is None:
+            session = self.open_stream(source, preview_only=preview_only)
+        if not preview_only and session.tracker is None:
+            session.tracker = self.create_tracker()
+        session.status = 'running'
+        stream_id = session.stream_id
+        print(f"🎥 开始新监控会话 {stream_id}")
 
-        # 🔧 新增：初始化实时统计（如果有WebSocket回调）
+        # 🔧 新增：本会话的实时统计（如果有WebSocket回调）
         realtime_stats = None
         last_stats_time = 0
         stats_interval = 2.0  # 每2秒发送一次统计数据
         if websocket_callback and not preview_only:
-            from services.realtime_statistics import get_realtime_statistics
-            realtime_stats = get_realtime_statistics(self.alert_behaviors)
-            realtime_stats.reset()
+            realtime_stats = session.stats
             last_stats_time = time.time()
             print(f"🔧 实时统计已初始化，报警行为: {self.alert_behaviors}")
 
-        if not self.models_initialized:
-            print("模型未初始化，尝试初始化...")
-            if not self.initialize_models():
-                print("模型初始化失败，无法生成视频帧")
-                return
-
         try:
-            # 切换到算法目录
-            original_cwd = os.getcwd()
-            os.chdir(yolo_slowfast_path)
-
             # 确保导入必要的模块
-            from yolo_slowfast import MyVideoCapture, ava_inference_transform, deepsort_update, plot_one_box
+            from yolo_slowfast import LatestFrameCapture, ava_inference_transform, deepsort_update, plot_one_box
 
             # 处理视频源参数
             if source == '0' or source == 0:
@@ -390,28 +553,26 @@ class BehaviorDetectionService:
 
             print(f"处理后的视频源: {source}, 类型: {type(source)}")
 
-            # 初始化视频捕获
-            cap = MyVideoCapture(source)
-            id_to_ava_labels = {}
+            # 初始化视频捕获（独立采集线程只保留最新帧，每个会话独立的clip缓冲）
+            if session.action_profile is None:
+                session.action_profile = resolve_action_profile(self.action_profile)
+            cap = LatestFrameCapture(source, clip_len=session.action_profile['clip_len'])
+            session.cap = cap
+            id_to_ava_labels = session.id_to_ava_labels
 
             # 颜色映射
             import random
             coco_color_map = [[random.randint(0, 255) for _ in range(3)] for _ in range(80)]
 
-            # clip 队列和动作识别线程
-            clip_queue = queue.Queue()
+            # clip 队列和动作识别线程（队列有界，行为识别跟不上时丢弃新clip而不是积压）
+            clip_queue = queue.Queue(maxsize=2)
             result_queue = queue.Queue()
 
             def slowfast_worker():
-                # 仅当使用GPU时才创建独立的CUDA流
-                import contextlib
-                stream = torch.cuda.Stream() if 'cuda' in str(self.device) else None
-                context_manager = torch.cuda.stream(stream) if stream else contextlib.nullcontext()
-
                 while True:
                     # 检查停止信号
-                    if self.should_stop_realtime:
-                        print("SlowFast worker收到停止信号，退出...")
+                    if session.should_stop:
+                        print(f"流 {stream_id} 的SlowFast worker收到停止信号，退出...")
                         break
 
                     try:
@@ -423,67 +584,62 @@ class BehaviorDetectionService:
                         # 超时或其他异常，继续检查停止信号
                         continue
 
-                    idx, clip, pred_result = item
+                    idx, clip, tracks = item
 
                     # 再次检查停止信号
-                    if self.should_stop_realtime:
-                        print("SlowFast worker在处理前收到停止信号，退出...")
+                    if session.should_stop:
+                        print(f"流 {stream_id} 的SlowFast worker在处理前收到停止信号，退出...")
                         clip_queue.task_done()
                         break
 
-                    with context_manager:
-                        if pred_result.pred[0].shape[0]:
-                            inputs, inp_boxes, _ = ava_inference_transform(clip, pred_result.pred[0][:, 0:4], crop_size=self.input_size)
-                            inp_boxes = torch.cat([torch.zeros(inp_boxes.shape[0], 1), inp_boxes], dim=1)
-                            if isinstance(inputs, list):
-                                inputs = [inp.unsqueeze(0).to(self.device, non_blocking=True) for inp in inputs]
-                            else:
-                                inputs = inputs.unsqueeze(0).to(self.device, non_blocking=True)
-
-                            inp_boxes_gpu = inp_boxes.to(self.device, non_blocking=True)
-
-                            with torch.no_grad():
-                                slowfaster_preds = self.video_model(inputs, inp_boxes_gpu)
-
-                            # 修复数据类型转换问题 - 确保正确的数据类型转换
-                            slowfaster_preds_cpu = slowfaster_preds.cpu().float()  # 确保为float类型
-                            pred_labels = torch.argmax(slowfaster_preds_cpu, dim=1).numpy().astype(np.int32)
-                            track_ids = pred_result.pred[0][:, 5].astype(np.int32)
-
-                            result_queue.put((idx, track_ids.tolist(), pred_labels.tolist()))
+                    if tracks.shape[0]:
+                        try:
+                            # 预处理在本线程完成，推理与其他流的clip合并为一批
+                            track_ids, pred_labels = self._recognize_actions(
+                                stream_id, clip, tracks, session.action_profile)
+                            session.action_scheduler.record(track_ids, pred_labels)
+                            result_queue.put((idx, track_ids, pred_labels))
+                        except Exception as e:
+                            print(f"流 {stream_id} 行为识别出错: {e}")
                     clip_queue.task_done()
 
-                print("SlowFast worker线程已退出")
+                print(f"流 {stream_id} 的SlowFast worker线程已退出")
 
-            # 启动动作识别工作线程
-            threading.Thread(target=slowfast_worker, daemon=True).start()
+            # 启动动作识别工作线程，并登记到YOLO推理代理
+            if not preview_only:
+                threading.Thread(target=slowfast_worker, daemon=True).start()
+                self.get_yolo_broker().register_stream(stream_id)
 
-            # 主处理循环 - 按照标准实现逻辑（简化循环条件）
-            frame_count = 0
-            print(f"🎥 开始主处理循环")
-            while not cap.end and not self.should_stop_realtime:
-                frame_count += 1
-                # 每100帧打印一次状态
-                if frame_count % 100 == 0:
-                    print(f"🎥 处理第{frame_count}帧 - should_stop: {self.should_stop_realtime}, event_set: {self.stop_event.is_set()}")
-
-                # 在循环开始时检查停止标志（按照标准实现）
-                if self.should_stop_realtime:
-                    print(f"🎥 在第{frame_count}帧收到停止信号，正在退出实时监控...")
-                    print(f"🎥 停止标志状态: should_stop={self.should_stop_realtime}, is_running={self.is_running}")
-                    break
+            # 按截止时间控制输出帧率，停止信号到达时立即唤醒
+            pacer = FramePacer(self.realtime_target_fps, session.stop_event)
+            session.pacer = pacer
+            if not preview_only:
+                session.motion_gate = MotionGate(**self.get_motion_gate_config(session.source))
+                session.action_scheduler = ActionScheduler(**self.action_schedule)
+                self._apply_zones(session)
 
+            # 主处理循环
+            frame_count = 0
+            print(f"🎥 流 {stream_id} 开始主处理循环")
+            while not cap.end and not session.should_stop:
+                # 取采集线程的最新帧，处理期间到达的旧帧已被丢弃
                 ret, img = cap.read()
                 if not ret:
                     # 如果读取失败，也检查停止标志
-                    if self.should_stop_realtime:
-                        print("🎥 读取失败时收到停止信号，退出...")
+                    if session.should_stop:
+                        print(f"🎥 流 {stream_id} 读取失败时收到停止信号，退出...")
                         break
                     continue
 
-                # 再次检查是否需要停止（按照标准实现）
-                if self.should_stop_realtime:
-                    print("🎥 收到停止信号，正在退出实时监控...")
+                frame_count += 1
+                session.frame_count = frame_count
+                # 每100帧打印一次状态
+                if frame_count % 100 == 0:
+                    print(f"🎥 流 {stream_id} 处理第{frame_count}帧，采集统计: {cap.get_stats()}")
+
+                # 再次检查是否需要停止
+                if session.should_stop:
+                    print(f"🎥 流 {stream_id} 收到停止信号，正在退出实时监控...")
                     break
 
                 # 🔧 预览模式：跳过复杂的检测逻辑，直接显示原始画面
@@ -492,31 +648,24 @@ class BehaviorDetectionService:
                     pass  # img保持原始状态
                 else:
                     # 实时检测模式：执行完整的YOLO + SlowFast检测
-                    # YOLO检测
-                    results = self.yolo_model.predict(source=img, imgsz=self.input_size, device=self.device, verbose=False)
-                    boxes = results[0].boxes  # YOLOv8 Results object
-
-                    # 处理YOLO检测结果
-                    if boxes is not None and len(boxes) > 0:
-                        # 再次检查停止信号
-                        if self.should_stop_realtime:
-                            print("在YOLO处理阶段收到停止信号，退出...")
-                            break
-
-                        pred_xyxy = boxes.xyxy.cpu().numpy()
-                        pred_conf = boxes.conf.cpu().numpy().reshape(-1, 1)
-                        pred_cls = boxes.cls.cpu().numpy().reshape(-1, 1)
+                    # YOLO检测（与其他流的帧合并为一批推理），运动门控判定画面无变化时跳过
+                    temp = self._realtime_track(session, img)
 
-                        pred = np.hstack((pred_xyxy, pred_conf, pred_cls))
-                        xywh = np.hstack(((pred[:, 0:2] + pred[:, 2:4]) / 2, pred[:, 2:4] - pred[:, 0:2]))
+                    # 区域进出事件
+                    zone_events = self._update_zone_events(session, temp, frame_count, img)
+                    if zone_events and websocket_callback:
+                        websocket_callback({
+                            'type': 'zone_event',
+                            'stream_id': stream_id,
+                            'events': zone_events
+                        })
 
-                        # DeepSort跟踪
-                        temp = deepsort_update(self.deepsort_tracker, pred, xywh, img)
-                        temp = temp if len(temp) else np.ones((0, 8)).astype(np.float32)
+                    # 处理YOLO检测结果
+                    if temp is not None:
 
                         # 再次检查停止信号
-                        if self.should_stop_realtime:
-                            print("在DeepSort处理阶段收到停止信号，退出...")
+                        if session.should_stop:
+                            print(f"流 {stream_id} 在DeepSort处理阶段收到停止信号，退出...")
                             break
 
                         # 格式化检测结果
@@ -525,10 +674,18 @@ class BehaviorDetectionService:
                         pred_result.pred = [temp.astype(np.float32)]
                         pred_result.names = self.yolo_model.names
 
-                        # 行为识别（SlowFast） - 当积累了25帧时
-                        if len(cap.stack) == 25:
-                            clip = cap.get_video_clip()
-                            clip_queue.put((cap.idx, clip, pred_result))
+                        # 行为识别（SlowFast） - 积累满一个clip时，只识别调度器选出的人员目标
+                        if cap.clip_ready():
+                            roi_tracks = session.action_scheduler.select(self._zone_rois(session, temp, img))
+                            if roi_tracks.shape[0]:
+                                # clip交给行为识别线程异步处理，需要独立副本
+                                clip = cap.get_video_clip(copy=True)
+                                try:
+                                    clip_queue.put_nowait((cap.idx, clip, roi_tracks))
+                                except queue.Full:
+                                    pass
+                            else:
+                                cap.skip_video_clip()
 
                         # 处理动作识别结果
                         while not result_queue.empty():
@@ -539,11 +696,6 @@ class BehaviorDetectionService:
                             except queue.Empty:
                                 break
 
-                        # 再次检查停止信号
-                        if self.should_stop_realtime:
-                            print("在结果处理阶段收到停止信号，退出...")
-                            break
-
                         # 绘制检测结果 - 使用与behavior_identify相同的逻辑
                         annotated_frame = img.copy()
                         for _, pred in enumerate(pred_result.pred):
@@ -563,7 +715,7 @@ class BehaviorDetectionService:
                         img = annotated_frame
 
                         # 🔧 新增：更新实时统计数据
-                        if realtime_stats and not preview_only:
+                        if realtime_stats:
                             # 构建检测结果
                             detections = []
                             for _, pred in enumerate(pred_result.pred):
@@ -582,7 +734,7 @@ class BehaviorDetectionService:
 
                             # 更新统计数据
                             current_time = time.time()
-                            realtime_stats.update_frame_stats(fps=30.0, processing_time=0.033)
+                            realtime_stats.update_frame_stats(fps=pacer.achieved_fps, processing_time=pacer.last_work_time)
                             if detections:
                                 realtime_stats.add_detections(detections)
 
@@ -592,79 +744,94 @@ class BehaviorDetectionService:
                                 if websocket_callback:
                                     websocket_callback({
                                         'type': 'statistics_update',
+                                        'stream_id': stream_id,
                                         'statistics': stats_data
                                     })
                                 last_stats_time = current_time
 
-                # 在发送帧之前最后一次检查停止标志（按照标准实现）
-                if self.should_stop_realtime:
-                    print("🎥 在发送帧前收到停止信号，退出...")
+                # 在发送帧之前最后一次检查停止标志
+                if session.should_stop:
+                    print(f"🎥 流 {stream_id} 在发送帧前收到停止信号，退出...")
                     return  # 直接返回，结束生成器
 
                 # 编码为JPEG
                 ret, buffer = cv2.imencode('.jpg', img)
                 if ret:
                     frame = buffer.tobytes()
-
-                    # 在yield前再次检查停止标志
-                    if self.should_stop_realtime:
-                        print("🎥 在yield前收到停止信号，退出...")
-                        return
-
                     yield (b'--frame\r\n'
                            b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+                    cap.record_output()
 
                     # yield后立即检查停止标志
-                    if self.should_stop_realtime:
-                        print("🎥 在yield后收到停止信号，退出...")
+                    if session.should_stop:
+                        print(f"🎥 流 {stream_id} 在yield后收到停止信号，退出...")
                         return
 
-                # 控制帧率 - 在sleep期间也检查停止标志（按照标准实现）
-                for i in range(33):  # 分解sleep为多个小间隔，便于快速响应停止信号
-                    if self.should_stop_realtime:
-                        print(f"🎥 在帧率控制期间({i}/33)收到停止信号，退出...")
-                        return  # 直接返回，结束生成器
-                    # 使用__import__确保获取正确的time模块
-                    __import__('time').sleep(0.001)  # 1ms * 33 = 33ms ≈ 30FPS
+                # 控制帧率 - 只睡眠到下一帧截止时间，等待期间收到停止信号立即返回
+                if pacer.wait():
+                    print(f"🎥 流 {stream_id} 在帧率控制期间收到停止信号，退出...")
+                    return
 
         except Exception as e:
-            print(f"🎥 生成视频帧时出错: {e}")
+            print(f"🎥 流 {stream_id} 生成视频帧时出错: {e}")
+            session.status = 'failed'
         finally:
-            # 按照标准实现进行资源清理
-            print("🎥 正在清理资源...")
-            self.is_running = False  # 按照标准实现重置运行状态
+            print(f"🎥 流 {stream_id} 正在清理资源...")
+            session.stop_event.set()
 
-            # 强制释放摄像头资源
             try:
                 if 'clip_queue' in locals():
-                    clip_queue.put(None)  # 停止工作线程
-                    print("🎥 工作线程停止信号已发送")
+                    clip_queue.put_nowait(None)  # 停止工作线程
             except Exception as e:
                 print(f"🎥 停止工作线程时出错: {e}")
 
-            try:
-                if 'cap' in locals() and cap is not None:
-                    print(f"🎥 释放摄像头资源...")
-                    cap.release()  # 释放视频捕获资源
-                    print("🎥 摄像头资源已释放")
-
-                    # 强制等待一段时间确保资源完全释放
-                    time.sleep(0.2)
-                    print("🎥 摄像头资源释放完成")
-                else:
-                    print("🎥 警告：摄像头对象不存在或已为None")
-            except Exception as cleanup_error:
-                print(f"🎥 释放摄像头资源时出错: {cleanup_error}")
+            if self.yolo_broker is not None:
+                self.yolo_broker.unregister_stream(stream_id)
+            if self.action_service is not None:
+                self.action_service.drop_source(stream_id)
 
-            try:
-                if 'original_cwd' in locals():
-                    os.chdir(original_cwd)
-                    print("🎥 工作目录已恢复")
-            except Exception as e:
-                print(f"🎥 恢复工作目录时出错: {e}")
+            # 释放本会话的视频源并注销会话
+            self.stream_sessions.close(session)
+            print(f"🎥 流 {stream_id} 检测器已停止")
+
+    def stop_stream(self, stream_id: str) -> bool:
+        """
+        停止单路实时流，不影响其他流
+
+        Args:
+            stream_id: 流ID
+
+        Returns:
+            bool: 流是否存在
+        """
+        # 观看者ID：只断开该观看者，流水线继续为其他观看者运行
+        if self.broadcasts.detach(stream_id):
+            return True
 
-            print("🎥 检测器已停止")
-            print(f"🎥 最终状态 - should_stop: {self.should_stop_realtime}, is_running: {self.is_running}")
+        stopped = self.stream_sessions.stop(stream_id)
+        with self.task_lock:
+            if stream_id in self.current_tasks and self.current_tasks[stream_id]['status'] == 'running':
+                self.current_tasks[stream_id]['status'] = 'stopped'
+                stopped = True
+        return stopped
+
+    def list_streams(self) -> List[Dict[str, Any]]:
+        """获取所有实时流会话的状态（含YOLO推理排队延迟和观看者）"""
+        streams = []
+        for session in self.stream_sessions.list():
+            stream = session.to_dict()
+            if self.yolo_broker is not None:
+                stream['yolo_queue'] = self.yolo_broker.get_stream_stats(session.stream_id)
+            broadcaster = self.broadcasts.get_by_stream(session.stream_id)
+            if broadcaster is not None:
+                stream['broadcast'] = broadcaster.to_dict()
+            streams.append(stream)
+        return streams
+
+    def get_stream_statistics(self, stream_id: str) -> Optional[Dict[str, Any]]:
+        """获取单路实时流的统计数据"""
+        session = self.stream_sessions.get(stream_id)
+        return session.stats.get_statistics() if session else None
 
     def stop_realtime_detection(self, task_id: str) -> bool:
         """
@@ -676,27 +843,15 @@ class BehaviorDetectionService:
         Returns:
             bool: 是否成功停止
         """
-        with self.task_lock:
-            if task_id in self.current_tasks:
-                self.current_tasks[task_id]['status'] = 'stopped'
-                return True
-        return False
+        return self.stop_stream(task_id)
 
     def stop_realtime_monitoring(self):
-        """停止所有实时监控 - 按照标准实现逻辑"""
+        """停止所有实时监控"""
         print("🛑 SERVICE: Stopping monitoring...")
-        print(f"🛑 停止前状态 - should_stop: {self.should_stop_realtime}, is_running: {self.is_running}")
 
-        # 按照标准实现设置状态标志
-        self.should_stop_realtime = True  # 对应标准实现的should_stop
-        self.is_running = False  # 按照标准实现设置运行状态
-        self.stop_event.set()  # 设置停止事件
-
-        print(f"🛑 停止后状态 - should_stop: {self.should_stop_realtime}, is_running: {self.is_running}")
-
-        # 强制等待一小段时间，确保生成器有机会检查停止标志
-        time.sleep(0.1)
-        print("🛑 停止信号已发送，等待生成器响应...")
+        # 通知所有流会话停止
+        stopped = self.stream_sessions.stop_all()
+        print(f"🛑 已通知 {stopped} 路实时流停止")
 
         # 停止所有当前任务
         with self.task_lock:
@@ -705,10 +860,8 @@ class BehaviorDetectionService:
                     self.current_tasks[task_id]['status'] = 'stopped'
                     print(f"🛑 停止任务: {task_id}")
 
-        # 显示活跃流信息
-        print(f"🛑 当前活跃流数量: {len(self.active_streams)}")
-        for stream_id, stream_info in self.active_streams.items():
-            print(f"🛑 活跃流: {stream_id} - 摄像头: {stream_info['camera_id']}")
+        # 强制等待一小段时间，确保生成器有机会检查停止标志
+        time.sleep(0.1)
 
         # 🔧 新增：强制释放所有摄像头资源
         self._force_release_cameras()
@@ -741,14 +894,24 @@ class BehaviorDetectionService:
         except Exception as e:
             print(f"🎥 强制释放摄像头时出错: {e}")
 
-    def stop_monitoring(self):
-        """停止实时监控 - 标准接口（按照分析文档的标准实现）"""
-        print("🛑 SERVICE: Stopping monitoring...")
-        print(f"🛑 当前状态检查 - is_running: {getattr(self, 'is_running', False)}, should_stop: {getattr(self, 'should_stop_realtime', False)}")
+    def stop_monitoring(self, stream_id: str = None) -> bool:
+        """
+        停止实时监控 - 标准接口
+
+        Args:
+            stream_id: 流ID，为空时停止所有流
 
-        # 无论是否有活跃检测器，都发送停止信号
+        Returns:
+            bool: 是否有流被停止
+        """
+        if stream_id:
+            print(f"🛑 SERVICE: Stopping stream {stream_id}...")
+            return self.stop_stream(stream_id)
+
+        print(f"🛑 SERVICE: Stopping all monitoring, active streams: {len(self.stream_sessions)}")
         self.stop_realtime_monitoring()  # 调用具体的停止逻辑
         print("🛑 SERVICE: Stop signal sent.")
+        return True
 
     def get_task_status(self, task_id: str) -> Dict[str, Any]:
         """
@@ -763,270 +926,906 @@ class BehaviorDetectionService:
         with self.task_lock:
             return self.current_tasks.get(task_id, {'status': 'not_found'})
     
+    def _is_task_stopped(self, task_id: str) -> bool:
+        """检查任务是否已被外部停止"""
+        with self.task_lock:
+            return task_id in self.current_tasks and self.current_tasks[task_id]['status'] == 'stopped'
+
+    def _open_video_writer(self, config) -> Tuple[Any, int, int]:
+        """
+        创建输出视频写入器 - 修复编解码器问题
+
+        Args:
+            config: 检测参数（成功时会把 config.output 改写为实际输出路径）
+
+        Returns:
+            Tuple: (VideoWriter或None, 宽度, 高度)
+        """
+        video = cv2.VideoCapture(config.input)
+        width, height = int(video.get(3)), int(video.get(4))
+        fps = int(video.get(cv2.CAP_PROP_FPS)) or 25
+        video.release()
+
+        if not config.output:
+            return None, width, height
+
+        # 确保输出目录存在
+        os.makedirs(os.path.dirname(config.output), exist_ok=True)
+
+        # 使用浏览器兼容的MP4格式，优先尝试H.264编解码器
+        output_mp4 = config.output.replace('.avi', '.mp4')
+
+        # 尝试不同的编解码器，优先使用浏览器兼容性最好的
+        codecs_to_try = [
+            ('avc1', 'H.264 (最佳浏览器兼容性)'),
+            ('h264', 'H.264'),
+            ('mp4v', 'MPEG-4'),
+        ]
+
+        outputvideo = None
+        used_codec = None
+
+        for codec, desc in codecs_to_try:
+            try:
+                fourcc = cv2.VideoWriter_fourcc(*codec)
+                test_writer = cv2.VideoWriter(output_mp4, fourcc, fps, (width, height))
+
+                if test_writer.isOpened():
+                    outputvideo = test_writer
+                    used_codec = f"{codec} ({desc})"
+                    config.output = output_mp4
+                    print(f"✓ 使用 {used_codec} 编解码器输出: {output_mp4}")
+                    break
+                else:
+                    test_writer.release()
+            except Exception as e:
+                print(f"⚠ {codec} 编解码器失败: {e}")
+                continue
+
+        # 如果所有MP4编解码器都失败，回退到AVI
+        if not outputvideo or not outputvideo.isOpened():
+            print("⚠ 所有MP4编解码器失败，回退到AVI格式")
+            fourcc = cv2.VideoWriter_fourcc(*'XVID')
+            outputvideo = cv2.VideoWriter(config.output, fourcc, fps, (width, height))
+            if outputvideo.isOpened():
+                used_codec = "XVID (AVI)"
+                print(f"✓ 使用 {used_codec} 编解码器")
+            else:
+                print("❌ 所有视频编解码器都失败")
+                outputvideo = None
+
+        return outputvideo, width, height
+
+    def _detect_frame(self, img, config) -> Optional[Any]:
+        """
+        对单帧执行YOLO检测
+
+        Returns:
+            ndarray或None: (N, 6) 的 [x1, y1, x2, y2, conf, cls]，无目标时返回None
+        """
+        return self._detect_batch([img], config)[0]
+
+    def _detect_batch(self, imgs: List[Any], config, crops: List[Optional[Tuple[int, int, int, int]]] = None
+                      ) -> List[Optional[Any]]:
+        """
+        对多帧执行一次批量YOLO检测
+
+        Args:
+            imgs: BGR帧列表
+            config: 检测参数
+            crops: 每帧的裁剪矩形 (x1, y1, x2, y2)，None表示整帧检测；结果会映射回整帧坐标
+
+        Returns:
+            List: 与输入顺序一致的每帧检测结果，格式同 _detect_frame
+        """
+        if not imgs:
+            return []
+
+        crops = crops or [None] * len(imgs)
+        inputs = [
+            img if crop is None else np.ascontiguousarray(img[crop[1]:crop[3], crop[0]:crop[2]])
+            for img, crop in zip(imgs, crops)
+        ]
+
+        yolo_results = self.yolo_model.predict(
+            source=inputs if len(inputs) > 1 else inputs[0],
+            imgsz=config.imsize,
+            device=config.device,
+            verbose=False
+        )
+
+        preds = []
+        for yolo_result, crop in zip(yolo_results, crops):
+            boxes = yolo_result.boxes
+            if len(boxes) == 0:
+                preds.append(None)
+                continue
+
+            pred_xyxy = boxes.xyxy.cpu().numpy()
+            if crop is not None:
+                pred_xyxy += np.array([crop[0], crop[1], crop[0], crop[1]], dtype=pred_xyxy.dtype)
+            pred_conf = boxes.conf.cpu().numpy().reshape(-1, 1)
+            pred_cls = boxes.cls.cpu().numpy().reshape(-1, 1)
+            preds.append(np.hstack((pred_xyxy, pred_conf, pred_cls)))
+        return preds
+
+    def _iter_frame_batches(self, cap, task_id: Optional[str], batch_size: int = 1,
+                            stop_event: threading.Event = None,
+                            scheduler: KeyframeScheduler = None,
+                            first_frame: int = 1, last_frame: Optional[int] = None,
+                            clip_slots: threading.Semaphore = None):
+        """
+        按批次读取视频帧
+
+        每读一帧立即检查clip是否凑满，因此clip与帧的对应关系和逐帧处理完全一致。
+        clip是环形缓冲区的零拷贝视图，在整批读完后才被使用，cap 的 clip_banks 至少需要
+        ClipRingBuffer.banks_for(batch_size, clip_len)。
+
+        Args:
+            first_frame: 第一帧的帧号（调用方需已将视频定位到该帧）
+            last_frame: 最后一帧的帧号（包含），None表示读到视频结尾
+            clip_slots: 尚未用完的clip名额（clip_banks-1个），取clip前获取一个，
+                        使用方用完clip后释放；为None时不限制
+
+        Yields:
+            List[Dict]: 帧数据列表，每项包含 frame_number、img、clip（未凑满时为None）
+                        以及 keyframe（预判该帧为关键帧，检测阶段提前运行YOLO；
+                        最终由跟踪时的 _track_packet 判定）
+        """
+        batch_size = max(1, int(batch_size))
+        frame_number = first_frame - 1
+        batch = []
+        while not cap.end and (last_frame is None or frame_number < last_frame):
+            # 检查任务是否被停止
+            if self._is_task_stopped(task_id) or (stop_event is not None and stop_event.is_set()):
+                if stop_event is not None:
+                    stop_event.set()
+                return
+
+            ret, img = cap.read()
+            if not ret:
+                continue
+
+            frame_number += 1
+            clip = None
+            if cap.clip_ready():
+                # 等待较早的clip用完，保证接下来写入的bank上没有仍在使用的视图
+                if clip_slots is not None and not self._acquire_clip_slot(clip_slots, task_id, stop_event):
+                    return
+                clip = cap.get_video_clip()
+            keyframe = scheduler.plan_keyframe(frame_number) if scheduler else True
+            batch.append({'frame_number': frame_number, 'img': img, 'clip': clip, 'keyframe': keyframe})
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    def _acquire_clip_slot(self, clip_slots: threading.Semaphore, task_id: Optional[str],
+                           stop_event: threading.Event = None) -> bool:
+        """获取一个clip名额，等待期间响应任务停止；停止时返回False"""
+        while not clip_slots.acquire(timeout=0.1):
+            if self._is_task_stopped(task_id) or (stop_event is not None and stop_event.is_set()):
+                if stop_event is not None:
+                    stop_event.set()
+                return False
+        return True
+
+    def _detect_packets(self, batch: List[Dict], config):
+        """对一批帧中预判为关键帧的帧执行批量YOLO检测，结果写入每帧的 pred 字段"""
+        keyframe_packets = [packet for packet in batch if packet.get('keyframe', True)]
+        preds = self._detect_batch([packet['img'] for packet in keyframe_packets], config)
+        for packet in batch:
+            packet['pred'] = None
+        for packet, pred in zip(keyframe_packets, preds):
+            packet['pred'] = pred
+
+    def _track_packet(self, packet: Dict, last_tracks, scheduler: KeyframeScheduler = None, config=None):
+        """
+        跟踪单帧：关键帧使用检测结果更新DeepSort，非关键帧仅做卡尔曼预测
+
+        是否为关键帧在这里按帧顺序判定，此时之前各帧的跟踪结果都已反馈给调度器，
+        与解码时的预判无关；预判漏掉的关键帧在这里补做单帧检测（需要 config）。
+
+        Returns:
+            ndarray: 该帧的跟踪结果
+        """
+        planned = packet.get('keyframe', True)
+        keyframe = scheduler.is_keyframe(packet['frame_number'], planned) if scheduler else planned
+        if not keyframe:
+            outputs = self.deepsort_tracker.propagate()
+            return outputs if len(outputs) else np.ones((0, 8)).astype(np.float32)
+
+        pred = packet['pred'] if planned else self._detect_frame(packet['img'], config)
+        tracks = self._track_frame(pred, packet['img'], last_tracks)
+        if scheduler:
+            scheduler.observe(tracks)
+        return tracks
+
+    def _track_frame(self, pred, img, last_tracks):
+        """
+        使用DeepSort跟踪单帧检测结果
+
+        Args:
+            pred: _detect_frame 的输出
+            img: 原始BGR帧
+            last_tracks: 上一帧的跟踪结果（本帧无检测目标时沿用）
+
+        Returns:
+            ndarray: (N, 8) 的 [x1, y1, x2, y2, cls, track_id, vx, vy]
+        """
+        if pred is None:
+            return last_tracks
+
+        xywh = np.hstack(((pred[:, 0:2] + pred[:, 2:4]) / 2, pred[:, 2:4] - pred[:, 0:2]))
+        temp = deepsort_update(self.deepsort_tracker, pred, xywh, img)
+        return temp if len(temp) else np.ones((0, 8)).astype(np.float32)
+
+    def _classify_clip(self, clip, tracks, config, id_to_ava_labels: Dict[int, str]):
+        """
+        对一个clip执行SlowFast行为识别并更新行为标签映射
+
+        Args:
+            clip: (C, T, H, W) 视频片段
+            tracks: 当前帧的跟踪结果
+            config: 检测参数
+            id_to_ava_labels: 跟踪ID到行为标签的映射（原地更新）
+        """
+        # 只识别调度器选出的人员目标（新目标、快速运动目标和到期的稳定目标）
+        scheduler = getattr(config, 'action_scheduler', None)
+        if scheduler is not None:
+            tracks = scheduler.select(tracks)
+        if tracks.shape[0] == 0:
+            return
+
+        try:
+            # 与其他任务和实时流的clip合并为一批推理
+            source_id = getattr(config, 'task_id', None) or 'video'
+            track_ids, pred_labels = self._recognize_actions(source_id, clip, tracks, config.action_profile)
+            if scheduler is not None:
+                scheduler.record(track_ids, pred_labels)
+
+            # 更新行为标签映射
+            for tid, avalabel in zip(track_ids, pred_labels):
+                if avalabel < len(self.ava_labelnames):
+                    id_to_ava_labels[int(tid)] = self.ava_labelnames[avalabel + 1]
+
+            print(f"✓ SlowFast检测到{len(pred_labels)}个行为，更新标签映射")
+
+        except ClipOverwrittenError:
+            # clip缓冲区bank数不足属于编程错误，不能当作普通识别失败忽略
+            raise
+        except Exception as e:
+            print(f"SlowFast处理错误: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _render_frame(self, img, tracks, id_to_ava_labels: Dict[int, str],
+                      frame_number: int) -> Tuple[Any, List[Dict]]:
+        """
+        绘制单帧检测结果并生成结果记录
+
+        Returns:
+            Tuple: (绘制后的图像, 本帧检测结果列表)
+        """
+        frame_results = self._build_frame_results(tracks, id_to_ava_labels, frame_number)
+        return self._draw_frame_results(img, frame_results, frame_number), frame_results
+
+    def _build_frame_results(self, tracks, id_to_ava_labels: Dict[int, str],
+                             frame_number: int) -> List[Dict]:
+        """
+        根据跟踪结果和行为标签生成单帧检测结果记录
+
+        Returns:
+            List[Dict]: 本帧检测结果列表
+        """
+        frame_results = []
+        for detection in tracks:
+            if len(detection) >= 7:
+                class_id = int(detection[4])  # 这是YOLO的类别ID
+                track_id = int(detection[5])  # 这是DeepSort的跟踪ID
+                confidence = float(detection[6])
+
+                # 映射YOLO类别ID到类别名称
+                object_type = 'unknown'
+                if 0 <= class_id < len(self.coco_names):
+                    object_type = self.coco_names[class_id]
+
+                # 获取最新的行为标签
+                behavior_type = id_to_ava_labels.get(track_id, 'walking')
+
+                frame_results.append({
+                    'frame_number': frame_number,
+                    'timestamp': frame_number / 25.0,
+                    'object_id': track_id,
+                    'object_type': object_type,
+                    'confidence': confidence,
+                    'bbox': {
+                        'x1': float(detection[0]),
+                        'y1': float(detection[1]),
+                        'x2': float(detection[2]),
+                        'y2': float(detection[3])
+                    },
+                    'behavior_type': behavior_type,
+                    'is_anomaly': self._is_anomaly_behavior(behavior_type)
+                })
+
+        return frame_results
+
+    def _draw_frame_results(self, img, frame_results: List[Dict], frame_number: int):
+        """
+        在帧上绘制检测结果
+
+        Returns:
+            绘制后的图像副本
+        """
+        # 创建可视化图像 - 在行为识别完成后绘制
+        vis_img = img.copy()
+        cv2.putText(vis_img, f'Frame: {frame_number}',
+                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+        for result in frame_results:
+            bbox = result['bbox']
+            x1, y1, x2, y2 = int(bbox['x1']), int(bbox['y1']), int(bbox['x2']), int(bbox['y2'])
+            behavior_type = result['behavior_type']
+
+            # 绘制边界框
+            color = (0, 0, 255) if result['is_anomaly'] else (0, 255, 0)
+            cv2.rectangle(vis_img, (x1, y1), (x2, y2), color, 2)
+
+            # 绘制对象标签（包含行为信息）
+            label1 = f"ID:{result['object_id']} {result['object_type']}"
+            label2 = f"Action: {behavior_type}"  # 使用英文避免中文乱码
+
+            cv2.putText(vis_img, label1, (x1, y1-25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+            cv2.putText(vis_img, label2, (x1, y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+        return vis_img
+
+    def _write_video_frame(self, outputvideo, vis_img, width: int, height: int, frame_number: int):
+        """写入视频帧（修复帧格式问题）"""
+        if not outputvideo or not outputvideo.isOpened():
+            return
+
+        # 确保帧尺寸正确
+        if vis_img.shape[:2] != (height, width):
+            vis_img = cv2.resize(vis_img, (width, height))
+
+        # 确保帧格式正确（BGR）
+        if len(vis_img.shape) == 3 and vis_img.shape[2] == 3:
+            success = outputvideo.write(vis_img)
+            if not success:
+                print(f"⚠ 写入视频帧失败: 帧 {frame_number}, 尺寸: {vis_img.shape}")
+        else:
+            print(f"⚠ 帧格式错误: {vis_img.shape}")
+            # 转换为BGR格式
+            if len(vis_img.shape) == 2:
+                vis_img = cv2.cvtColor(vis_img, cv2.COLOR_GRAY2BGR)
+            outputvideo.write(vis_img)
+
+    def _release_video_outputs(self, cap, outputvideo, config):
+        """释放视频读写资源并检查输出文件"""
+        if cap:
+            cap.release()
+        if outputvideo:
+            outputvideo.release()
+
+            # 检查输出文件
+            if os.path.exists(config.output):
+                file_size = os.path.getsize(config.output)
+                print(f"✓ 视频保存成功: {config.output} ({file_size} bytes)")
+            else:
+                print(f"❌ 输出文件未生成: {config.output}")
+
+    def _describe_tracks(self, img, tracks) -> Dict[int, Dict[str, Any]]:
+        """
+        提取跟踪目标的边界框和ReID特征，用于分段边界的跟踪ID衔接
+
+        Returns:
+            Dict: 跟踪ID -> {'bbox': [x1, y1, x2, y2], 'feature': ReID特征列表或None}
+        """
+        described = {}
+        if len(tracks) == 0:
+            return described
+
+        # 直接从BGR帧裁剪，只对裁剪图做颜色转换
+        crops, crop_ids = [], []
+        for detection in tracks:
+            x1, y1, x2, y2 = int(detection[0]), int(detection[1]), int(detection[2]), int(detection[3])
+            track_id = int(detection[5])
+            described[track_id] = {'bbox': [float(x1), float(y1), float(x2), float(y2)], 'feature': None}
+            crop = img[max(y1, 0):y2, max(x1, 0):x2]
+            if crop.size > 0:
+                crops.append(crop)
+                crop_ids.append(track_id)
+
+        if crops:
+            features = self.deepsort_tracker.extractor(crops, bgr=True)
+            for track_id, feature in zip(crop_ids, features):
+                described[track_id]['feature'] = feature.tolist()
+        return described
+
+    def detect_segment(self, job: Dict[str, Any], stop_event=None, progress_queue=None) -> Dict[str, Any]:
+        """
+        处理视频中的一个时间段（分段并行模式的工作进程调用）
+
+        从 start_frame - warmup_frames 开始读取，预热帧只用于建立跟踪器和行为标签状态，
+        [start_frame, end_frame] 内的检测结果逐行写入 results_path（JSON Lines）。
+
+        Args:
+            job: 分段任务，包含 input、imsize、options、action_profile、segment_index、start_frame、
+                 end_frame、warmup_frames、results_path
+            stop_event: 跨进程停止事件
+            progress_queue: 跨进程进度队列（放入本批处理的帧数）
+
+        Returns:
+            Dict: 分段信息，head/tail 为边界帧上的跟踪目标描述，track_ids 为按首次出现排序的跟踪ID
+        """
+        original_cwd = os.getcwd()
+        os.chdir(yolo_slowfast_path)
+
+        cap = None
+        try:
+            config = type('Config', (), {})()
+            config.input = job['input']
+            config.task_id = f"segment_{job['segment_index']}"
+            config.action_scheduler = ActionScheduler(**self.action_schedule)
+            config.imsize = job.get('imsize', self.input_size)
+            config.device = self.device
+            options = job.get('options') or {}
+            config.action_profile = resolve_action_profile(job.get('action_profile', self.action_profile))
+
+            start_frame, end_frame = job['start_frame'], job['end_frame']
+            first_frame = max(1, start_frame - job.get('warmup_frames', 0))
+
+            # 每个分段使用全新的跟踪器
+            self.deepsort_tracker.reset()
+            scheduler = KeyframeScheduler.from_options(options)
+
+            # 整批读完后才识别批内的clip，bank数需覆盖一个批次
+            batch_size = options.get('yolo_batch_size', 1)
+            clip_len = config.action_profile['clip_len']
+            cap = MyVideoCapture(config.input, clip_len=clip_len,
+                                 clip_banks=ClipRingBuffer.banks_for(batch_size, clip_len))
+            if first_frame > 1:
+                cap.cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame - 1)
+
+            id_to_ava_labels = {}
+            tracks = np.ones((0, 8)).astype(np.float32)
+            head, track_ids = {}, []
+            seen_ids = set()
+            last_img, last_tracks = None, tracks
+
+            with open(job['results_path'], 'w', encoding='utf-8') as f:
+                for batch in self._iter_frame_batches(cap, None, batch_size,
+                                                      stop_event, scheduler, first_frame, end_frame):
+                    self._detect_packets(batch, config)
+
+                    for packet in batch:
+                        frame_number = packet['frame_number']
+                        tracks = self._track_packet(packet, tracks, scheduler, config)
+                        if packet['clip'] is not None:
+                            self._classify_clip(packet['clip'], tracks, config, id_to_ava_labels)
+
+                        if frame_number < start_frame:
+                            # 预热阶段最后一帧与前一分段的最后一帧是同一帧
+                            if frame_number == start_frame - 1:
+                                head = self._describe_tracks(packet['img'], tracks)
+                            continue
+
+                        for result in self._build_frame_results(tracks, id_to_ava_labels, frame_number):
+                            f.write(json.dumps(result) + '\n')
+                            if result['object_id'] not in seen_ids:
+                                seen_ids.add(result['object_id'])
+                                track_ids.append(result['object_id'])
+                        last_img, last_tracks = packet['img'], tracks
+
+                    if progress_queue is not None:
+                        progress_queue.put(len(batch))
+
+            tail = self._describe_tracks(last_img, last_tracks) if last_img is not None else {}
+            print(f"✓ 分段 {job['segment_index']} 完成: 帧 {start_frame}-{end_frame}, {len(track_ids)} 个跟踪目标")
+
+            return {
+                'segment_index': job['segment_index'],
+                'start_frame': start_frame,
+                'end_frame': end_frame,
+                'results_path': job['results_path'],
+                'head': head,
+                'tail': tail,
+                'track_ids': track_ids
+            }
+
+        finally:
+            if cap:
+                cap.release()
+            os.chdir(original_cwd)
+
+    def _run_detection_parallel(self, config, task_id: str, progress_callback: callable = None) -> List[Dict]:
+        """
+        分段并行模式执行检测
+
+        视频按clip边界切分为多个分段，由进程池中的工作进程分别检测（各自加载模型），
+        之后统一跟踪ID、按帧顺序合并结果，并在主进程中一次性绘制输出视频。
+        """
+        results = []
+        temp_dir = None
+        cap = None
+        outputvideo = None
+
+        try:
+            video = cv2.VideoCapture(config.input)
+            total_frames = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+            video.release()
+
+            num_segments = max(1, int(config.parallel_segments))
+            clip_len = config.action_profile['clip_len']
+            segments = plan_segments(total_frames, num_segments, clip_len=clip_len)
+            warmup_frames = clip_len
+            print(f"✓ 分段并行检测: {len(segments)} 个分段, 每段预热 {warmup_frames} 帧")
+
+            temp_dir = tempfile.mkdtemp(prefix=f'{task_id}_segments_')
+            service_config = {
+                'device': self.device,
+                'input_size': self.input_size,
+                'confidence_threshold': self.confidence_threshold,
+                'alert_behaviors': self.alert_behaviors
+            }
+            jobs = []
+            for index, (start_frame, end_frame) in enumerate(segments):
+                jobs.append({
+                    'service_config': service_config,
+                    'input': config.input,
+                    'imsize': config.imsize,
+                    'options': getattr(config, 'options', {}),
+                    'action_profile': config.action_profile,
+                    'segment_index': index,
+                    'start_frame': start_frame,
+                    'end_frame': end_frame,
+                    'warmup_frames': warmup_frames if index > 0 else 0,
+                    'results_path': os.path.join(temp_dir, f'segment_{index}.jsonl')
+                })
+
+            # 检测阶段占总进度的90%，剩余10%为合并绘制输出视频
+            total_work = sum(job['end_frame'] - job['start_frame'] + 1 + job['warmup_frames'] for job in jobs)
+
+            def on_progress(processed_frames):
+                if progress_callback and total_work > 0:
+                    progress_callback(task_id, min(processed_frames / total_work, 1.0) * 90)
+
+            workers = int(getattr(config, 'parallel_workers', 0) or len(jobs))
+            segment_outputs = run_segments(
+                jobs, max_workers=min(workers, len(jobs)),
+                should_stop=lambda: self._is_task_stopped(task_id),
+                on_progress=on_progress
+            )
+            id_maps = reconcile_track_ids(segment_outputs)
+
+            # 按帧顺序合并结果并绘制输出视频
+            outputvideo, width, height = self._open_video_writer(config)
+            cap = cv2.VideoCapture(config.input)
+            merged_frames = iter_merged_frames(segment_outputs, id_maps)
+            next_frame = next(merged_frames, None)
+            frame_number = 0
+            while True:
+                ret, img = cap.read()
+                if not ret or self._is_task_stopped(task_id):
+                    break
+
+                frame_number += 1
+                frame_results = []
+                if next_frame is not None and next_frame[0] == frame_number:
+                    frame_results = next_frame[1]
+                    next_frame = next(merged_frames, None)
+
+                self._collect_results(config, results, frame_results)
+                if outputvideo:
+                    vis_img = self._draw_frame_results(img, frame_results, frame_number)
+                    self._write_video_frame(outputvideo, vis_img, width, height, frame_number)
+
+                if progress_callback and total_frames > 0 and frame_number % 25 == 0:
+                    progress_callback(task_id, 90 + (frame_number / total_frames) * 10)
+
+            self._release_video_outputs(cap, outputvideo, config)
+
+        except Exception as e:
+            print(f"分段并行检测过程错误: {e}")
+            import traceback
+            print(f"错误堆栈: {traceback.format_exc()}")
+
+            try:
+                if cap:
+                    cap.release()
+            except:
+                pass
+
+            try:
+                if outputvideo:
+                    outputvideo.release()
+            except:
+                pass
+
+            return []
+
+        finally:
+            if temp_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return results
+
+    def _collect_results(self, config, results: List[Dict], frame_results: List[Dict]):
+        """收集一帧的检测结果：配置了结果写入通道时流式写出，否则累积到内存列表"""
+        result_sink = getattr(config, 'result_sink', None)
+        if result_sink is not None:
+            result_sink.emit(frame_results)
+        else:
+            results.extend(frame_results)
+
+    def _record_keyframe_stats(self, task_id: str, scheduler: KeyframeScheduler):
+        """记录关键帧调度统计到任务信息"""
+        if not scheduler.enabled:
+            return
+        stats = scheduler.get_stats()
+        print(f"✓ 关键帧检测: {stats['keyframes']} 帧检测, {stats['skipped_frames']} 帧卡尔曼预测")
+        if stats['promoted_keyframes'] or stats['discarded_detections']:
+            print(f"  - 预判偏差: 补做检测 {stats['promoted_keyframes']} 帧, "
+                  f"丢弃检测 {stats['discarded_detections']} 帧")
+        with self.task_lock:
+            if task_id in self.current_tasks:
+                self.current_tasks[task_id]['keyframe_stats'] = stats
+
     def _run_detection(self, config, task_id: str, progress_callback: callable = None) -> List[Dict]:
         """
         执行检测的核心逻辑（基于现有算法）
         """
+        if getattr(config, 'parallel_segments', 0) > 1:
+            return self._run_detection_parallel(config, task_id, progress_callback)
+
+        if getattr(config, 'pipeline', False):
+            return self._run_detection_pipelined(config, task_id, progress_callback)
+
         results = []
-        
+        cap = None
+        outputvideo = None
+
         try:
             # 使用现有的main函数逻辑，但进行了修改以支持回调
-            cap = MyVideoCapture(config.input)
+            # 整批读完后才识别批内的clip，bank数需覆盖一个批次
+            batch_size = getattr(config, 'batch_size', 1)
+            clip_len = config.action_profile['clip_len']
+            cap = MyVideoCapture(config.input, clip_len=clip_len,
+                                 clip_banks=ClipRingBuffer.banks_for(batch_size, clip_len))
             id_to_ava_labels = {}
-            
+            tracks = np.ones((0, 8)).astype(np.float32)
+
             total_frames = int(cap.cap.get(cv2.CAP_PROP_FRAME_COUNT))
             processed_frames = 0
-            
-            # 设置输出视频 - 修复编解码器问题
-            outputvideo = None
-            if config.output:
-                video = cv2.VideoCapture(config.input)
-                width, height = int(video.get(3)), int(video.get(4))
-                fps = int(video.get(cv2.CAP_PROP_FPS)) or 25
-                video.release()
-                
-                # 确保输出目录存在
-                os.makedirs(os.path.dirname(config.output), exist_ok=True)
-                
-                # 使用浏览器兼容的MP4格式，优先尝试H.264编解码器
-                output_mp4 = config.output.replace('.avi', '.mp4')
-                
-                # 尝试不同的编解码器，优先使用浏览器兼容性最好的
-                codecs_to_try = [
-                    ('avc1', 'H.264 (最佳浏览器兼容性)'),
-                    ('h264', 'H.264'),
-                    ('mp4v', 'MPEG-4'),
-                ]
-                
-                outputvideo = None
-                used_codec = None
-                
-                for codec, desc in codecs_to_try:
-                    try:
-                        fourcc = cv2.VideoWriter_fourcc(*codec)
-                        test_writer = cv2.VideoWriter(output_mp4, fourcc, fps, (width, height))
-                        
-                        if test_writer.isOpened():
-                            outputvideo = test_writer
-                            used_codec = f"{codec} ({desc})"
-                            config.output = output_mp4
-                            print(f"✓ 使用 {used_codec} 编解码器输出: {output_mp4}")
-                            break
-                        else:
-                            test_writer.release()
-                    except Exception as e:
-                        print(f"⚠ {codec} 编解码器失败: {e}")
-                        continue
-                
-                # 如果所有MP4编解码器都失败，回退到AVI
-                if not outputvideo or not outputvideo.isOpened():
-                    print("⚠ 所有MP4编解码器失败，回退到AVI格式")
-                    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-                    outputvideo = cv2.VideoWriter(config.output, fourcc, fps, (width, height))
-                    if outputvideo.isOpened():
-                        used_codec = "XVID (AVI)"
-                        print(f"✓ 使用 {used_codec} 编解码器")
-                    else:
-                        print("❌ 所有视频编解码器都失败")
-                        outputvideo = None
-            
-            while not cap.end:
-                ret, img = cap.read()
-                if not ret:
-                    continue
-                
-                processed_frames += 1
-                
-                # YOLO检测
-                yolo_results = self.yolo_model.predict(
-                    source=img, 
-                    imgsz=config.imsize, 
-                    device=config.device, 
-                    verbose=False
-                )
-                boxes = yolo_results[0].boxes
-                
-                # 处理检测结果
-                if len(boxes) > 0:
-                    pred_xyxy = boxes.xyxy.cpu().numpy()
-                    pred_conf = boxes.conf.cpu().numpy().reshape(-1, 1)
-                    pred_cls = boxes.cls.cpu().numpy().reshape(-1, 1)
-                    
-                    pred = np.hstack((pred_xyxy, pred_conf, pred_cls))
-                    xywh = np.hstack(((pred[:, 0:2] + pred[:, 2:4]) / 2, pred[:, 2:4] - pred[:, 0:2]))
-                    
-                    # DeepSort跟踪
-                    temp = deepsort_update(self.deepsort_tracker, pred, xywh, img)
-                    temp = temp if len(temp) else np.ones((0, 8)).astype(np.float32)
-                    
-                                    # 行为识别（SlowFast） - 先进行行为识别再绘制视频帧
-                if len(cap.stack) == 25:
-                    clip = cap.get_video_clip()
-                    if temp.shape[0] > 0:
-                        try:
-                            # 获取边界框位置（前4列）
-                            boxes = temp[:, 0:4].astype(np.float32)
-                            track_ids = temp[:, 5].astype(np.int32)  # 跟踪ID在第5列
-                            
-                            inputs, inp_boxes, _ = ava_inference_transform(clip, boxes, crop_size=config.imsize)
-                            
-                            # 修复数据类型问题
-                            inp_boxes = inp_boxes.float()  # 确保为float类型
-                            inp_boxes = torch.cat([torch.zeros(inp_boxes.shape[0], 1), inp_boxes], dim=1)
-                            
-                            if isinstance(inputs, list):
-                                inputs = [inp.unsqueeze(0).to(self.device) for inp in inputs]
-                            else:
-                                inputs = inputs.unsqueeze(0).to(self.device)
-                            
-                            with torch.no_grad():
-                                slowfaster_preds = self.video_model(inputs, inp_boxes.to(self.device))
-                            
-                            # 获取预测结果
-                            pred_labels = torch.argmax(slowfaster_preds.cpu(), axis=1).numpy()
-                            
-                            # 更新行为标签映射
-                            for tid, avalabel in zip(track_ids, pred_labels):
-                                if avalabel < len(self.ava_labelnames):
-                                    id_to_ava_labels[int(tid)] = self.ava_labelnames[avalabel + 1]
-                                    
-                            print(f"✓ SlowFast检测到{len(pred_labels)}个行为，更新标签映射")
-                            
-                        except Exception as e:
-                            print(f"SlowFast处理错误: {e}")
-                            import traceback
-                            traceback.print_exc()
-
-                # 创建可视化图像 - 在行为识别完成后绘制
-                vis_img = img.copy()
-                cv2.putText(vis_img, f'Frame: {processed_frames}', 
-                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                
-                # 存储检测结果并绘制（包含最新的行为信息）
-                for detection in temp:
-                    if len(detection) >= 7:
-                        x1, y1, x2, y2 = int(detection[0]), int(detection[1]), int(detection[2]), int(detection[3])
-                        class_id = int(detection[4])  # 这是YOLO的类别ID
-                        track_id = int(detection[5])  # 这是DeepSort的跟踪ID
-                        confidence = float(detection[6])
-                        
-                        # 映射YOLO类别ID到类别名称
-                        object_type = 'unknown'
-                        if 0 <= class_id < len(self.coco_names):
-                            object_type = self.coco_names[class_id]
-                        
-                        # 获取最新的行为标签
-                        behavior_type = id_to_ava_labels.get(track_id, 'walking')
-                        
-                        # 绘制边界框
-                        color = (0, 0, 255) if self._is_anomaly_behavior(behavior_type) else (0, 255, 0)
-                        cv2.rectangle(vis_img, (x1, y1), (x2, y2), color, 2)
-                        
-                        # 绘制对象标签（包含行为信息）
-                        label1 = f"ID:{track_id} {object_type}"
-                        label2 = f"Action: {behavior_type}"  # 使用英文避免中文乱码
-                        
-                        cv2.putText(vis_img, label1, (x1, y1-25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                        cv2.putText(vis_img, label2, (x1, y1-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                        
-                        result = {
-                            'frame_number': processed_frames,
-                            'timestamp': processed_frames / 25.0,
-                            'object_id': track_id,
-                            'object_type': object_type,
-                            'confidence': confidence,
-                            'bbox': {
-                                'x1': float(detection[0]),
-                                'y1': float(detection[1]),
-                                'x2': float(detection[2]),
-                                'y2': float(detection[3])
-                            },
-                            'behavior_type': behavior_type,
-                            'is_anomaly': self._is_anomaly_behavior(behavior_type)
-                        }
-                        results.append(result)
-                
-                # 写入视频帧（修复帧格式问题）
-                if outputvideo and outputvideo.isOpened():
-                    # 确保帧尺寸正确
-                    if vis_img.shape[:2] != (height, width):
-                        vis_img = cv2.resize(vis_img, (width, height))
-                    
-                    # 确保帧格式正确（BGR）
-                    if len(vis_img.shape) == 3 and vis_img.shape[2] == 3:
-                        success = outputvideo.write(vis_img)
-                        if not success:
-                            print(f"⚠ 写入视频帧失败: 帧 {processed_frames}, 尺寸: {vis_img.shape}")
-                    else:
-                        print(f"⚠ 帧格式错误: {vis_img.shape}")
-                        # 转换为BGR格式
-                        if len(vis_img.shape) == 2:
-                            vis_img = cv2.cvtColor(vis_img, cv2.COLOR_GRAY2BGR)
-                        success = outputvideo.write(vis_img)
-                
+
+            # 设置输出视频
+            outputvideo, width, height = self._open_video_writer(config)
+
+            scheduler = KeyframeScheduler.from_options(getattr(config, 'options', None))
+
+            for batch in self._iter_frame_batches(cap, task_id, batch_size, scheduler=scheduler):
+                # YOLO批量检测（仅预判的关键帧，跟踪时按帧顺序判定，漏掉的补做检测）
+                self._detect_packets(batch, config)
+
+                for packet in batch:
+                    img = packet['img']
+                    processed_frames = packet['frame_number']
+
+                    # DeepSort跟踪（按帧顺序，非关键帧使用卡尔曼预测）
+                    tracks = self._track_packet(packet, tracks, scheduler, config)
+
+                    # 行为识别（SlowFast） - 先进行行为识别再绘制视频帧
+                    if packet['clip'] is not None:
+                        self._classify_clip(packet['clip'], tracks, config, id_to_ava_labels)
+
+                    # 绘制并存储检测结果（包含最新的行为信息）
+                    vis_img, frame_results = self._render_frame(img, tracks, id_to_ava_labels, processed_frames)
+                    self._collect_results(config, results, frame_results)
+
+                    # 写入视频帧
+                    self._write_video_frame(outputvideo, vis_img, width, height, processed_frames)
+
                 # 更新进度
                 if progress_callback and total_frames > 0:
                     progress = (processed_frames / total_frames) * 100
                     progress_callback(task_id, progress)
-                
-                # 检查任务是否被停止
-                with self.task_lock:
-                    if task_id in self.current_tasks and self.current_tasks[task_id]['status'] == 'stopped':
-                        break
-            
+
+            self._record_keyframe_stats(task_id, scheduler)
+
             # 清理资源
-            cap.release()
-            if outputvideo:
-                outputvideo.release()
-            
-                # 检查输出文件
-                if os.path.exists(config.output):
-                    file_size = os.path.getsize(config.output)
-                    print(f"✓ 视频保存成功: {config.output} ({file_size} bytes)")
-                else:
-                    print(f"❌ 输出文件未生成: {config.output}")
-            
+            self._release_video_outputs(cap, outputvideo, config)
+
         except Exception as e:
             print(f"检测过程错误: {e}")
             import traceback
             print(f"错误堆栈: {traceback.format_exc()}")
-            
+
             # 确保资源清理
             try:
-                if 'cap' in locals() and cap:
+                if cap:
                     cap.release()
             except:
                 pass
-            
+
             try:
-                if 'outputvideo' in locals() and outputvideo:
+                if outputvideo:
                     outputvideo.release()
             except:
                 pass
-            
+
             # 返回错误信息而不是重新抛出异常
             return []
-        
+
         return results
-    
-    def _run_realtime_detection(self, config, task_id: str, websocket_callback: callable = None):
+
+    def _run_detection_pipelined(self, config, task_id: str, progress_callback: callable = None) -> List[Dict]:
         """
-        执行实时检测的核心逻辑
+        流水线模式执行检测
+
+        解码、检测、跟踪、行为识别、绘制、编码分别运行在独立线程中，
+        阶段之间使用有界队列连接。每个阶段单线程顺序处理，
+        因此输出顺序和每个跟踪目标的行为标签与顺序执行模式一致。
+        自适应步长时检测阶段只按解码时的预判提前检测，关键帧由跟踪阶段按帧顺序判定，
+        预判漏掉的关键帧在跟踪阶段补做检测，检测的帧与逐帧顺序执行相同。
+
+        内存上界（以帧为单位，1080p每帧约6MB）：clip环形缓冲区固定为
+        banks×clip_len 帧，banks = banks_for(batch_size, clip_len) + 1，与队列长度无关；
+        解码阶段最多领先行为识别阶段 banks-1 个clip，已取出未识别的clip超过该数量时解码等待。
+        队列中的数据项每帧持有一张原图或绘制后的图像，最多 (5×queue_size+6)×batch_size 帧。
         """
+        results = []
+        cap = None
+        outputvideo = None
+
         try:
-            cap = MyVideoCapture(config.input)
+            # clip是环形缓冲区的零拷贝视图：bank数只覆盖一个批次外加一个clip的余量，
+            # 解码阶段通过clip名额等待行为识别阶段用完较早的clip，而不是按队列中可能排队的帧数预分配
+            queue_size = getattr(config, 'queue_size', self.pipeline_queue_size)
+            batch_size = getattr(config, 'batch_size', 1)
+            inflight_frames = (3 * queue_size + 4) * batch_size
+            clip_len = config.action_profile['clip_len']
+            clip_banks = min(ClipRingBuffer.banks_for(batch_size, clip_len) + 1,
+                             ClipRingBuffer.banks_for(inflight_frames, clip_len))
+            clip_slots = threading.Semaphore(clip_banks - 1)
+            cap = MyVideoCapture(config.input, clip_len=clip_len, clip_banks=clip_banks)
+            total_frames = int(cap.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            outputvideo, width, height = self._open_video_writer(config)
+
+            stop_event = threading.Event()
+            scheduler = KeyframeScheduler.from_options(getattr(config, 'options', None))
             id_to_ava_labels = {}
+            state = {'tracks': np.ones((0, 8)).astype(np.float32)}
+
+            # 流水线中每个数据项是一批连续帧，批量大小为1时即逐帧处理
+            def detect_stage(batch):
+                self._detect_packets(batch, config)
+                return batch
+
+            def track_stage(batch):
+                for packet in batch:
+                    state['tracks'] = self._track_packet(packet, state['tracks'], scheduler, config)
+                    packet.pop('pred')
+                    packet['tracks'] = state['tracks']
+                return batch
+
+            def action_stage(batch):
+                for packet in batch:
+                    tracks = packet['tracks']
+                    clip = packet.pop('clip')
+                    if clip is not None:
+                        try:
+                            self._classify_clip(clip, tracks, config, id_to_ava_labels)
+                        finally:
+                            clip_slots.release()
+                    # 记录该帧绘制时可见的行为标签快照，后续阶段不再读取共享映射
+                    packet['labels'] = {
+                        int(tid): id_to_ava_labels[int(tid)]
+                        for tid in tracks[:, 5] if int(tid) in id_to_ava_labels
+                    }
+                return batch
+
+            def render_stage(batch):
+                for packet in batch:
+                    packet['vis_img'], packet['results'] = self._render_frame(
+                        packet.pop('img'), packet['tracks'], packet['labels'], packet['frame_number'])
+                return batch
+
+            def encode_stage(batch):
+                for packet in batch:
+                    frame_number = packet['frame_number']
+                    self._write_video_frame(outputvideo, packet['vis_img'], width, height, frame_number)
+                    self._collect_results(config, results, packet['results'])
+
+                # 更新进度
+                if progress_callback and total_frames > 0:
+                    progress_callback(task_id, (frame_number / total_frames) * 100)
+                return None
+
+            executor = PipelineExecutor(
+                'decode',
+                self._iter_frame_batches(cap, task_id, batch_size, stop_event, scheduler,
+                                         clip_slots=clip_slots),
+                [
+                    ('detect', detect_stage),
+                    ('track', track_stage),
+                    ('action', action_stage),
+                    ('render', render_stage),
+                    ('encode', encode_stage),
+                ],
+                queue_size=queue_size,
+                stop_event=stop_event
+            )
+            pipeline_stats = executor.run()
+
+            print(f"✓ 流水线执行完成，瓶颈阶段: {executor.bottleneck()}")
+            for stage_name, stage_stats in pipeline_stats.items():
+                print(f"  - {stage_name}: 占用率 {stage_stats['occupancy']:.1%}, "
+                      f"处理 {stage_stats['items']} 项, 耗时 {stage_stats['busy_s']}s")
+
+            with self.task_lock:
+                if task_id in self.current_tasks:
+                    self.current_tasks[task_id]['pipeline_stats'] = pipeline_stats
+            self._record_keyframe_stats(task_id, scheduler)
+
+            self._release_video_outputs(cap, outputvideo, config)
+
+        except Exception as e:
+            print(f"流水线检测过程错误: {e}")
+            import traceback
+            print(f"错误堆栈: {traceback.format_exc()}")
+
+            try:
+                if cap:
+                    cap.release()
+            except:
+                pass
+
+            try:
+                if outputvideo:
+                    outputvideo.release()
+            except:
+                pass
+
+            return []
+
+        return results
+
+    def _run_realtime_detection(self, config, session: StreamSession, websocket_callback: callable = None):
+        """
+        执行实时检测的核心逻辑
+
+        Args:
+            config: 检测参数
+            session: 流会话（独立的跟踪器、clip缓冲、行为标签、停止信号和统计）
+            websocket_callback: WebSocket回调函数
+        """
+        task_id = session.stream_id
+        try:
+            cap = LatestFrameCapture(config.input, clip_len=session.action_profile['clip_len'])
+            session.cap = cap
+            session.status = 'running'
+            id_to_ava_labels = session.id_to_ava_labels
             frame_count = 0
 
-            # 🔧 新增：初始化实时统计服务
-            realtime_stats = get_realtime_statistics(self.alert_behaviors)
-            realtime_stats.reset()  # 重置统计数据
+            # 本会话的实时统计
+            realtime_stats = session.stats
+            self.get_yolo_broker().register_stream(task_id)
 
             # 统计相关变量
             last_stats_time = time.time()
             stats_interval = 2.0  # 每2秒推送一次统计数据
+
+            pacer = FramePacer(self.realtime_target_fps, session.stop_event)
+            session.pacer = pacer
+            session.motion_gate = MotionGate(**self.get_motion_gate_config(session.source))
+            session.action_scheduler = ActionScheduler(**self.action_schedule)
+            self._apply_zones(session)
             
-            while not cap.end:
+            while not cap.end and not session.should_stop:
                 # 检查任务状态
                 with self.task_lock:
                     if task_id in self.current_tasks and self.current_tasks[task_id]['status'] != 'running':
@@ -1037,30 +1836,15 @@ class BehaviorDetectionService:
                     continue
                 
                 frame_count += 1
+                session.frame_count = frame_count
                 
-                # YOLO检测
-                yolo_results = self.yolo_model.predict(
-                    source=img, 
-                    imgsz=config.imsize, 
-                    device=config.device, 
-                    verbose=False
-                )
-                boxes = yolo_results[0].boxes
+                # YOLO检测（与其他流的帧合并为一批推理），运动门控判定画面无变化时跳过
+                temp = self._realtime_track(session, img)
+                zone_events = self._update_zone_events(session, temp, frame_count, img)
                 
                 # 处理检测结果
                 detections = []
-                if len(boxes) > 0:
-                    pred_xyxy = boxes.xyxy.cpu().numpy()
-                    pred_conf = boxes.conf.cpu().numpy().reshape(-1, 1)
-                    pred_cls = boxes.cls.cpu().numpy().reshape(-1, 1)
-                    
-                    pred = np.hstack((pred_xyxy, pred_conf, pred_cls))
-                    xywh = np.hstack(((pred[:, 0:2] + pred[:, 2:4]) / 2, pred[:, 2:4] - pred[:, 0:2]))
-                    
-                    # DeepSort跟踪
-                    temp = deepsort_update(self.deepsort_tracker, pred, xywh, img)
-                    temp = temp if len(temp) else np.ones((0, 8)).astype(np.float32)
-                    
+                if temp is not None:
                     # 格式化检测结果
                     for detection in temp:
                         if len(detection) >= 7:
@@ -1082,22 +1866,19 @@ class BehaviorDetectionService:
                             detections.append(detection_data)
                     
                     # 行为识别（SlowFast）
-                    if len(cap.stack) == 25:
-                        clip = cap.get_video_clip()
-                        if temp.shape[0] > 0:
+                    if cap.clip_ready():
+                        # 只识别调度器选出的人员目标，没有需要识别的目标时跳过整段clip
+                        roi_tracks = session.action_scheduler.select(self._zone_rois(session, temp, img))
+                        if roi_tracks.shape[0] == 0:
+                            cap.skip_video_clip()
+                        else:
                             try:
-                                inputs, inp_boxes, _ = ava_inference_transform(clip, temp[:, 0:4], crop_size=config.imsize)
-                                inp_boxes = torch.cat([torch.zeros(inp_boxes.shape[0], 1), inp_boxes], dim=1)
-                                
-                                if isinstance(inputs, list):
-                                    inputs = [inp.unsqueeze(0).to(config.device) for inp in inputs]
-                                else:
-                                    inputs = inputs.unsqueeze(0).to(config.device)
-                                
-                                with torch.no_grad():
-                                    slowfaster_preds = self.video_model(inputs, inp_boxes.to(config.device))
-                                
-                                for tid, avalabel in zip(temp[:, 5].tolist(), np.argmax(slowfaster_preds.cpu(), axis=1).tolist()):
+                                # 采集线程会继续写入环形缓冲，推理期间持有独立副本
+                                clip = cap.get_video_clip(copy=True)
+                                track_ids, pred_labels = self._recognize_actions(task_id, clip, roi_tracks, session.action_profile)
+                                session.action_scheduler.record(track_ids, pred_labels)
+
+                                for tid, avalabel in zip(track_ids, pred_labels):
                                     behavior = self.ava_labelnames[avalabel + 1]
                                     id_to_ava_labels[tid] = behavior
                                     
@@ -1111,8 +1892,7 @@ class BehaviorDetectionService:
                 
                 # 🔧 新增：更新实时统计数据
                 current_time = time.time()
-                frame_processing_time = current_time - (current_time - 0.04)  # 估算处理时间
-                realtime_stats.update_frame_stats(fps=25.0, processing_time=frame_processing_time)
+                realtime_stats.update_frame_stats(fps=pacer.achieved_fps, processing_time=pacer.last_work_time)
 
                 if detections:
                     realtime_stats.add_detections(detections)
@@ -1126,6 +1906,7 @@ class BehaviorDetectionService:
                         'timestamp': current_time,
                         'detections': detections
                     })
+                cap.record_output()
 
                 # 检查异常行为并发送报警
                 for detection in detections:
@@ -1137,6 +1918,30 @@ class BehaviorDetectionService:
                             'detection': detection
                         })
 
+                # 区域进出事件：推送事件，属于报警行为的同时作为报警
+                if zone_events and websocket_callback:
+                    websocket_callback({
+                        'type': 'zone_event',
+                        'task_id': task_id,
+                        'events': zone_events
+                    })
+                    for event in zone_events:
+                        if event['event'] in self.alert_behaviors:
+                            websocket_callback({
+                                'type': 'alert',
+                                'task_id': task_id,
+                                'alert_type': event['event'],
+                                'detection': {
+                                    'frame_number': event['frame_number'],
+                                    'timestamp': event['timestamp'],
+                                    'object_id': event['object_id'],
+                                    'behavior_type': event['event'],
+                                    'confidence': 1.0,
+                                    'zone_id': event['zone_id'],
+                                    'zone_name': event['zone_name']
+                                }
+                            })
+
                 # 🔧 新增：定期推送统计数据
                 if current_time - last_stats_time >= stats_interval and websocket_callback:
                     stats_data = realtime_stats.get_statistics()
@@ -1147,15 +1952,249 @@ class BehaviorDetectionService:
                     })
                     last_stats_time = current_time
 
-                # 控制帧率
-                time.sleep(0.04)  # 约25 FPS
-            
-            # 清理资源
-            cap.release()
+                # 控制帧率：只睡眠到下一帧截止时间，等待期间收到停止信号立即退出
+                if pacer.wait():
+                    break
             
         except Exception as e:
             print(f"实时检测错误: {e}")
             raise e
+        finally:
+            if self.yolo_broker is not None:
+                self.yolo_broker.unregister_stream(task_id)
+            if self.action_service is not None:
+                self.action_service.drop_source(task_id)
+
+    def get_yolo_broker(self) -> DynamicBatchBroker:
+        """
+        获取实时流共享的YOLO推理代理（首次调用时创建）
+
+        Returns:
+            DynamicBatchBroker: 推理代理
+        """
+        with self._broker_lock:
+            if self.yolo_broker is None:
+                def detect_batch(items):
+                    # 每批推理时读取当前的输入尺寸和设备；每项为 (帧, 检测区域裁剪矩形)
+                    config = type('Config', (), {})()
+                    config.imsize = self.input_size
+                    config.device = self.device
+                    return self._detect_batch([item[0] for item in items], config,
+                                              crops=[item[1] for item in items])
+
+                self.yolo_broker = DynamicBatchBroker(
+                    detect_batch,
+                    max_batch_size=self.yolo_broker_max_batch,
+                    max_wait_ms=self.yolo_broker_max_wait_ms,
+                    name='yolo-broker'
+                )
+                print(f"✓ YOLO推理代理已启动: max_batch_size={self.yolo_broker_max_batch}, "
+                      f"max_wait_ms={self.yolo_broker_max_wait_ms}")
+            return self.yolo_broker
+
+    def _realtime_detect(self, session: StreamSession, img) -> Optional[Any]:
+        """
+        通过推理代理检测实时流的一帧
+
+        配置了检测区域时只在区域的外接矩形内推理，脚点不在任何区域内的检测在跟踪前丢弃。
+
+        Returns:
+            ndarray或None: 格式同 _detect_frame
+        """
+        zones = session.zones
+        height, width = img.shape[:2]
+        crop = zones.crop_rect(width, height) if zones else None
+
+        pred = self.get_yolo_broker().submit(session.stream_id, (img, crop))
+        if pred is None or not zones:
+            return pred
+        pred = zones.filter(pred, width, height)
+        return pred if pred.shape[0] else None
+
+    def _realtime_track(self, session: StreamSession, img) -> Optional[Any]:
+        """
+        实时流一帧的检测和跟踪
+
+        运动门控判定画面无变化且没有活跃目标时跳过YOLO和外观特征提取，
+        跟踪器按"无检测"推进一帧，未确认和已丢失目标照常老化；YOLO未检测到目标时同样如此。
+
+        Returns:
+            ndarray或None: (N, 8) 跟踪结果；YOLO未检测到目标时为None
+        """
+        gate = session.motion_gate
+        if gate is not None and not gate.should_detect(img, session.tracker.has_active_tracks()):
+            temp = session.tracker.skip_frame()
+            return temp if len(temp) else np.ones((0, 8)).astype(np.float32)
+
+        pred = self._realtime_detect(session, img)
+        if pred is None:
+            # 没有检测结果也按"无检测"推进跟踪器，否则离开画面的目标一直被视为活跃，门控无法再关闭
+            session.tracker.skip_frame()
+            return None
+
+        xywh = np.hstack(((pred[:, 0:2] + pred[:, 2:4]) / 2, pred[:, 2:4] - pred[:, 0:2]))
+        temp = deepsort_update(session.tracker, pred, xywh, img)
+        return temp if len(temp) else np.ones((0, 8)).astype(np.float32)
+
+    def get_motion_gate_config(self, source: Any = None) -> Dict[str, Any]:
+        """
+        获取运动门控参数
+
+        Args:
+            source: 摄像头/视频源，为空时返回默认参数
+
+        Returns:
+            Dict: 合并了该摄像头覆盖项的参数
+        """
+        params = dict(self.motion_gate_defaults)
+        if source is not None:
+            params.update(self.motion_gate_cameras.get(str(source), {}))
+        return params
+
+    def set_motion_gate_config(self, params: Dict[str, Any], source: Any = None) -> Dict[str, Any]:
+        """
+        更新运动门控参数并应用到运行中的流
+
+        Args:
+            params: 门控参数（enabled、threshold、pixel_threshold、downscale_width、max_gated_frames）
+            source: 摄像头/视频源，为空时更新默认参数
+
+        Returns:
+            Dict: 更新后的参数
+        """
+        params = {key: value for key, value in params.items() if key in DEFAULT_MOTION_GATE}
+        # 先校验参数类型，非法参数不写入配置
+        MotionGate(**{**self.get_motion_gate_config(source), **params})
+        if source is None:
+            self.motion_gate_defaults.update(params)
+        else:
+            self.motion_gate_cameras.setdefault(str(source), {}).update(params)
+
+        for session in self.stream_sessions.list():
+            if session.motion_gate is not None and (source is None or str(session.source) == str(source)):
+                session.motion_gate.configure(**self.get_motion_gate_config(session.source))
+
+        print(f"✓ 更新运动门控参数: {source if source is not None else '默认'} -> {params}")
+        return self.get_motion_gate_config(source)
+
+    def set_zones(self, source: Any, zones: List[Dict[str, Any]]):
+        """
+        设置视频源的检测区域并应用到该源运行中的流
+
+        Args:
+            source: 摄像头/视频源
+            zones: 启用的区域列表（每项包含 id、name、points）
+        """
+        self.zones_by_source[str(source)] = list(zones)
+        for session in self.stream_sessions.list():
+            if str(session.source) == str(source):
+                self._apply_zones(session)
+        print(f"✓ 视频源 {source} 的检测区域已更新: {len(zones)} 个")
+
+    def _apply_zones(self, session: StreamSession):
+        """按会话的视频源设置检测区域和进出事件跟踪"""
+        zone_set = ZoneSet(self.zones_by_source.get(str(session.source), []))
+        session.zones = zone_set if zone_set else None
+        session.zone_events = ZoneEventTracker(zone_set) if zone_set else None
+
+    def _zone_rois(self, session: StreamSession, tracks, img):
+        """区域外的目标不参与行为识别"""
+        if not session.zones:
+            return tracks
+        return session.zones.filter(tracks, img.shape[1], img.shape[0])
+
+    def _update_zone_events(self, session: StreamSession, tracks, frame_number: int, img) -> List[Dict[str, Any]]:
+        """
+        根据本帧跟踪结果更新区域进出状态
+
+        Returns:
+            List[Dict]: 本帧产生的 enter / exit 事件
+        """
+        if session.zone_events is None:
+            return []
+        height, width = img.shape[:2]
+        tracks = tracks if tracks is not None else np.ones((0, 8)).astype(np.float32)
+        events = session.zone_events.update(tracks, frame_number, width, height)
+        for event in events:
+            event['stream_id'] = session.stream_id
+            event['timestamp'] = time.time()
+        return events
+
+    def get_yolo_broker_stats(self) -> Dict[str, Any]:
+        """获取YOLO推理代理的批处理和排队延迟统计"""
+        if self.yolo_broker is None:
+            return {
+                'max_batch_size': self.yolo_broker_max_batch,
+                'max_wait_ms': self.yolo_broker_max_wait_ms,
+                'batches': 0
+            }
+        return self.yolo_broker.get_stats()
+
+    def get_action_service(self):
+        """
+        获取共享的SlowFast批量行为识别服务（首次调用时创建）
+
+        Returns:
+            ActionRecognitionService: 行为识别服务
+        """
+        if self.action_service is not None:
+            return self.action_service
+
+        with self._action_lock:
+            if self.action_service is None:
+                from .action_recognition import ActionRecognitionService
+                self.action_service = ActionRecognitionService(
+                    self.video_model, self.device,
+                    max_batch_clips=self.action_max_batch_clips,
+                    max_batch_boxes=self.action_max_batch_boxes,
+                    max_wait_ms=self.action_max_wait_ms
+                )
+                print(f"✓ 行为识别服务已启动: max_batch_clips={self.action_max_batch_clips}, "
+                      f"max_batch_boxes={self.action_max_batch_boxes}, max_wait_ms={self.action_max_wait_ms}")
+            return self.action_service
+
+    def _recognize_actions(self, source_id: str, clip, tracks,
+                           profile: Dict[str, Any]) -> Tuple[List[int], List[int]]:
+        """
+        预处理clip并提交给共享的行为识别服务，阻塞等待本clip的结果
+
+        Args:
+            source_id: 来源ID（流ID或任务ID），用于在各来源之间公平调度
+            clip: (C, T, H, W) 视频片段
+            tracks: 跟踪结果，前4列为边界框，第6列为跟踪ID
+            profile: 行为识别配置档（crop_size、num_frames、alpha）
+
+        Returns:
+            Tuple: (跟踪ID列表, 预测类别下标列表)
+        """
+        from .action_recognition import ActionJob
+
+        boxes = tracks[:, 0:4].astype(np.float32)
+        track_ids = tracks[:, 5].astype(np.int32).tolist()  # 跟踪ID在第6列
+
+        inputs, inp_boxes, _ = ava_inference_transform(
+            clip, boxes,
+            num_frames=profile['num_frames'],
+            crop_size=profile['crop_size'],
+            slow_fast_alpha=profile['alpha']
+        )
+        if not isinstance(inputs, list):
+            inputs = [inputs]
+
+        job = ActionJob(source_id, inputs, inp_boxes, track_ids)
+        pred_labels = self.get_action_service().classify(job)
+        return track_ids, pred_labels
+
+    def get_action_service_stats(self) -> Dict[str, Any]:
+        """获取行为识别服务的批处理统计"""
+        if self.action_service is None:
+            return {
+                'max_batch_clips': self.action_max_batch_clips,
+                'max_batch_boxes': self.action_max_batch_boxes,
+                'max_wait_ms': self.action_max_wait_ms,
+                'batches': 0
+            }
+        return self.action_service.get_stats()
     
     def _is_anomaly_behavior(self, behavior: str) -> bool:
         """
@@ -1214,6 +2253,66 @@ class BehaviorDetectionService:
             self.alert_behaviors = new_config['alert_behaviors']
             print(f"✓ 更新报警行为配置: {self.alert_behaviors}")
 
+        if 'pipeline_mode' in new_config:
+            self.pipeline_mode = bool(new_config['pipeline_mode'])
+            print(f"✓ 更新流水线模式: {self.pipeline_mode}")
+
+        if 'pipeline_queue_size' in new_config:
+            self.pipeline_queue_size = int(new_config['pipeline_queue_size'])
+            print(f"✓ 更新流水线队列长度: {self.pipeline_queue_size}")
+
+        if 'yolo_batch_size' in new_config:
+            self.yolo_batch_size = max(1, int(new_config['yolo_batch_size']))
+            print(f"✓ 更新YOLO批量大小: {self.yolo_batch_size}")
+
+        if 'parallel_segments' in new_config:
+            self.parallel_segments = int(new_config['parallel_segments'] or 0)
+            print(f"✓ 更新分段并行数: {self.parallel_segments}")
+
+        if 'yolo_broker_max_batch' in new_config or 'yolo_broker_max_wait_ms' in new_config:
+            self.yolo_broker_max_batch = max(1, int(new_config.get('yolo_broker_max_batch', self.yolo_broker_max_batch)))
+            self.yolo_broker_max_wait_ms = max(0.0, float(new_config.get('yolo_broker_max_wait_ms', self.yolo_broker_max_wait_ms)))
+            if self.yolo_broker is not None:
+                self.yolo_broker.set_params(self.yolo_broker_max_batch, self.yolo_broker_max_wait_ms)
+            print(f"✓ 更新YOLO推理代理: max_batch={self.yolo_broker_max_batch}, max_wait_ms={self.yolo_broker_max_wait_ms}")
+
+        if isinstance(new_config.get('action_schedule'), dict):
+            self.action_schedule.update({key: value for key, value in new_config['action_schedule'].items()
+                                         if key in DEFAULT_ACTION_SCHEDULE})
+            print(f"✓ 更新SlowFast识别调度参数（新启动的流和任务生效）: {self.action_schedule}")
+
+        if 'action_profile' in new_config:
+            resolve_action_profile(new_config['action_profile'])
+            self.action_profile = new_config['action_profile']
+            print(f"✓ 更新默认行为识别配置档（新启动的流和任务生效）: {self.action_profile}")
+
+        if 'selective_reid' in new_config or 'reid_refresh_interval' in new_config:
+            self.selective_reid = bool(new_config.get('selective_reid', self.selective_reid))
+            self.reid_refresh_interval = max(1, int(new_config.get('reid_refresh_interval', self.reid_refresh_interval)))
+            trackers = [self.deepsort_tracker] + [session.tracker for session in self.stream_sessions.list()]
+            for tracker in trackers:
+                if tracker is not None:
+                    tracker.selective_reid = self.selective_reid
+                    tracker.reid_refresh_interval = self.reid_refresh_interval
+            print(f"✓ 更新选择性ReID: enabled={self.selective_reid}, refresh_interval={self.reid_refresh_interval}")
+
+        if 'realtime_target_fps' in new_config:
+            self.realtime_target_fps = max(0.0, float(new_config['realtime_target_fps']))
+            for session in self.stream_sessions.list():
+                if session.pacer is not None:
+                    session.pacer.set_target_fps(self.realtime_target_fps)
+            print(f"✓ 更新实时流目标帧率: {self.realtime_target_fps}")
+
+        if any(key in new_config for key in ('action_max_batch_clips', 'action_max_batch_boxes', 'action_max_wait_ms')):
+            self.action_max_batch_clips = max(1, int(new_config.get('action_max_batch_clips', self.action_max_batch_clips)))
+            self.action_max_batch_boxes = max(1, int(new_config.get('action_max_batch_boxes', self.action_max_batch_boxes)))
+            self.action_max_wait_ms = max(0.0, float(new_config.get('action_max_wait_ms', self.action_max_wait_ms)))
+            if self.action_service is not None:
+                self.action_service.set_params(self.action_max_batch_clips, self.action_max_batch_boxes,
+                                               self.action_max_wait_ms)
+            print(f"✓ 更新行为识别服务: max_batch_clips={self.action_max_batch_clips}, "
+                  f"max_batch_boxes={self.action_max_batch_boxes}, max_wait_ms={self.action_max_wait_ms}")
+
         print(f"✓ 配置更新完成，当前配置: device={self.device}, confidence={self.confidence_threshold}, alert_behaviors={self.alert_behaviors}")
 
 
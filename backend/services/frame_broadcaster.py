@@ -0,0 +1,274 @@
+"""
+MJPEG帧广播模块
+每个视频源只运行一条采集+推理流水线，编码好的JPEG帧发布给任意数量的观看者；
+每个观看者有自己的有界队列，来不及取走的旧帧直接丢弃，
+观看者的连接和断开不会重启流水线
+"""
+import time
+import uuid
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class FrameSubscriber:
+    """一个观看者的帧队列"""
+
+    def __init__(self, viewer_id: str, broadcaster: 'FrameBroadcaster', queue_size: int = 2):
+        """
+        初始化观看者
+
+        Args:
+            viewer_id: 观看者ID
+            broadcaster: 所属的广播器
+            queue_size: 帧队列长度
+        """
+        self.viewer_id = viewer_id
+        self.broadcaster = broadcaster
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._closed = threading.Event()
+        self.delivered = 0
+        self.dropped = 0
+        self.joined_at = time.time()
+
+    def offer(self, frame: bytes):
+        """放入一帧，队列满时丢弃最旧的帧"""
+        while True:
+            try:
+                self._queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        """结束本观看者的帧流"""
+        self._closed.set()
+        self.offer(None)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def frames(self) -> Iterator[bytes]:
+        """
+        逐帧产出multipart数据，客户端断开时自动退订
+
+        Yields:
+            bytes: 一帧multipart数据
+        """
+        try:
+            while not self.closed:
+                try:
+                    frame = self._queue.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                if frame is None:
+                    break
+                self.delivered += 1
+                yield frame
+        finally:
+            self.broadcaster.unsubscribe(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'viewer_id': self.viewer_id,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'connected_for': round(time.time() - self.joined_at, 1)
+        }
+
+
+class FrameBroadcaster:
+    """单个视频源的帧广播器：后台线程消费帧生成器并分发给所有观看者"""
+
+    def __init__(self, key: str, session: Any, frames: Iterator[bytes], idle_timeout: float = 5.0,
+                 queue_size: int = 2, on_close: Callable[['FrameBroadcaster'], None] = None):
+        """
+        初始化广播器
+
+        Args:
+            key: 广播器键（视频源+模式）
+            session: 流水线对应的流会话（提供stop()和should_stop）
+            frames: 流水线产出的multipart帧生成器
+            idle_timeout: 最后一个观看者离开后继续运行的时间（秒），期间重连不重启流水线
+            queue_size: 每个观看者的帧队列长度
+            on_close: 流水线结束后的回调
+        """
+        self.key = key
+        self.session = session
+        self.idle_timeout = max(0.0, float(idle_timeout))
+        self.queue_size = queue_size
+        self._frames = frames
+        self._on_close = on_close
+
+        self._subscribers: Dict[str, FrameSubscriber] = {}
+        self._lock = threading.Lock()
+        self._idle_since: Optional[float] = time.time()
+        self.closed = False
+        self.published = 0
+
+        self._thread = threading.Thread(target=self._run, name=f'broadcast-{key}', daemon=True)
+        self._thread.start()
+
+    @property
+    def stream_id(self) -> str:
+        return self.session.stream_id
+
+    @property
+    def alive(self) -> bool:
+        return not self.closed and not self.session.should_stop
+
+    def subscribe(self, viewer_id: str) -> FrameSubscriber:
+        """
+        添加一个观看者
+
+        Raises:
+            RuntimeError: 广播器已结束时
+        """
+        with self._lock:
+            if not self.alive:
+                raise RuntimeError(f'视频流 {self.key} 已结束')
+            subscriber = FrameSubscriber(viewer_id, self, self.queue_size)
+            self._subscribers[viewer_id] = subscriber
+            self._idle_since = None
+        print(f"👀 观看者 {viewer_id} 加入视频流 {self.key}，当前观看人数: {len(self._subscribers)}")
+        return subscriber
+
+    def unsubscribe(self, subscriber: FrameSubscriber):
+        """移除观看者（不停止流水线）"""
+        subscriber._closed.set()
+        with self._lock:
+            if self._subscribers.get(subscriber.viewer_id) is not subscriber:
+                return
+            del self._subscribers[subscriber.viewer_id]
+            if not self._subscribers:
+                self._idle_since = time.time()
+        print(f"👀 观看者 {subscriber.viewer_id} 离开视频流 {self.key}，当前观看人数: {len(self._subscribers)}")
+
+    def get_subscriber(self, viewer_id: str) -> Optional[FrameSubscriber]:
+        with self._lock:
+            return self._subscribers.get(viewer_id)
+
+    def _publish(self, frame: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for subscriber in subscribers:
+            subscriber.offer(frame)
+        self.published += 1
+
+    def _idle_expired(self) -> bool:
+        with self._lock:
+            return self._idle_since is not None and time.time() - self._idle_since >= self.idle_timeout
+
+    def _run(self):
+        try:
+            for frame in self._frames:
+                self._publish(frame)
+                if self._idle_expired():
+                    print(f"📴 视频流 {self.key} 已无观看者超过 {self.idle_timeout} 秒，停止流水线")
+                    self.session.stop()
+                    break
+        except Exception as e:
+            print(f"❌ 视频流 {self.key} 广播出错: {e}")
+        finally:
+            try:
+                self._frames.close()
+            except Exception:
+                pass
+            with self._lock:
+                self.closed = True
+                subscribers = list(self._subscribers.values())
+                self._subscribers.clear()
+            for subscriber in subscribers:
+                subscriber.close()
+            if self._on_close:
+                self._on_close(self)
+            print(f"📴 视频流 {self.key} 广播结束，共发布 {self.published} 帧")
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            viewers = [subscriber.to_dict() for subscriber in self._subscribers.values()]
+        return {
+            'key': self.key,
+            'stream_id': self.stream_id,
+            'published': self.published,
+            'viewers': viewers
+        }
+
+
+class BroadcastHub:
+    """按视频源复用广播器的注册表"""
+
+    def __init__(self, idle_timeout: float = 5.0, queue_size: int = 2):
+        """
+        初始化注册表
+
+        Args:
+            idle_timeout: 无观看者后流水线继续运行的时间（秒）
+            queue_size: 每个观看者的帧队列长度
+        """
+        self.idle_timeout = idle_timeout
+        self.queue_size = queue_size
+        self._broadcasters: Dict[str, FrameBroadcaster] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key: str, start_pipeline: Callable[[], Any], viewer_id: str = None) -> FrameSubscriber:
+        """
+        订阅一个视频源，源尚未运行时启动流水线
+
+        同一viewer_id已在观看时先关闭旧连接（例如前端刷新页面）。
+
+        Args:
+            key: 视频源键
+            start_pipeline: 启动流水线的函数，返回 (流会话, 帧生成器)
+            viewer_id: 观看者ID，为空时自动生成
+
+        Returns:
+            FrameSubscriber: 观看者
+        """
+        viewer_id = viewer_id or f"viewer_{uuid.uuid4().hex[:8]}"
+        self.detach(viewer_id)
+
+        with self._lock:
+            broadcaster = self._broadcasters.get(key)
+            if broadcaster is None or not broadcaster.alive:
+                session, frames = start_pipeline()
+                broadcaster = FrameBroadcaster(key, session, frames, self.idle_timeout,
+                                               self.queue_size, on_close=self._remove)
+                self._broadcasters[key] = broadcaster
+            return broadcaster.subscribe(viewer_id)
+
+    def detach(self, viewer_id: str) -> bool:
+        """
+        断开一个观看者（流水线继续为其他观看者运行）
+
+        Returns:
+            bool: 观看者是否存在
+        """
+        for broadcaster in self.list():
+            subscriber = broadcaster.get_subscriber(viewer_id)
+            if subscriber is not None:
+                subscriber.close()
+                broadcaster.unsubscribe(subscriber)
+                return True
+        return False
+
+    def _remove(self, broadcaster: FrameBroadcaster):
+        with self._lock:
+            if self._broadcasters.get(broadcaster.key) is broadcaster:
+                del self._broadcasters[broadcaster.key]
+
+    def get_by_stream(self, stream_id: str) -> Optional[FrameBroadcaster]:
+        """按流水线的流ID查找广播器"""
+        for broadcaster in self.list():
+            if broadcaster.stream_id == stream_id:
+                return broadcaster
+        return None
+
+    def list(self) -> List[FrameBroadcaster]:
+        with self._lock:
+            return list(self._broadcasters.values())
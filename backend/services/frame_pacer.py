@@ -0,0 +1,107 @@
+"""
+帧率控制模块
+按目标输出帧率计算每帧的截止时间，只睡眠到下一个截止时间的剩余部分，
+等待期间收到停止信号立即返回，并统计实际帧率和帧间隔抖动
+"""
+import time
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class FramePacer:
+    """基于截止时间的帧率控制器"""
+
+    def __init__(self, target_fps: float = 30.0, stop_event: Optional[threading.Event] = None,
+                 window: int = 120):
+        """
+        初始化帧率控制器
+
+        Args:
+            target_fps: 目标输出帧率，<=0 表示不限速
+            stop_event: 停止信号，等待期间被设置时立即返回
+            window: 统计实际帧率和抖动的帧间隔窗口大小
+        """
+        self.stop_event = stop_event or threading.Event()
+        self.target_fps = 0.0
+        self.interval = 0.0
+        self.set_target_fps(target_fps)
+
+        self._deadline: Optional[float] = None
+        self._last_tick: Optional[float] = None
+        self._intervals = deque(maxlen=max(2, int(window)))
+        self.frames = 0
+        self.overruns = 0
+        self.last_work_time = 0.0
+
+    def set_target_fps(self, target_fps: float):
+        """调整目标帧率（下一帧生效）"""
+        self.target_fps = max(0.0, float(target_fps or 0))
+        self.interval = 1.0 / self.target_fps if self.target_fps > 0 else 0.0
+
+    def wait(self) -> bool:
+        """
+        一帧处理完成后调用：睡眠到下一帧的截止时间
+
+        Returns:
+            bool: 等待期间是否收到停止信号
+        """
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            self.last_work_time = now - self._last_tick
+
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.interval
+
+        remaining = self._deadline - now
+        if remaining > 0:
+            if self.stop_event.wait(remaining):
+                return True
+        else:
+            # 本帧处理超时：不追赶落下的帧，从当前时间重新计算截止时间
+            if self.interval > 0:
+                self.overruns += 1
+            self._deadline = now
+
+        tick = time.perf_counter()
+        if self._last_tick is not None:
+            self._intervals.append(tick - self._last_tick)
+        self._last_tick = tick
+        self.frames += 1
+        return self.stop_event.is_set()
+
+    @property
+    def achieved_fps(self) -> float:
+        """最近窗口内的实际帧率"""
+        if not self._intervals:
+            return 0.0
+        mean = sum(self._intervals) / len(self._intervals)
+        return 1.0 / mean if mean > 0 else 0.0
+
+    @property
+    def jitter_ms(self) -> float:
+        """最近窗口内帧间隔的标准差（毫秒）"""
+        count = len(self._intervals)
+        if count < 2:
+            return 0.0
+        mean = sum(self._intervals) / count
+        variance = sum((value - mean) ** 2 for value in self._intervals) / count
+        return math.sqrt(variance) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取帧率统计
+
+        Returns:
+            Dict: 目标帧率、实际帧率、抖动、超时帧数
+        """
+        return {
+            'target_fps': self.target_fps,
+            'achieved_fps': round(self.achieved_fps, 2),
+            'jitter_ms': round(self.jitter_ms, 2),
+            'frames': self.frames,
+            'overruns': self.overruns,
+            'last_work_ms': round(self.last_work_time * 1000, 2)
+        }
@@ -0,0 +1,234 @@
+"""
+跨流动态批处理推理模块
+多路实时流把待检测帧提交给同一个推理代理，代理在达到最大批量或等待超过截止时间后
+执行一次批量前向推理，再把每帧的结果交还给对应的流
+"""
+import time
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _InferenceRequest:
+    """一帧的推理请求"""
+
+    __slots__ = ('stream_id', 'item', 'enqueued_at', 'done', 'result', 'error', 'queue_wait')
+
+    def __init__(self, stream_id: str, item: Any):
+        self.stream_id = stream_id
+        self.item = item
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.queue_wait = 0.0
+
+
+class _StreamLatency:
+    """单路流的排队延迟统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_wait = 0.0  # 指数滑动平均
+
+    def add(self, wait: float):
+        self.requests += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_wait = wait if self.requests == 1 else 0.9 * self.recent_wait + 0.1 * wait
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'avg_queue_ms': round(self.total_wait / self.requests * 1000, 2) if self.requests else 0.0,
+            'recent_queue_ms': round(self.recent_wait * 1000, 2),
+            'max_queue_ms': round(self.max_wait * 1000, 2)
+        }
+
+
+class DynamicBatchBroker:
+    """
+    动态批处理推理代理
+
+    后台线程取到第一个请求后开始计时，直到凑满 max_batch_size、
+    每路已登记的流都提交了一帧，或等待超过 max_wait_ms，
+    然后调用一次 batch_fn 处理整批请求。
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 15.0, name: str = 'inference-broker'):
+        """
+        初始化推理代理
+
+        Args:
+            batch_fn: 批量推理函数，输入列表、返回等长的结果列表
+            max_batch_size: 单次推理的最大批量
+            max_wait_ms: 批内第一个请求的最长等待时间（毫秒）
+            name: 后台线程名称
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+
+        self._queue: queue.Queue = queue.Queue()
+        self._streams = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        # 统计
+        self._latency: Dict[str, _StreamLatency] = defaultdict(_StreamLatency)
+        self.batches = 0
+        self.batched_items = 0
+        self.inference_time = 0.0
+        self.batch_size_counts: Dict[int, int] = defaultdict(int)
+
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def register_stream(self, stream_id: str):
+        """登记一路会提交请求的流（用于判断是否还需要等待其他流）"""
+        with self._lock:
+            self._streams.add(stream_id)
+
+    def unregister_stream(self, stream_id: str):
+        """注销一路流"""
+        with self._lock:
+            self._streams.discard(stream_id)
+            self._latency.pop(stream_id, None)
+
+    def set_params(self, max_batch_size: int = None, max_wait_ms: float = None):
+        """调整最大批量和等待截止时间"""
+        if max_batch_size is not None:
+            self.max_batch_size = max(1, int(max_batch_size))
+        if max_wait_ms is not None:
+            self.max_wait_ms = max(0.0, float(max_wait_ms))
+        print(f"✓ 推理代理参数: max_batch_size={self.max_batch_size}, max_wait_ms={self.max_wait_ms}")
+
+    def submit(self, stream_id: str, item: Any, timeout: float = None) -> Any:
+        """
+        提交一个请求并阻塞等待结果
+
+        Args:
+            stream_id: 提交请求的流ID
+            item: 推理输入（如一帧图像）
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            Any: batch_fn 返回的对应结果
+
+        Raises:
+            RuntimeError: 代理已停止、推理失败或等待超时
+        """
+        if self._stopped.is_set():
+            raise RuntimeError('推理代理已停止')
+
+        request = _InferenceRequest(stream_id, item)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise RuntimeError('等待推理结果超时')
+        if request.error is not None:
+            raise RuntimeError(f'批量推理失败: {request.error}')
+        return request.result
+
+    def stop(self):
+        """停止后台线程，未处理的请求以错误返回"""
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+    def _collect_batch(self, first: _InferenceRequest) -> List[_InferenceRequest]:
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            # 每路流最多同时有一个请求在等待，所有流都到齐后无需再等
+            with self._lock:
+                expected = len(self._streams)
+            if expected and len({request.stream_id for request in batch}) >= expected:
+                break
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None or self._stopped.is_set():
+                if first is not None:
+                    first.error = RuntimeError('推理代理已停止')
+                    first.done.set()
+                break
+
+            batch = self._collect_batch(first)
+            started = time.perf_counter()
+            for request in batch:
+                request.queue_wait = started - request.enqueued_at
+
+            try:
+                results = self.batch_fn([request.item for request in batch])
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                print(f"❌ 批量推理失败: {e}")
+                for request in batch:
+                    request.error = e
+
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.batches += 1
+                self.batched_items += len(batch)
+                self.inference_time += elapsed
+                self.batch_size_counts[len(batch)] += 1
+                for request in batch:
+                    if request.stream_id in self._streams:
+                        self._latency[request.stream_id].add(request.queue_wait)
+
+            for request in batch:
+                request.done.set()
+
+        # 唤醒停止后仍在等待的请求
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.error = RuntimeError('推理代理已停止')
+                request.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取批处理和各路流的排队延迟统计
+
+        Returns:
+            Dict: 统计信息
+        """
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait_ms,
+                'active_streams': len(self._streams),
+                'batches': self.batches,
+                'avg_batch_size': round(self.batched_items / self.batches, 2) if self.batches else 0.0,
+                'avg_inference_ms': round(self.inference_time / self.batches * 1000, 2) if self.batches else 0.0,
+                'batch_size_counts': dict(sorted(self.batch_size_counts.items())),
+                'streams': {stream_id: latency.to_dict() for stream_id, latency in self._latency.items()}
+            }
+
+    def get_stream_stats(self, stream_id: str) -> Optional[Dict[str, Any]]:
+        """获取单路流的排队延迟统计"""
+        with self._lock:
+            latency = self._latency.get(stream_id)
+            return latency.to_dict() if latency else None
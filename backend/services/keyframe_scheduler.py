@@ -0,0 +1,150 @@
+"""
+关键帧调度模块
+按固定步长或自适应步长决定哪些帧运行YOLO检测，
+其余帧仅由DeepSort的卡尔曼滤波预测目标位置
+"""
+import threading
+from typing import Any, Dict, Optional
+
+
+class KeyframeScheduler:
+    """
+    检测关键帧调度器
+
+    固定模式下每 stride 帧检测一次；自适应模式下画面稳定（跟踪目标集合不变、
+    目标运动缓慢）时逐步增大步长直到 max_stride，一旦出现新目标、目标丢失或
+    快速运动就回到逐帧检测。
+
+    是否为关键帧由跟踪端按帧顺序调用 is_keyframe 判定，此时之前各帧的跟踪结果都已
+    observe，结果与逐帧顺序处理一致。解码端领先跟踪端读帧时用 plan_keyframe 预判，
+    检测阶段据此提前批量检测；自适应模式下预判可能落后于步长变化，预判漏掉的关键帧
+    由跟踪端补做检测，多做的检测结果直接丢弃。
+    """
+
+    def __init__(self, stride: int = 1, adaptive: bool = False, max_stride: int = 8,
+                 motion_threshold: float = 4.0):
+        """
+        初始化调度器
+
+        Args:
+            stride: 固定检测步长（1表示每帧检测）
+            adaptive: 是否启用自适应步长
+            max_stride: 自适应模式下的最大步长
+            motion_threshold: 自适应模式下判定为快速运动的速度阈值（像素/帧）
+        """
+        self.base_stride = max(1, int(stride))
+        self.adaptive = adaptive
+        self.max_stride = max(self.base_stride, int(max_stride))
+        self.motion_threshold = motion_threshold
+
+        self.current_stride = 1 if adaptive else self.base_stride
+        self.keyframes = 0
+        self.skipped_frames = 0
+
+        self.promoted_keyframes = 0  # 预判为非关键帧、由跟踪端补做检测的帧数
+        self.discarded_detections = 0  # 预判为关键帧、检测结果被丢弃的帧数
+
+        self._last_keyframe = None
+        self._planned_keyframe = None
+        self._last_track_ids = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_options(cls, options: Optional[Dict[str, Any]]) -> 'KeyframeScheduler':
+        """根据任务检测选项创建调度器"""
+        options = options or {}
+        return cls(
+            stride=options.get('detection_stride', 1),
+            adaptive=bool(options.get('adaptive_stride', False)),
+            max_stride=options.get('max_detection_stride', 8),
+            motion_threshold=float(options.get('adaptive_motion_threshold', 4.0))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """是否会跳过部分帧的检测"""
+        return self.adaptive or self.base_stride > 1
+
+    @property
+    def worst_case_stride(self) -> int:
+        """可能出现的最大步长"""
+        return self.max_stride if self.adaptive else self.base_stride
+
+    def is_keyframe(self, frame_number: int, planned: Optional[bool] = None) -> bool:
+        """
+        判断指定帧是否需要运行检测（帧号需按顺序传入，且之前的关键帧都已 observe）
+
+        Args:
+            frame_number: 从1开始的帧号
+            planned: 解码端对该帧的预判结果，用于统计预判失误
+
+        Returns:
+            bool: 是否为关键帧
+        """
+        with self._lock:
+            keyframe = self._last_keyframe is None or frame_number - self._last_keyframe >= self.current_stride
+            if keyframe:
+                self._last_keyframe = frame_number
+                self.keyframes += 1
+            else:
+                self.skipped_frames += 1
+            if planned is not None and planned != keyframe:
+                if keyframe:
+                    self.promoted_keyframes += 1
+                else:
+                    self.discarded_detections += 1
+            return keyframe
+
+    def plan_keyframe(self, frame_number: int) -> bool:
+        """
+        解码端预判指定帧是否为关键帧（帧号需按顺序传入），不计入统计
+
+        按当前步长预判；固定步长时与 is_keyframe 的判定完全一致。
+
+        Args:
+            frame_number: 从1开始的帧号
+
+        Returns:
+            bool: 是否预判为关键帧
+        """
+        with self._lock:
+            if self._planned_keyframe is None or frame_number - self._planned_keyframe >= self.current_stride:
+                self._planned_keyframe = frame_number
+                return True
+            return False
+
+    def observe(self, tracks):
+        """
+        记录关键帧的跟踪结果，用于自适应调整步长
+
+        Args:
+            tracks: (N, 8) 的跟踪结果 [x1, y1, x2, y2, cls, track_id, vx, vy]，速度为10倍像素/帧
+        """
+        if not self.adaptive:
+            return
+
+        track_ids = frozenset(int(tid) for tid in tracks[:, 5]) if len(tracks) else frozenset()
+        fast_motion = False
+        if len(tracks):
+            speed = (tracks[:, 6:8].astype(float) ** 2).sum(axis=1) ** 0.5 / 10.0
+            fast_motion = bool((speed > self.motion_threshold).any())
+
+        with self._lock:
+            if track_ids != self._last_track_ids or fast_motion:
+                self.current_stride = 1
+            else:
+                self.current_stride = min(self.current_stride + 1, self.max_stride)
+            self._last_track_ids = track_ids
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        total = self.keyframes + self.skipped_frames
+        return {
+            'detection_stride': self.base_stride,
+            'adaptive': self.adaptive,
+            'keyframes': self.keyframes,
+            'skipped_frames': self.skipped_frames,
+            'promoted_keyframes': self.promoted_keyframes,
+            'discarded_detections': self.discarded_detections,
+            'keyframe_ratio': round(self.keyframes / total, 3) if total else 0.0
+        }
@@ -0,0 +1,115 @@
+"""
+运动门控模块
+在YOLO检测之前用缩小的灰度帧做帧差：画面相对上一次检测时没有超过阈值的变化、
+且没有活跃的已确认跟踪目标时跳过检测，空闲摄像头几乎不占用推理资源
+"""
+from typing import Any, Dict
+
+import cv2
+import numpy as np
+
+
+# 默认门控参数，可按摄像头覆盖
+DEFAULT_MOTION_GATE = {
+    'enabled': True,
+    'threshold': 0.005,  # 变化像素占比阈值
+    'pixel_threshold': 25,  # 单个像素灰度差阈值
+    'downscale_width': 160,  # 帧差使用的缩小宽度
+    'max_gated_frames': 150  # 连续跳过的最大帧数，之后强制检测一次
+}
+
+
+class MotionGate:
+    """单路摄像头的运动门控"""
+
+    def __init__(self, **params):
+        """
+        初始化运动门控
+
+        Args:
+            params: 门控参数，未给出的使用 DEFAULT_MOTION_GATE
+        """
+        self.enabled = DEFAULT_MOTION_GATE['enabled']
+        self.threshold = DEFAULT_MOTION_GATE['threshold']
+        self.pixel_threshold = DEFAULT_MOTION_GATE['pixel_threshold']
+        self.downscale_width = DEFAULT_MOTION_GATE['downscale_width']
+        self.max_gated_frames = DEFAULT_MOTION_GATE['max_gated_frames']
+        self.configure(**params)
+
+        # 上一次执行检测时的参考帧（缓慢变化也会逐渐累积到阈值）
+        self._reference = None
+        self._consecutive_gated = 0
+
+        # 统计
+        self.total_frames = 0
+        self.gated_frames = 0
+        self.last_motion_ratio = 0.0
+
+    def configure(self, **params):
+        """更新门控参数（忽略未知参数）"""
+        if 'enabled' in params:
+            self.enabled = bool(params['enabled'])
+        if 'threshold' in params:
+            self.threshold = max(0.0, float(params['threshold']))
+        if 'pixel_threshold' in params:
+            self.pixel_threshold = max(0, int(params['pixel_threshold']))
+        if 'downscale_width' in params:
+            self.downscale_width = max(16, int(params['downscale_width']))
+            self._reference = None
+        if 'max_gated_frames' in params:
+            self.max_gated_frames = max(0, int(params['max_gated_frames']))
+
+    def _prepare(self, img) -> np.ndarray:
+        height, width = img.shape[:2]
+        scale = self.downscale_width / float(width)
+        small = cv2.resize(img, (self.downscale_width, max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, img, has_active_tracks: bool) -> bool:
+        """
+        判断当前帧是否需要执行检测
+
+        Args:
+            img: BGR图像
+            has_active_tracks: 是否有活跃的已确认跟踪目标
+
+        Returns:
+            bool: True表示执行检测，False表示跳过
+        """
+        self.total_frames += 1
+        current = self._prepare(img)
+
+        if self._reference is None or self._reference.shape != current.shape:
+            self.last_motion_ratio = 1.0
+        else:
+            diff = cv2.absdiff(current, self._reference)
+            self.last_motion_ratio = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+        if (not self.enabled or has_active_tracks or self.last_motion_ratio >= self.threshold
+                or self._consecutive_gated >= self.max_gated_frames):
+            self._reference = current
+            self._consecutive_gated = 0
+            return True
+
+        self._consecutive_gated += 1
+        self.gated_frames += 1
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取门控统计
+
+        Returns:
+            Dict: 参数、总帧数、跳过帧数和跳过比例
+        """
+        return {
+            'enabled': self.enabled,
+            'threshold': self.threshold,
+            'pixel_threshold': self.pixel_threshold,
+            'total_frames': self.total_frames,
+            'gated_frames': self.gated_frames,
+            'gated_ratio': round(self.gated_frames / self.total_frames, 3) if self.total_frames else 0.0,
+            'last_motion_ratio': round(self.last_motion_ratio, 4)
+        }
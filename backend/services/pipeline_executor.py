@@ -0,0 +1,207 @@
+"""
+多阶段流水线执行器
+将离线视频检测拆分为 解码 → 检测 → 跟踪 → 行为识别 → 绘制 → 编码 等阶段，
+每个阶段运行在独立线程中，阶段之间通过有界队列连接
+"""
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# 流结束标记
+_END_OF_STREAM = object()
+
+
+class StageStats:
+    """单个阶段的运行统计"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_time = 0.0  # 实际处理耗时（秒）
+        self.wait_in_time = 0.0  # 等待上游数据的耗时（秒）
+        self.wait_out_time = 0.0  # 等待下游队列空位的耗时（秒）
+
+    def to_dict(self, wall_time: float) -> Dict[str, Any]:
+        """
+        转换为字典格式
+
+        Args:
+            wall_time: 流水线总运行时间（秒）
+
+        Returns:
+            Dict: 阶段统计，occupancy 为该阶段处理耗时占总时间的比例
+        """
+        return {
+            'items': self.items,
+            'busy_s': round(self.busy_time, 3),
+            'wait_in_s': round(self.wait_in_time, 3),
+            'wait_out_s': round(self.wait_out_time, 3),
+            'occupancy': round(self.busy_time / wall_time, 3) if wall_time > 0 else 0.0
+        }
+
+
+class PipelineExecutor:
+    """
+    有界队列连接的多阶段流水线
+
+    每个阶段是一个单线程的处理函数，因此阶段内部可以安全地持有状态
+    （如DeepSort跟踪器、行为标签映射），队列为先进先出，输出顺序与输入顺序一致。
+    """
+
+    def __init__(self, source_name: str, source: Iterable,
+                 stages: List[Tuple[str, Callable[[Any], Any]]],
+                 queue_size: int = 8, stop_event: threading.Event = None):
+        """
+        初始化流水线
+
+        Args:
+            source_name: 数据源阶段名称（如 decode）
+            source: 产生数据项的可迭代对象，运行在独立线程中
+            stages: (阶段名称, 处理函数) 列表，处理函数返回 None 表示丢弃该数据项
+            queue_size: 阶段之间队列的最大长度
+            stop_event: 外部停止事件，设置后流水线尽快退出
+        """
+        self.source_name = source_name
+        self.source = source
+        self.stages = stages
+        self.queue_size = max(1, int(queue_size))
+        self.stop_event = stop_event or threading.Event()
+
+        self.stats = {source_name: StageStats(source_name)}
+        for name, _ in stages:
+            self.stats[name] = StageStats(name)
+
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in stages]
+        self._error = None
+        self._error_lock = threading.Lock()
+        self._wall_time = 0.0
+
+    def _fail(self, stage_name: str, error: BaseException):
+        """记录第一个出错的阶段并通知其他阶段停止"""
+        with self._error_lock:
+            if self._error is None:
+                self._error = (stage_name, error)
+        self.stop_event.set()
+
+    def _put(self, out_queue: queue.Queue, item: Any, stats: StageStats) -> bool:
+        """向下游队列放入数据，等待期间响应停止事件"""
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                stats.wait_out_time += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        stats.wait_out_time += time.perf_counter() - start
+        return False
+
+    def _get(self, in_queue: queue.Queue, stats: StageStats) -> Any:
+        """从上游队列取出数据，等待期间响应停止事件"""
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                item = in_queue.get(timeout=0.1)
+                stats.wait_in_time += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                continue
+        stats.wait_in_time += time.perf_counter() - start
+        return _END_OF_STREAM
+
+    def _source_worker(self):
+        stats = self.stats[self.source_name]
+        out_queue = self._queues[0] if self._queues else None
+        iterator = iter(self.source)
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    stats.busy_time += time.perf_counter() - start
+                    break
+                stats.busy_time += time.perf_counter() - start
+                stats.items += 1
+                if out_queue is not None and not self._put(out_queue, item, stats):
+                    break
+        except Exception as e:
+            self._fail(self.source_name, e)
+        finally:
+            if out_queue is not None:
+                self._put_end(out_queue)
+
+    def _stage_worker(self, index: int):
+        name, func = self.stages[index]
+        stats = self.stats[name]
+        in_queue = self._queues[index]
+        out_queue = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        try:
+            while True:
+                item = self._get(in_queue, stats)
+                if item is _END_OF_STREAM:
+                    break
+                start = time.perf_counter()
+                result = func(item)
+                stats.busy_time += time.perf_counter() - start
+                stats.items += 1
+                if result is None or out_queue is None:
+                    continue
+                if not self._put(out_queue, result, stats):
+                    break
+        except Exception as e:
+            self._fail(name, e)
+        finally:
+            if out_queue is not None:
+                self._put_end(out_queue)
+
+    def _put_end(self, out_queue: queue.Queue):
+        """向下游发送结束标记；停止时清空队列以保证标记能够放入"""
+        while True:
+            try:
+                out_queue.put(_END_OF_STREAM, timeout=0.1)
+                return
+            except queue.Full:
+                if self.stop_event.is_set():
+                    try:
+                        out_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        运行流水线直到数据源耗尽或收到停止信号
+
+        Returns:
+            Dict: 各阶段统计信息
+
+        Raises:
+            RuntimeError: 任一阶段抛出异常时
+        """
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._source_worker, name=f"pipeline-{self.source_name}", daemon=True)]
+        for index, (name, _) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._stage_worker, args=(index,),
+                                            name=f"pipeline-{name}", daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._wall_time = time.perf_counter() - start
+
+        if self._error is not None:
+            stage_name, error = self._error
+            raise RuntimeError(f"流水线阶段 {stage_name} 执行失败: {error}") from error
+        return self.get_stats()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各阶段统计信息（含占用率）"""
+        return {name: stats.to_dict(self._wall_time) for name, stats in self.stats.items()}
+
+    def bottleneck(self) -> Optional[str]:
+        """返回占用率最高的阶段名称"""
+        if not self.stats:
+            return None
+        return max(self.stats.values(), key=lambda s: s.busy_time).name
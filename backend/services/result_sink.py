@@ -0,0 +1,180 @@
+"""
+检测结果流式持久化模块
+检测线程按帧把结果放入有界队列，后台写入线程分批批量插入数据库，
+检测过程中内存占用保持平稳，结果也能边检测边查询
+"""
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from models.database import db, DetectionResult, AlertRecord
+
+
+# 队列结束标记
+_CLOSE = object()
+
+
+class DetectionRowWriter:
+    """把检测结果批量写入 detection_results 和 alert_records 表"""
+
+    def __init__(self, task_id: int, store_detections: bool = True):
+        """
+        初始化写入器
+
+        Args:
+            task_id: 检测任务ID
+            store_detections: 是否写入逐帧检测结果行（使用行为片段存储时只写报警记录）
+        """
+        self.task_id = task_id
+        self.store_detections = store_detections
+        self.detected_objects = 0
+        self.detected_behaviors = 0
+        self.alert_count = 0
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        """
+        批量写入一批检测结果（不提交事务，由 ResultSink 统一提交）
+
+        Args:
+            results: 检测结果字典列表
+        """
+        detection_rows = []
+        alert_rows = []
+        for detection in results:
+            detection_rows.append({
+                'task_id': self.task_id,
+                'frame_number': detection['frame_number'],
+                'timestamp': detection['timestamp'],
+                'object_id': detection.get('object_id'),
+                'object_type': detection['object_type'],
+                'confidence': detection['confidence'],
+                'bbox_x1': detection['bbox']['x1'],
+                'bbox_y1': detection['bbox']['y1'],
+                'bbox_x2': detection['bbox']['x2'],
+                'bbox_y2': detection['bbox']['y2'],
+                'behavior_type': detection.get('behavior_type'),
+                'is_anomaly': detection.get('is_anomaly', False)
+            })
+
+            # 如果是异常行为，创建报警记录
+            if detection.get('is_anomaly'):
+                alert_rows.append({
+                    'task_id': self.task_id,
+                    'alert_type': detection['behavior_type'],
+                    'trigger_frame': detection['frame_number'],
+                    'trigger_timestamp': detection['timestamp'],
+                    'trigger_object_id': detection.get('object_id'),
+                    'trigger_behavior': detection['behavior_type'],
+                    'trigger_confidence': detection['confidence'],
+                    'description': f"检测到异常行为: {detection['behavior_type']}"
+                })
+
+        # 使用Core insert执行executemany，避免为每行创建ORM对象
+        if detection_rows and self.store_detections:
+            db.session.execute(insert(DetectionResult.__table__), detection_rows)
+        if alert_rows:
+            db.session.execute(insert(AlertRecord.__table__), alert_rows)
+
+        self.detected_objects += len(detection_rows)
+        self.detected_behaviors += len([r for r in detection_rows if r['behavior_type']])
+        self.alert_count += len(alert_rows)
+
+    def finish(self):
+        """所有结果写入完成后调用"""
+        pass
+
+
+class ResultSink:
+    """
+    有界的检测结果写入通道
+
+    检测线程调用 emit() 放入一帧的结果，队列满时阻塞等待（反压），
+    后台线程累积到 batch_size 行后依次交给各写入器并提交一次事务。
+    """
+
+    def __init__(self, app, writers: List[Any], batch_size: int = 500, max_pending_frames: int = 256):
+        """
+        初始化写入通道
+
+        Args:
+            app: Flask应用实例（后台线程在其应用上下文中写库）
+            writers: 写入器列表，需实现 write_batch(results) 和 finish()
+            batch_size: 每次批量写入的最大结果行数
+            max_pending_frames: 队列中等待写入的最大帧数
+        """
+        self.app = app
+        self.writers = writers
+        self.batch_size = max(1, int(batch_size))
+        self.written_rows = 0
+        self.batches = 0
+
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending_frames)))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._writer_loop, name='result-sink', daemon=True)
+        self._thread.start()
+
+    def emit(self, frame_results: List[Dict[str, Any]]):
+        """
+        提交一帧的检测结果
+
+        Raises:
+            RuntimeError: 后台写入线程已失败时
+        """
+        if self._error is not None:
+            raise RuntimeError(f"检测结果写入失败: {self._error}")
+        if frame_results:
+            self._queue.put(frame_results)
+
+    def close(self):
+        """
+        写完剩余结果并停止后台线程
+
+        Raises:
+            RuntimeError: 写入过程中出现错误时
+        """
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"检测结果写入失败: {self._error}")
+
+    def _flush(self, pending: List[Dict[str, Any]]):
+        if not pending:
+            return
+        for writer in self.writers:
+            writer.write_batch(pending)
+        db.session.commit()
+        self.written_rows += len(pending)
+        self.batches += 1
+
+    def _writer_loop(self):
+        with self.app.app_context():
+            pending = []
+            try:
+                while True:
+                    item = self._queue.get()
+                    if item is _CLOSE:
+                        break
+                    pending.extend(item)
+                    if len(pending) >= self.batch_size:
+                        self._flush(pending)
+                        pending = []
+
+                self._flush(pending)
+                for writer in self.writers:
+                    writer.finish()
+                db.session.commit()
+                print(f"✓ 检测结果写入完成: {self.written_rows} 行, {self.batches} 批")
+
+            except Exception as e:
+                db.session.rollback()
+                self._error = e
+                print(f"❌ 检测结果写入失败: {e}")
+                # 继续取出队列中的数据，避免检测线程在 emit() 上永久阻塞
+                while True:
+                    item = self._queue.get()
+                    if item is _CLOSE:
+                        break
+            finally:
+                db.session.remove()
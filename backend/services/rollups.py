@@ -0,0 +1,219 @@
+"""
+统计汇总模块
+检测结果和报警记录写入时同步累加到按小时汇总的表中，
+统计图表接口只读取汇总表，查询开销与检测结果总数无关
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from models.database import (db, DetectionTask, DetectionResult, BehaviorSegment, AlertRecord,
+                             DetectionRollup, AlertRollup)
+from .behavior_segments import segment_task_ids
+from utils.time_utils import get_beijing_datetime, utc_to_beijing
+
+
+# 小时截断格式（SQLite strftime）
+_HOUR_FORMAT = '%Y-%m-%d %H:00:00'
+
+
+def hour_bucket(dt: datetime) -> datetime:
+    """截断到整点"""
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def to_beijing_naive(dt: datetime) -> datetime:
+    """带时区的时间转换为不带时区的北京时间（与数据库存储一致）"""
+    return utc_to_beijing(dt) if dt.tzinfo is not None else dt
+
+
+def _upsert(model, rows: List[Dict[str, Any]], keys: List[str]):
+    """
+    按唯一键累加count列
+
+    Args:
+        model: 汇总表模型
+        rows: 包含唯一键和count增量的行
+        keys: 唯一键列名
+    """
+    if not rows:
+        return
+
+    table = model.__table__
+    if db.engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        # 分块执行，避免单条语句的参数个数超出SQLite限制
+        for start in range(0, len(rows), 200):
+            stmt = sqlite_insert(table).values(rows[start:start + 200])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={'count': table.c['count'] + stmt.excluded['count']}
+            )
+            db.session.execute(stmt)
+        return
+
+    # 其他数据库：逐行先更新后插入
+    for row in rows:
+        condition = [table.c[key] == row[key] for key in keys]
+        result = db.session.execute(
+            table.update().where(*condition).values(count=table.c['count'] + row['count'])
+        )
+        if result.rowcount == 0:
+            db.session.execute(table.insert().values(**row))
+
+
+def add_detection_counts(counts: Dict[Tuple[datetime, Optional[str], bool], int]):
+    """
+    累加检测结果汇总
+
+    Args:
+        counts: (整点时间, 行为类型, 是否异常) -> 检测次数增量
+    """
+    rows = [{'hour_bucket': bucket, 'behavior_type': behavior or '', 'is_anomaly': bool(is_anomaly), 'count': count}
+            for (bucket, behavior, is_anomaly), count in counts.items() if count]
+    _upsert(DetectionRollup, rows, ['hour_bucket', 'behavior_type', 'is_anomaly'])
+
+
+def add_alert_counts(counts: Dict[Tuple[datetime, str], int]):
+    """
+    累加报警记录汇总
+
+    Args:
+        counts: (整点时间, 报警类型) -> 报警数增量
+    """
+    rows = [{'hour_bucket': bucket, 'alert_type': alert_type or '', 'count': count}
+            for (bucket, alert_type), count in counts.items() if count]
+    _upsert(AlertRollup, rows, ['hour_bucket', 'alert_type'])
+
+
+def record_alert(alert_type: str, created_at: Optional[datetime] = None):
+    """记录一条报警到汇总表（不提交事务）"""
+    bucket = hour_bucket(created_at or get_beijing_datetime())
+    add_alert_counts({(bucket, alert_type): 1})
+
+
+class RollupWriter:
+    """ResultSink写入器：按批把检测结果和报警数累加到小时汇总表"""
+
+    def __init__(self, task_created_at: Optional[datetime]):
+        """
+        初始化写入器
+
+        Args:
+            task_created_at: 任务创建时间（检测结果按任务创建时间归入小时桶）
+        """
+        self.bucket = hour_bucket(task_created_at or get_beijing_datetime())
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        detection_counts = Counter()
+        alert_counts = Counter()
+        # 报警记录的创建时间为写入时间
+        alert_bucket = hour_bucket(get_beijing_datetime())
+        for detection in results:
+            is_anomaly = bool(detection.get('is_anomaly'))
+            detection_counts[(self.bucket, detection.get('behavior_type'), is_anomaly)] += 1
+            if is_anomaly:
+                alert_counts[(alert_bucket, detection['behavior_type'])] += 1
+
+        add_detection_counts(detection_counts)
+        add_alert_counts(alert_counts)
+
+    def finish(self):
+        pass
+
+
+def _bucket_from_string(value) -> datetime:
+    if isinstance(value, datetime):
+        return hour_bucket(value)
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def _collect_counts(task_id: Optional[int] = None) -> Tuple[Counter, Counter]:
+    """
+    用SQL聚合检测结果、行为片段和报警记录得到小时汇总
+
+    Args:
+        task_id: 只统计指定任务，None表示全部任务
+
+    Returns:
+        Tuple: (检测汇总, 报警汇总)
+    """
+    detection_counts = Counter()
+    alert_counts = Counter()
+
+    task_hour = func.strftime(_HOUR_FORMAT, DetectionTask.created_at)
+    result_query = db.session.query(
+        task_hour, DetectionResult.behavior_type, DetectionResult.is_anomaly,
+        func.count(DetectionResult.id)
+    ).join(DetectionTask, DetectionResult.task_id == DetectionTask.id).filter(
+        DetectionResult.task_id.notin_(segment_task_ids()))
+    segment_query = db.session.query(
+        task_hour, BehaviorSegment.behavior_type, BehaviorSegment.is_anomaly,
+        func.sum(BehaviorSegment.frame_count)
+    ).join(DetectionTask, BehaviorSegment.task_id == DetectionTask.id)
+    alert_query = db.session.query(
+        func.strftime(_HOUR_FORMAT, AlertRecord.created_at), AlertRecord.alert_type,
+        func.count(AlertRecord.id)
+    )
+
+    if task_id is not None:
+        result_query = result_query.filter(DetectionResult.task_id == task_id)
+        segment_query = segment_query.filter(BehaviorSegment.task_id == task_id)
+        alert_query = alert_query.filter(AlertRecord.task_id == task_id)
+
+    result_rows = result_query.group_by(
+        task_hour, DetectionResult.behavior_type, DetectionResult.is_anomaly).all()
+    segment_rows = segment_query.group_by(
+        task_hour, BehaviorSegment.behavior_type, BehaviorSegment.is_anomaly).all()
+    for bucket, behavior, is_anomaly, count in list(result_rows) + list(segment_rows):
+        if bucket is None:
+            continue
+        detection_counts[(_bucket_from_string(bucket), behavior, bool(is_anomaly))] += int(count or 0)
+
+    alert_rows = alert_query.group_by(
+        func.strftime(_HOUR_FORMAT, AlertRecord.created_at), AlertRecord.alert_type).all()
+    for bucket, alert_type, count in alert_rows:
+        if bucket is None:
+            continue
+        alert_counts[(_bucket_from_string(bucket), alert_type)] += int(count or 0)
+
+    return detection_counts, alert_counts
+
+
+def remove_task_from_rollups(task_id: int):
+    """
+    删除任务前从汇总表中扣除该任务的检测结果和报警（不提交事务）
+
+    Args:
+        task_id: 检测任务ID
+    """
+    detection_counts, alert_counts = _collect_counts(task_id)
+    add_detection_counts({key: -count for key, count in detection_counts.items()})
+    add_alert_counts({key: -count for key, count in alert_counts.items()})
+    DetectionRollup.query.filter(DetectionRollup.count <= 0).delete()
+    AlertRollup.query.filter(AlertRollup.count <= 0).delete()
+
+
+def backfill_rollups() -> Dict[str, int]:
+    """
+    根据现有的检测结果、行为片段和报警记录重建汇总表
+
+    Returns:
+        Dict: 重建后的汇总行数
+    """
+    detection_counts, alert_counts = _collect_counts()
+
+    DetectionRollup.query.delete()
+    AlertRollup.query.delete()
+    add_detection_counts(detection_counts)
+    add_alert_counts(alert_counts)
+    db.session.commit()
+
+    stats = {
+        'detection_rollups': DetectionRollup.query.count(),
+        'alert_rollups': AlertRollup.query.count()
+    }
+    print(f"✓ 统计汇总表重建完成: {stats}")
+    return stats
@@ -0,0 +1,248 @@
+"""
+分段并行处理模块
+将长视频按时间切分为多个分段，在独立的工作进程中分别执行检测，
+再通过边界帧的框重叠和ReID特征统一跟踪ID，合并为一个有序的结果流
+"""
+import os
+import json
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+# 工作进程内的检测服务实例（每个进程加载一次模型）
+_worker_service = None
+
+
+def plan_segments(total_frames: int, num_segments: int, clip_len: int = 25) -> List[Tuple[int, int]]:
+    """
+    规划视频分段
+
+    分段边界对齐到clip长度的整数倍，保证每个分段内的SlowFast clip
+    与整段顺序处理时的clip完全一致。
+
+    Args:
+        total_frames: 视频总帧数
+        num_segments: 期望的分段数
+        clip_len: 行为识别clip长度
+
+    Returns:
+        List[Tuple]: (起始帧, 结束帧) 列表，帧号从1开始且包含两端
+    """
+    if total_frames <= 0:
+        return []
+
+    num_clips = -(-total_frames // clip_len)
+    clips_per_segment = max(1, -(-num_clips // max(1, num_segments)))
+
+    segments = []
+    start = 1
+    while start <= total_frames:
+        end = min(total_frames, start - 1 + clips_per_segment * clip_len)
+        segments.append((start, end))
+        start = end + 1
+    return segments
+
+
+def _get_worker_service(service_config: Dict[str, Any], num_threads: int):
+    """获取当前工作进程的检测服务实例"""
+    global _worker_service
+    if _worker_service is None:
+        import torch
+        torch.set_num_threads(num_threads)
+
+        from .detection_service import BehaviorDetectionService
+        _worker_service = BehaviorDetectionService(service_config)
+        if not _worker_service.initialize_models():
+            raise RuntimeError('工作进程模型初始化失败')
+    return _worker_service
+
+
+def segment_worker(job: Dict[str, Any], num_threads: int, stop_event=None, progress_queue=None) -> Dict[str, Any]:
+    """
+    工作进程入口：处理一个视频分段
+
+    Args:
+        job: 分段任务描述，见 BehaviorDetectionService.detect_segment
+        num_threads: 工作进程使用的torch线程数
+        stop_event: 跨进程停止事件
+        progress_queue: 跨进程进度队列
+
+    Returns:
+        Dict: 分段处理结果描述
+    """
+    service = _get_worker_service(job['service_config'], num_threads)
+    return service.detect_segment(job, stop_event=stop_event, progress_queue=progress_queue)
+
+
+def run_segments(jobs: List[Dict[str, Any]], max_workers: int,
+                 should_stop: Callable[[], bool] = None,
+                 on_progress: Callable[[int], None] = None) -> List[Dict[str, Any]]:
+    """
+    在进程池中并行处理所有分段
+
+    Args:
+        jobs: 分段任务列表
+        max_workers: 工作进程数
+        should_stop: 返回True时通知所有工作进程停止
+        on_progress: 进度回调，参数为已处理的总帧数
+
+    Returns:
+        List[Dict]: 与jobs顺序一致的分段处理结果
+    """
+    ctx = multiprocessing.get_context('spawn')
+    num_threads = max(1, (os.cpu_count() or 1) // max(1, max_workers))
+
+    with ctx.Manager() as manager:
+        stop_event = manager.Event()
+        progress_queue = manager.Queue()
+
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            futures = [pool.submit(segment_worker, job, num_threads, stop_event, progress_queue)
+                       for job in jobs]
+
+            processed_frames = 0
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+
+                # 任一分段失败时通知其余分段尽快退出
+                if any(future.exception() is not None for future in done):
+                    stop_event.set()
+
+                while True:
+                    try:
+                        processed_frames += progress_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if on_progress:
+                    on_progress(processed_frames)
+
+                if should_stop and should_stop() and not stop_event.is_set():
+                    print("🛑 通知所有分段工作进程停止")
+                    stop_event.set()
+
+            return [future.result() for future in futures]
+
+
+def _box_iou(box_a: List[float], box_b: List[float]) -> float:
+    """计算两个 [x1, y1, x2, y2] 框的IoU"""
+    x1, y1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    x2, y2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    area_a = max(0.0, box_a[2] - box_a[0]) * max(0.0, box_a[3] - box_a[1])
+    area_b = max(0.0, box_b[2] - box_b[0]) * max(0.0, box_b[3] - box_b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _cosine_distance(feature_a, feature_b) -> float:
+    """计算两个ReID特征的余弦距离，缺少特征时返回1"""
+    if feature_a is None or feature_b is None:
+        return 1.0
+    a = np.asarray(feature_a, dtype=np.float32)
+    b = np.asarray(feature_b, dtype=np.float32)
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(1.0 - np.dot(a, b) / norm) if norm > 0 else 1.0
+
+
+def match_boundary_tracks(tail: Dict[int, Dict], head: Dict[int, Dict],
+                          iou_weight: float = 0.5, max_cost: float = 0.6) -> Dict[int, int]:
+    """
+    匹配分段边界帧上的跟踪目标
+
+    前一分段最后一帧（tail）与后一分段预热阶段最后一帧（head）是同一帧，
+    代价为 iou_weight*(1-IoU) + (1-iou_weight)*余弦距离，使用匈牙利算法求解。
+
+    Returns:
+        Dict: 后一分段跟踪ID -> 前一分段跟踪ID
+    """
+    if not tail or not head:
+        return {}
+
+    from scipy.optimize import linear_sum_assignment
+
+    head_ids = list(head.keys())
+    tail_ids = list(tail.keys())
+    cost = np.full((len(head_ids), len(tail_ids)), 1e5, dtype=np.float64)
+    for i, head_id in enumerate(head_ids):
+        for j, tail_id in enumerate(tail_ids):
+            iou = _box_iou(head[head_id]['bbox'], tail[tail_id]['bbox'])
+            if iou <= 0:
+                continue
+            appearance = _cosine_distance(head[head_id].get('feature'), tail[tail_id].get('feature'))
+            value = iou_weight * (1.0 - iou) + (1.0 - iou_weight) * appearance
+            if value <= max_cost:
+                cost[i, j] = value
+
+    rows, cols = linear_sum_assignment(cost)
+    return {head_ids[r]: tail_ids[c] for r, c in zip(rows, cols) if cost[r, c] <= max_cost}
+
+
+def reconcile_track_ids(segment_outputs: List[Dict[str, Any]], iou_weight: float = 0.5,
+                        max_cost: float = 0.6) -> List[Dict[int, int]]:
+    """
+    统一各分段的跟踪ID
+
+    Args:
+        segment_outputs: 按时间顺序排列的分段处理结果
+
+    Returns:
+        List[Dict]: 每个分段的 本地跟踪ID -> 全局跟踪ID 映射
+    """
+    id_maps = []
+    next_id = 1
+    previous = None
+    previous_map = {}
+
+    for output in segment_outputs:
+        id_map = {}
+        if previous is not None:
+            matches = match_boundary_tracks(previous['tail'], output['head'], iou_weight, max_cost)
+            for local_id, previous_id in matches.items():
+                if previous_id in previous_map:
+                    id_map[local_id] = previous_map[previous_id]
+            if matches:
+                print(f"✓ 分段 {output['segment_index']} 与前一分段衔接 {len(id_map)} 个跟踪目标")
+
+        for local_id in output['track_ids']:
+            if local_id not in id_map:
+                id_map[local_id] = next_id
+                next_id += 1
+
+        id_maps.append(id_map)
+        previous = output
+        previous_map = id_map
+
+    return id_maps
+
+
+def iter_merged_frames(segment_outputs: List[Dict[str, Any]],
+                       id_maps: List[Dict[int, int]]) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    按帧顺序合并各分段的检测结果并替换为全局跟踪ID
+
+    Yields:
+        Tuple: (帧号, 该帧检测结果列表)，只包含有检测结果的帧
+    """
+    for output, id_map in zip(segment_outputs, id_maps):
+        if not os.path.exists(output['results_path']):
+            continue
+
+        current_frame = None
+        frame_results = []
+        with open(output['results_path'], 'r', encoding='utf-8') as f:
+            for line in f:
+                result = json.loads(line)
+                result['object_id'] = id_map.get(result['object_id'], result['object_id'])
+                if result['frame_number'] != current_frame:
+                    if frame_results:
+                        yield current_frame, frame_results
+                    current_frame = result['frame_number']
+                    frame_results = []
+                frame_results.append(result)
+        if frame_results:
+            yield current_frame, frame_results
@@ -0,0 +1,205 @@
+"""
+实时视频流会话模块
+每路摄像头/视频流对应一个 StreamSession，拥有独立的跟踪器、clip缓冲、行为标签、停止信号和统计，
+模型权重由检测服务共享；StreamSessionManager 负责会话的创建、查询和按流停止
+"""
+import time
+import uuid
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .realtime_statistics import RealtimeStatistics
+
+
+class StreamSession:
+    """单路实时视频流的运行状态"""
+
+    def __init__(self, stream_id: str, source: Any, tracker: Any = None,
+                 alert_behaviors: List[str] = None, preview_only: bool = False):
+        """
+        初始化流会话
+
+        Args:
+            stream_id: 流ID
+            source: 视频源（摄像头ID或视频路径）
+            tracker: 本会话独立的DeepSort跟踪器（预览模式为None）
+            alert_behaviors: 报警行为列表
+            preview_only: 是否仅预览
+        """
+        self.stream_id = stream_id
+        self.source = source
+        self.tracker = tracker
+        self.preview_only = preview_only
+        self.stop_event = threading.Event()
+
+        self.cap = None  # MyVideoCapture，自带clip环形缓冲
+        self.pacer = None  # FramePacer，输出帧率控制
+        self.motion_gate = None  # MotionGate，画面无变化时跳过检测
+        self.zones = None  # ZoneSet，检测区域（未配置时为None）
+        self.zone_events = None  # ZoneEventTracker，区域进出事件
+        self.action_scheduler = None  # ActionScheduler，SlowFast识别调度
+        self.action_profile = None  # 行为识别配置档（crop_size、num_frames、clip_len、alpha）
+        self.id_to_ava_labels: Dict[int, str] = {}
+        self.stats = RealtimeStatistics(alert_behaviors)
+
+        self.status = 'starting'
+        self.started_at = time.time()
+        self.frame_count = 0
+
+    @property
+    def should_stop(self) -> bool:
+        """是否已收到停止信号"""
+        return self.stop_event.is_set()
+
+    def stop(self):
+        """通知本会话停止（只影响当前流）"""
+        self.stop_event.set()
+        if self.status in ('starting', 'running'):
+            self.status = 'stopping'
+
+    def release(self):
+        """释放本会话占用的视频源"""
+        if self.cap is not None:
+            try:
+                self.cap.release()
+            except Exception as e:
+                print(f"🎥 流 {self.stream_id} 释放视频源时出错: {e}")
+            self.cap = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        cap = self.cap
+        pacer = self.pacer
+        gate = self.motion_gate
+        zone_events = self.zone_events
+        scheduler = self.action_scheduler
+        tracker = self.tracker
+        return {
+            'stream_id': self.stream_id,
+            'source': str(self.source),
+            'preview_only': self.preview_only,
+            'status': self.status,
+            'started_at': self.started_at,
+            'uptime': round(time.time() - self.started_at, 1),
+            'frame_count': self.frame_count,
+            'tracked_labels': len(self.id_to_ava_labels),
+            # 采集线程统计：处理/丢弃帧数和采集到输出的延迟
+            'capture': cap.get_stats() if hasattr(cap, 'get_stats') else None,
+            # 输出帧率控制：目标/实际帧率和帧间隔抖动
+            'pacing': pacer.get_stats() if pacer is not None else None,
+            # 运动门控：跳过检测的帧数
+            'motion_gate': gate.get_stats() if gate is not None else None,
+            # 检测区域：区域数和进出事件数
+            'zones': zone_events.get_stats() if zone_events is not None else None,
+            # SlowFast调度：跳过的clip数和实际识别的ROI数
+            'action_schedule': scheduler.get_stats() if scheduler is not None else None,
+            # ReID：每帧检测数和实际提取外观特征的检测数
+            'reid': tracker.get_reid_stats() if tracker is not None else None,
+            # 行为识别配置档
+            'action_profile': self.action_profile
+        }
+
+
+class StreamSessionManager:
+    """实时流会话注册表"""
+
+    def __init__(self, max_sessions: int = 8):
+        """
+        初始化会话注册表
+
+        Args:
+            max_sessions: 同时运行的最大流数量
+        """
+        self.max_sessions = max(1, int(max_sessions))
+        self._sessions: Dict[str, StreamSession] = {}
+        self._lock = threading.Lock()
+
+    def open(self, source: Any, stream_id: Optional[str] = None,
+             tracker_factory: Callable[[], Any] = None, alert_behaviors: List[str] = None,
+             preview_only: bool = False) -> StreamSession:
+        """
+        创建并登记一个流会话
+
+        同一stream_id已存在时先停止旧会话（例如前端刷新页面重新拉流）。
+
+        Args:
+            source: 视频源
+            stream_id: 流ID，为空时自动生成
+            tracker_factory: 创建独立跟踪器的函数
+            alert_behaviors: 报警行为列表
+            preview_only: 是否仅预览
+
+        Returns:
+            StreamSession: 新会话
+
+        Raises:
+            RuntimeError: 运行中的流数量已达上限时
+        """
+        stream_id = stream_id or f"stream_{uuid.uuid4().hex[:8]}"
+
+        with self._lock:
+            previous = self._sessions.pop(stream_id, None)
+            if previous is not None:
+                print(f"🛑 流 {stream_id} 已存在，停止旧会话")
+                previous.stop()
+
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError(f'实时流数量已达上限: {self.max_sessions}')
+
+            tracker = tracker_factory() if tracker_factory and not preview_only else None
+            session = StreamSession(stream_id, source, tracker, alert_behaviors, preview_only)
+            self._sessions[stream_id] = session
+
+        print(f"🎥 打开流会话 {stream_id}，视频源: {source}，当前流数量: {len(self._sessions)}")
+        return session
+
+    def close(self, session: StreamSession):
+        """注销流会话并释放其视频源"""
+        session.release()
+        if session.status != 'failed':
+            session.status = 'stopped'
+        with self._lock:
+            if self._sessions.get(session.stream_id) is session:
+                del self._sessions[session.stream_id]
+        print(f"🎥 流会话 {session.stream_id} 已关闭，当前流数量: {len(self._sessions)}")
+
+    def get(self, stream_id: str) -> Optional[StreamSession]:
+        """获取流会话"""
+        with self._lock:
+            return self._sessions.get(stream_id)
+
+    def stop(self, stream_id: str) -> bool:
+        """
+        停止指定的流
+
+        Returns:
+            bool: 流是否存在
+        """
+        session = self.get(stream_id)
+        if session is None:
+            return False
+        session.stop()
+        print(f"🛑 已通知流 {stream_id} 停止")
+        return True
+
+    def stop_all(self) -> int:
+        """
+        停止所有流
+
+        Returns:
+            int: 通知停止的流数量
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+        for session in sessions:
+            session.stop()
+        return len(sessions)
+
+    def list(self) -> List[StreamSession]:
+        """当前所有流会话"""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
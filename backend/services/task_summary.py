@@ -0,0 +1,175 @@
+"""
+任务统计摘要模块
+检测过程中随结果写入增量累计任务统计，写入 task_summaries 表，
+任务结果接口直接读取摘要，不再逐行扫描检测结果
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, case
+
+from models.database import db, DetectionTask, DetectionResult, BehaviorSegment, TaskSummary
+from .behavior_segments import summarize_segments
+
+
+class TaskSummaryWriter:
+    """ResultSink写入器：按批累计任务统计并更新 task_summaries 表"""
+
+    def __init__(self, task_id: int):
+        self.task_id = task_id
+        self.total_detections = 0
+        self.detected_frames = 0
+        self.alert_count = 0
+        self.last_frame = 0
+        self.behavior_stats: Dict[str, Dict[str, Any]] = {}
+
+    def _accumulate(self, results: List[Dict[str, Any]]):
+        for detection in results:
+            frame_number = detection['frame_number']
+            # 结果按帧顺序到达，帧号变化即为新的一帧
+            if frame_number != self.last_frame:
+                self.detected_frames += 1
+                self.last_frame = frame_number
+
+            self.total_detections += 1
+            if detection.get('is_anomaly'):
+                self.alert_count += 1
+
+            behavior = detection.get('behavior_type') or 'unknown'
+            stats = self.behavior_stats.get(behavior)
+            if stats is None:
+                stats = self.behavior_stats[behavior] = {
+                    'count': 0, 'confidence_sum': 0.0,
+                    'first_frame': frame_number, 'last_frame': frame_number
+                }
+            stats['count'] += 1
+            stats['confidence_sum'] += float(detection['confidence'])
+            stats['last_frame'] = frame_number
+
+    def _save(self, is_final: bool):
+        summary = TaskSummary.query.get(self.task_id)
+        if summary is None:
+            summary = TaskSummary(task_id=self.task_id)
+            db.session.add(summary)
+        summary.total_detections = self.total_detections
+        summary.detected_frames = self.detected_frames
+        summary.alert_count = self.alert_count
+        summary.last_frame = self.last_frame
+        summary.behavior_stats = json.dumps(self.behavior_stats, ensure_ascii=False)
+        summary.is_final = is_final
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        self._accumulate(results)
+        self._save(is_final=False)
+
+    def finish(self):
+        self._save(is_final=True)
+
+
+def _summary_from_segments(task_id: int) -> Optional[Dict[str, Any]]:
+    """根据行为片段计算统计（片段数远少于逐帧结果）"""
+    segments = BehaviorSegment.query.filter_by(task_id=task_id).all()
+    if not segments:
+        return None
+
+    summary = summarize_segments(segments)
+    behavior_stats = {}
+    for segment in segments:
+        behavior = segment.behavior_type or 'unknown'
+        stats = behavior_stats.setdefault(behavior, {
+            'count': 0, 'confidence_sum': 0.0,
+            'first_frame': segment.start_frame, 'last_frame': segment.end_frame
+        })
+        stats['count'] += segment.frame_count
+        stats['confidence_sum'] += segment.mean_confidence * segment.frame_count
+        stats['first_frame'] = min(stats['first_frame'], segment.start_frame)
+        stats['last_frame'] = max(stats['last_frame'], segment.end_frame)
+
+    return {
+        'total_detections': summary['total_detections'],
+        'detected_frames': summary['detected_frames'],
+        'alert_count': summary['alert_count'],
+        'last_frame': max(segment.end_frame for segment in segments),
+        'behavior_stats': behavior_stats
+    }
+
+
+def _summary_from_results(task_id: int) -> Dict[str, Any]:
+    """用SQL聚合逐帧检测结果计算统计（旧任务）"""
+    totals = db.session.query(
+        func.count(DetectionResult.id),
+        func.count(func.distinct(DetectionResult.frame_number)),
+        func.sum(case((DetectionResult.is_anomaly == True, 1), else_=0)),
+        func.max(DetectionResult.frame_number)
+    ).filter(DetectionResult.task_id == task_id).one()
+
+    behavior_column = func.coalesce(DetectionResult.behavior_type, 'unknown')
+    rows = db.session.query(
+        behavior_column,
+        func.count(DetectionResult.id),
+        func.sum(DetectionResult.confidence),
+        func.min(DetectionResult.frame_number),
+        func.max(DetectionResult.frame_number)
+    ).filter(DetectionResult.task_id == task_id).group_by(behavior_column).all()
+
+    return {
+        'total_detections': totals[0] or 0,
+        'detected_frames': totals[1] or 0,
+        'alert_count': int(totals[2] or 0),
+        'last_frame': totals[3] or 0,
+        'behavior_stats': {
+            behavior: {
+                'count': count,
+                'confidence_sum': float(confidence_sum or 0.0),
+                'first_frame': first_frame,
+                'last_frame': last_frame
+            }
+            for behavior, count, confidence_sum, first_frame, last_frame in rows
+        }
+    }
+
+
+def build_task_summary(task: DetectionTask) -> TaskSummary:
+    """
+    为没有摘要的任务（旧任务）计算并保存统计摘要
+
+    Args:
+        task: 检测任务
+
+    Returns:
+        TaskSummary: 保存后的摘要
+    """
+    data = _summary_from_segments(task.id) or _summary_from_results(task.id)
+
+    summary = TaskSummary.query.get(task.id)
+    if summary is None:
+        summary = TaskSummary(task_id=task.id)
+        db.session.add(summary)
+    summary.total_detections = data['total_detections']
+    summary.detected_frames = data['detected_frames']
+    summary.alert_count = data['alert_count']
+    summary.last_frame = data['last_frame']
+    summary.behavior_stats = json.dumps(data['behavior_stats'], ensure_ascii=False)
+    summary.is_final = task.status in ('completed', 'failed', 'stopped')
+    db.session.commit()
+    return summary
+
+
+def get_task_summary(task: DetectionTask) -> Optional[TaskSummary]:
+    """
+    获取任务统计摘要
+
+    已结束的旧任务首次查询时计算一次并保存，运行中的任务返回检测线程增量写入的摘要。
+
+    Args:
+        task: 检测任务
+
+    Returns:
+        TaskSummary或None: 运行中且尚未写入结果的任务返回None
+    """
+    summary = TaskSummary.query.get(task.id)
+    if summary is not None:
+        return summary
+    if task.status in ('pending', 'running'):
+        return None
+    return build_task_summary(task)
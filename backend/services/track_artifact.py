@@ -0,0 +1,266 @@
+"""
+跟踪结果列式存储模块
+每个任务在输出视频旁写入一个 <视频名>.tracks 目录，按列保存逐帧检测结果的原始二进制数组，
+查询时通过内存映射按帧范围或跟踪ID切片读取，不经过数据库
+"""
+import os
+import json
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+# 列名 -> 数据类型
+ARTIFACT_COLUMNS = {
+    'frame': np.int32,
+    'track_id': np.int32,
+    'class_id': np.int16,
+    'conf': np.float32,
+    'x1': np.float32,
+    'y1': np.float32,
+    'x2': np.float32,
+    'y2': np.float32,
+    'behavior_id': np.int16,
+    'anomaly': np.uint8,
+}
+
+ARTIFACT_VERSION = 1
+
+
+def get_artifact_dir(output_path: str) -> str:
+    """根据输出视频路径获取列式存储目录"""
+    return os.path.splitext(output_path)[0] + '.tracks'
+
+
+def remove_artifact(output_path: str):
+    """删除任务的列式存储目录"""
+    artifact_dir = get_artifact_dir(output_path)
+    for path in (artifact_dir, artifact_dir + '.partial'):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    with _cache_lock:
+        _artifact_cache.pop(artifact_dir, None)
+
+
+class TrackArtifactWriter:
+    """
+    ResultSink写入器：把检测结果追加写入列式二进制文件
+
+    每批结果转换为NumPy数组后直接追加到各列文件，内存占用与批大小相关，
+    完成时生成跟踪ID索引和元数据，并把临时目录原子地重命名为正式目录。
+    """
+
+    def __init__(self, output_path: str):
+        """
+        初始化写入器
+
+        Args:
+            output_path: 任务输出视频路径，列式存储目录创建在其旁边
+        """
+        self.artifact_dir = get_artifact_dir(output_path)
+        self.partial_dir = self.artifact_dir + '.partial'
+        self.count = 0
+        self.behaviors: Dict[str, int] = {}
+        self.classes: Dict[str, int] = {}
+
+        if os.path.isdir(self.partial_dir):
+            shutil.rmtree(self.partial_dir)
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._files = {name: open(os.path.join(self.partial_dir, f'{name}.bin'), 'wb')
+                       for name in ARTIFACT_COLUMNS}
+
+    def _vocab_id(self, vocab: Dict[str, int], name: Optional[str]) -> int:
+        if name is None:
+            return -1
+        if name not in vocab:
+            vocab[name] = len(vocab)
+        return vocab[name]
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        if not results:
+            return
+
+        columns = {
+            'frame': [r['frame_number'] for r in results],
+            'track_id': [r.get('object_id') if r.get('object_id') is not None else -1 for r in results],
+            'class_id': [self._vocab_id(self.classes, r['object_type']) for r in results],
+            'conf': [r['confidence'] for r in results],
+            'x1': [r['bbox']['x1'] for r in results],
+            'y1': [r['bbox']['y1'] for r in results],
+            'x2': [r['bbox']['x2'] for r in results],
+            'y2': [r['bbox']['y2'] for r in results],
+            'behavior_id': [self._vocab_id(self.behaviors, r.get('behavior_type')) for r in results],
+            'anomaly': [1 if r.get('is_anomaly') else 0 for r in results],
+        }
+        for name, dtype in ARTIFACT_COLUMNS.items():
+            np.asarray(columns[name], dtype=dtype).tofile(self._files[name])
+        self.count += len(results)
+
+    def finish(self):
+        for f in self._files.values():
+            f.close()
+
+        # 跟踪ID索引：按跟踪ID稳定排序后的行号，以及排序后的跟踪ID（用于二分查找）
+        if self.count:
+            track_ids = np.fromfile(os.path.join(self.partial_dir, 'track_id.bin'), dtype=np.int32)
+            track_order = np.argsort(track_ids, kind='stable').astype(np.int64)
+            track_order.tofile(os.path.join(self.partial_dir, 'track_order.bin'))
+            track_ids[track_order].tofile(os.path.join(self.partial_dir, 'track_sorted.bin'))
+        else:
+            open(os.path.join(self.partial_dir, 'track_order.bin'), 'wb').close()
+            open(os.path.join(self.partial_dir, 'track_sorted.bin'), 'wb').close()
+
+        meta = {
+            'version': ARTIFACT_VERSION,
+            'count': self.count,
+            'columns': {name: np.dtype(dtype).name for name, dtype in ARTIFACT_COLUMNS.items()},
+            'behaviors': [name for name, _ in sorted(self.behaviors.items(), key=lambda item: item[1])],
+            'classes': [name for name, _ in sorted(self.classes.items(), key=lambda item: item[1])],
+        }
+        with open(os.path.join(self.partial_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        if os.path.isdir(self.artifact_dir):
+            shutil.rmtree(self.artifact_dir)
+        os.replace(self.partial_dir, self.artifact_dir)
+        with _cache_lock:
+            _artifact_cache.pop(self.artifact_dir, None)
+        print(f"✓ 跟踪结果列式存储已生成: {self.artifact_dir} ({self.count} 条)")
+
+
+class TrackArtifact:
+    """内存映射的只读列式跟踪结果"""
+
+    def __init__(self, artifact_dir: str):
+        self.artifact_dir = artifact_dir
+        with open(os.path.join(artifact_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.count = self.meta['count']
+        self.behaviors = self.meta['behaviors']
+        self.classes = self.meta['classes']
+        self.columns = {name: self._map(name, np.dtype(dtype))
+                        for name, dtype in self.meta['columns'].items()}
+        self.track_order = self._map('track_order', np.dtype(np.int64))
+        self.track_sorted = self._map('track_sorted', np.dtype(np.int32))
+
+    def _map(self, name: str, dtype: np.dtype) -> np.ndarray:
+        path = os.path.join(self.artifact_dir, f'{name}.bin')
+        if self.count == 0 or os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(self.count,))
+
+    def frame_range(self, start_frame: int, end_frame: int) -> np.ndarray:
+        """
+        获取帧范围内的行号（帧号按写入顺序递增，使用二分查找）
+
+        Returns:
+            ndarray: 行号数组
+        """
+        frames = self.columns['frame']
+        lo = int(np.searchsorted(frames, start_frame, side='left'))
+        hi = int(np.searchsorted(frames, end_frame, side='right'))
+        return np.arange(lo, hi, dtype=np.int64)
+
+    def track_rows(self, track_id: int, start_frame: Optional[int] = None,
+                   end_frame: Optional[int] = None) -> np.ndarray:
+        """
+        获取指定跟踪ID的行号（按帧顺序），可选限定帧范围
+
+        Returns:
+            ndarray: 行号数组
+        """
+        lo = int(np.searchsorted(self.track_sorted, track_id, side='left'))
+        hi = int(np.searchsorted(self.track_sorted, track_id, side='right'))
+        rows = np.asarray(self.track_order[lo:hi])
+        if start_frame is not None or end_frame is not None:
+            frames = self.columns['frame'][rows]
+            mask = np.ones(len(rows), dtype=bool)
+            if start_frame is not None:
+                mask &= frames >= start_frame
+            if end_frame is not None:
+                mask &= frames <= end_frame
+            rows = rows[mask]
+        return rows
+
+    def _slice(self, name: str, rows: np.ndarray) -> np.ndarray:
+        column = self.columns[name]
+        # 连续行号直接切片，避免花式索引的拷贝开销
+        if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+            return np.asarray(column[rows[0]:rows[-1] + 1])
+        return column[rows]
+
+    def to_columns(self, rows: np.ndarray) -> Dict[str, Any]:
+        """
+        按列返回指定行的数据（行为和类别以名称表的下标表示）
+
+        Returns:
+            Dict: 列名 -> 列表
+        """
+        data = {name: self._slice(name, rows).tolist() for name in self.columns}
+        data['behaviors'] = self.behaviors
+        data['classes'] = self.classes
+        return data
+
+    def to_records(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        按行返回指定行的数据，格式与检测结果字典一致
+
+        Returns:
+            List[Dict]: 检测结果列表
+        """
+        columns = {name: self._slice(name, rows).tolist() for name in self.columns}
+        records = []
+        for i in range(len(rows)):
+            behavior_id = columns['behavior_id'][i]
+            class_id = columns['class_id'][i]
+            records.append({
+                'frame_number': columns['frame'][i],
+                'timestamp': columns['frame'][i] / 25.0,
+                'object_id': columns['track_id'][i],
+                'object_type': self.classes[class_id] if class_id >= 0 else None,
+                'confidence': columns['conf'][i],
+                'bbox': {
+                    'x1': columns['x1'][i],
+                    'y1': columns['y1'][i],
+                    'x2': columns['x2'][i],
+                    'y2': columns['y2'][i]
+                },
+                'behavior_type': self.behaviors[behavior_id] if behavior_id >= 0 else None,
+                'is_anomaly': bool(columns['anomaly'][i])
+            })
+        return records
+
+
+# 已打开的列式存储缓存（目录 -> (meta修改时间, TrackArtifact)）
+_artifact_cache: Dict[str, Any] = {}
+_cache_lock = threading.Lock()
+
+
+def open_artifact(output_path: str) -> Optional[TrackArtifact]:
+    """
+    打开任务的列式存储（带缓存）
+
+    Args:
+        output_path: 任务输出视频路径
+
+    Returns:
+        TrackArtifact或None: 不存在时返回None
+    """
+    artifact_dir = get_artifact_dir(output_path)
+    meta_path = os.path.join(artifact_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    mtime = os.path.getmtime(meta_path)
+    with _cache_lock:
+        cached = _artifact_cache.get(artifact_dir)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    artifact = TrackArtifact(artifact_dir)
+    with _cache_lock:
+        _artifact_cache[artifact_dir] = (mtime, artifact)
+    return artifact
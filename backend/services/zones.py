@@ -0,0 +1,217 @@
+"""
+检测区域模块
+按视频源配置多边形区域：YOLO只在所有区域的外接矩形（加边距）内推理，
+脚点（检测框底边中点）不在任何区域内的目标在跟踪和行为识别前丢弃，
+并根据跟踪目标进出区域产生 enter / exit 事件
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# 裁剪区域的边距（相对画面宽高）：区域只约束脚点，人体向上延伸，因此上方边距更大
+CROP_MARGIN = {'left': 0.05, 'right': 0.05, 'top': 0.3, 'bottom': 0.05}
+
+
+def validate_points(points: Any) -> List[List[float]]:
+    """
+    校验多边形顶点
+
+    Args:
+        points: [[x, y], ...]，坐标为相对画面宽高的比例
+
+    Returns:
+        List: 规范化后的顶点列表
+
+    Raises:
+        ValueError: 顶点少于3个或坐标不在0-1范围内
+    """
+    if not isinstance(points, (list, tuple)) or len(points) < 3:
+        raise ValueError('多边形至少需要3个顶点')
+    result = []
+    for point in points:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            raise ValueError(f'无效的顶点: {point}')
+        x, y = float(point[0]), float(point[1])
+        if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0):
+            raise ValueError(f'顶点坐标需在0-1范围内: {point}')
+        result.append([x, y])
+    return result
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """
+    射线法判断点是否在多边形内（向量化）
+
+    Args:
+        points: (N, 2) 像素坐标
+        polygon: (M, 2) 多边形顶点像素坐标
+
+    Returns:
+        ndarray: (N,) bool
+    """
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    inside = crosses & (x < x_cross)
+    return np.count_nonzero(inside, axis=1) % 2 == 1
+
+
+class ZoneSet:
+    """一个视频源的全部检测区域"""
+
+    def __init__(self, zones: List[Dict[str, Any]]):
+        """
+        初始化区域集合
+
+        Args:
+            zones: 区域列表，每项包含 id、name、points（比例坐标）
+        """
+        self.zones = [zone for zone in zones if len(zone.get('points') or []) >= 3]
+        self._size: Optional[Tuple[int, int]] = None
+        self._polygons: List[np.ndarray] = []
+        self._crop: Optional[Tuple[int, int, int, int]] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.zones)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def _prepare(self, width: int, height: int):
+        if self._size == (width, height):
+            return
+        scale = np.array([width, height], dtype=np.float32)
+        self._polygons = [np.asarray(zone['points'], dtype=np.float32) * scale for zone in self.zones]
+
+        all_points = np.concatenate(self._polygons)
+        x1 = all_points[:, 0].min() - CROP_MARGIN['left'] * width
+        x2 = all_points[:, 0].max() + CROP_MARGIN['right'] * width
+        y1 = all_points[:, 1].min() - CROP_MARGIN['top'] * height
+        y2 = all_points[:, 1].max() + CROP_MARGIN['bottom'] * height
+        self._crop = (max(0, int(x1)), max(0, int(y1)), min(width, int(np.ceil(x2))), min(height, int(np.ceil(y2))))
+        self._size = (width, height)
+
+    def crop_rect(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """
+        检测器的裁剪矩形
+
+        Returns:
+            Tuple: (x1, y1, x2, y2) 像素坐标
+        """
+        self._prepare(width, height)
+        return self._crop
+
+    def pixel_ratio(self, width: int, height: int) -> float:
+        """裁剪矩形占整幅画面的像素比例"""
+        x1, y1, x2, y2 = self.crop_rect(width, height)
+        return (x2 - x1) * (y2 - y1) / float(width * height)
+
+    def membership(self, boxes: np.ndarray, width: int, height: int) -> np.ndarray:
+        """
+        每个检测框的脚点落在哪些区域内
+
+        Args:
+            boxes: (N, >=4) 检测框，前4列为 x1, y1, x2, y2
+
+        Returns:
+            ndarray: (N, 区域数) bool
+        """
+        self._prepare(width, height)
+        boxes = np.asarray(boxes, dtype=np.float32)
+        if boxes.shape[0] == 0:
+            return np.zeros((0, len(self._polygons)), dtype=bool)
+        anchors = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]], axis=1)
+        return np.stack([points_in_polygon(anchors, polygon) for polygon in self._polygons], axis=1)
+
+    def inside_mask(self, boxes: np.ndarray, width: int, height: int) -> np.ndarray:
+        """脚点落在任一区域内的检测框"""
+        return self.membership(boxes, width, height).any(axis=1)
+
+    def filter(self, rows: np.ndarray, width: int, height: int) -> np.ndarray:
+        """丢弃脚点不在任何区域内的行（前4列为检测框）"""
+        if rows is None or rows.shape[0] == 0:
+            return rows
+        return rows[self.inside_mask(rows, width, height)]
+
+
+class ZoneEventTracker:
+    """根据跟踪结果产生区域进入/离开事件"""
+
+    def __init__(self, zone_set: ZoneSet, exit_grace_frames: int = 5):
+        """
+        初始化事件跟踪
+
+        Args:
+            zone_set: 区域集合
+            exit_grace_frames: 目标消失多少帧后判定为离开（区域外的检测已被丢弃，离开区域通常表现为目标消失）
+        """
+        self.zone_set = zone_set
+        self.exit_grace_frames = exit_grace_frames
+        self._state: Dict[int, Dict[str, Any]] = {}
+        self.enter_count = 0
+        self.exit_count = 0
+
+    def _event(self, event: str, zone_index: int, object_id: int, frame_number: int) -> Dict[str, Any]:
+        zone = self.zone_set.zones[zone_index]
+        if event == 'enter':
+            self.enter_count += 1
+        else:
+            self.exit_count += 1
+        return {
+            'event': event,
+            'zone_id': zone.get('id'),
+            'zone_name': zone.get('name'),
+            'object_id': int(object_id),
+            'frame_number': frame_number
+        }
+
+    def update(self, tracks: np.ndarray, frame_number: int, width: int, height: int) -> List[Dict[str, Any]]:
+        """
+        处理一帧的跟踪结果
+
+        Args:
+            tracks: (N, 8) 跟踪结果 [x1, y1, x2, y2, cls, track_id, Vx, Vy]
+            frame_number: 帧号
+            width: 画面宽度
+            height: 画面高度
+
+        Returns:
+            List[Dict]: 本帧产生的事件
+        """
+        events = []
+        if tracks is not None and tracks.shape[0]:
+            persons = tracks[tracks[:, 4].astype(np.int32) == 0]
+            membership = self.zone_set.membership(persons, width, height)
+            for row, inside in zip(persons, membership):
+                track_id = int(row[5])
+                current = set(np.flatnonzero(inside).tolist())
+                state = self._state.setdefault(track_id, {'zones': set(), 'last_seen': frame_number})
+                for zone_index in sorted(current - state['zones']):
+                    events.append(self._event('enter', zone_index, track_id, frame_number))
+                for zone_index in sorted(state['zones'] - current):
+                    events.append(self._event('exit', zone_index, track_id, frame_number))
+                state['zones'] = current
+                state['last_seen'] = frame_number
+
+        # 消失超过宽限帧数的目标视为离开
+        for track_id in list(self._state.keys()):
+            state = self._state[track_id]
+            if frame_number - state['last_seen'] > self.exit_grace_frames:
+                for zone_index in sorted(state['zones']):
+                    events.append(self._event('exit', zone_index, track_id, frame_number))
+                del self._state[track_id]
+        return events
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'zones': len(self.zone_set),
+            'objects_in_zones': sum(1 for state in self._state.values() if state['zones']),
+            'enter_events': self.enter_count,
+            'exit_events': self.exit_count
+        }
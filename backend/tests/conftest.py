@@ -0,0 +1,32 @@
+"""
+测试公共配置
+与 scripts 下的脚本一致，把 backend 目录和算法模块目录加入导入路径
+"""
+import os
+import sys
+
+import pytest
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(tests_dir)
+project_root = os.path.dirname(backend_dir)
+yolo_slowfast_path = os.path.join(project_root, 'yolo_slowfast-master')
+
+for path in (backend_dir, yolo_slowfast_path):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# 测试环境没有图形界面
+os.environ.setdefault('ENABLE_GUI', 'false')
+
+
+@pytest.fixture
+def reid_checkpoint(tmp_path):
+    """随机初始化的ReID模型权重文件（仓库未附带DeepSort的ReID权重）"""
+    import torch
+    from deep_sort.deep_sort.deep.model import Net
+
+    torch.manual_seed(0)
+    model_path = str(tmp_path / 'ckpt.t7')
+    torch.save({'net_dict': Net(reid=True).state_dict()}, model_path)
+    return model_path
@@ -0,0 +1,197 @@
+"""
+DeepSort关联步骤测试
+矩阵化的IoU/DIoU、马氏距离门控和匹配结果必须与原来逐个目标计算的实现一致
+"""
+import numpy as np
+import pytest
+import scipy.linalg
+
+from deep_sort.deep_sort.sort import iou_matching, kalman_filter, linear_assignment
+from deep_sort.deep_sort.sort.detection import Detection
+from deep_sort.deep_sort.sort.track import Track, TrackState
+
+
+def iou_scalar(bbox, candidates):
+    """原来的单框IoU实现"""
+    bbox_tl, bbox_br = bbox[:2], bbox[:2] + bbox[2:]
+    candidates_tl = candidates[:, :2]
+    candidates_br = candidates[:, :2] + candidates[:, 2:]
+    tl = np.c_[np.maximum(bbox_tl[0], candidates_tl[:, 0]), np.maximum(bbox_tl[1], candidates_tl[:, 1])]
+    br = np.c_[np.minimum(bbox_br[0], candidates_br[:, 0]), np.minimum(bbox_br[1], candidates_br[:, 1])]
+    wh = np.maximum(0., br - tl)
+    area_intersection = wh.prod(axis=1)
+    return area_intersection / (bbox[2:].prod() + candidates[:, 2:].prod(axis=1) - area_intersection)
+
+
+def diou_scalar(box, candis):
+    """原来的单框DIoU实现"""
+    center_a = np.array([box[0] + box[2] / 2, box[1] + box[3] / 2])
+    center_b = np.array([candis[:, 0] + candis[:, 2] / 2, candis[:, 1] + candis[:, 3] / 2]).T
+    center_dis = np.sum((center_a - center_b) ** 2, axis=-1)
+    max_x = np.maximum(box[0] + box[2], candis[:, 0] + candis[:, 2])
+    min_x = np.minimum(box[0], candis[:, 0])
+    max_y = np.maximum(box[1] + box[3], candis[:, 1] + candis[:, 3])
+    min_y = np.minimum(box[1], candis[:, 1])
+    max_dis = (max_x - min_x) ** 2 + (max_y - min_y) ** 2
+    return (1 + iou_scalar(box, candis) - center_dis / max_dis) / 2
+
+
+def gating_distance_scalar(kf, mean, covariance, measurements, only_position=False):
+    """原来的单个目标马氏距离实现"""
+    mean, covariance = kf.project(mean, covariance)
+    if only_position:
+        mean, covariance = mean[:2], covariance[:2, :2]
+        measurements = measurements[:, :2]
+    cholesky_factor = np.linalg.cholesky(covariance)
+    z = scipy.linalg.solve_triangular(cholesky_factor, (measurements - mean).T, lower=True)
+    return np.sum(z * z, axis=0)
+
+
+def random_boxes(rng, count, extent=400):
+    return np.c_[rng.uniform(0, extent, (count, 2)), rng.uniform(10, 120, (count, 2))]
+
+
+def build_scene(size, seed=0):
+    """size个已确认的跟踪目标，每个目标附近一个检测（部分漏检，另有少量误检）"""
+    rng = np.random.RandomState(seed)
+    kf = kalman_filter.KalmanFilter()
+    states = kalman_filter.TrackStates()
+    extent = 200 * np.sqrt(size)
+    tracks, detections = [], []
+    for track_id in range(size):
+        tlwh = np.r_[rng.uniform(0, extent, 2), rng.uniform(30, 60), rng.uniform(80, 160)]
+        mean, covariance = kf.initiate(Detection(tlwh, 0.9, 0, None).to_xyah())
+        track = Track(mean, covariance, track_id + 1, 2, 70, states=states)
+        track.state = TrackState.Confirmed
+        track.mean, track.covariance = kf.predict(track.mean, track.covariance)
+        # 少数目标上一帧未匹配，不能参与IoU匹配
+        track.time_since_update = 1 if rng.rand() < 0.8 else 3
+        tracks.append(track)
+
+        if rng.rand() < 0.9:
+            detections.append(Detection(tlwh + np.r_[rng.normal(0, 4, 2), 0, 0], 0.9, 0, None))
+        if rng.rand() < 0.2:
+            detections.append(Detection(np.r_[rng.uniform(0, extent, 2), 40, 120], 0.5, 0, None))
+    return kf, tracks, detections
+
+
+def iou_cost_scalar(tracks, detections, track_indices, detection_indices):
+    """逐行计算的IoU代价"""
+    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
+    candidates = np.asarray([detections[i].tlwh for i in detection_indices])
+    for row, track_idx in enumerate(track_indices):
+        if tracks[track_idx].time_since_update > 1:
+            cost_matrix[row, :] = linear_assignment.INFTY_COST
+            continue
+        cost_matrix[row, :] = 1. - iou_scalar(tracks[track_idx].to_tlwh(), candidates)
+    return cost_matrix
+
+
+def test_iou_matrix_matches_scalar():
+    rng = np.random.RandomState(0)
+    bboxes, candidates = random_boxes(rng, 30), random_boxes(rng, 45)
+    # 重合、包含、相接和完全分离的框
+    candidates[0] = bboxes[0]
+    candidates[1] = np.r_[bboxes[1, :2] + 2, bboxes[1, 2:] / 2]
+    candidates[2] = np.r_[bboxes[2, 0] + bboxes[2, 2], bboxes[2, 1], 20, 20]
+    candidates[3] = np.r_[5000, 5000, 10, 10]
+
+    result = iou_matching.iou_matrix(bboxes, candidates)
+    expected = np.stack([iou_scalar(bbox, candidates) for bbox in bboxes])
+    assert result.shape == (30, 45)
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+    assert result[0, 0] == pytest.approx(1.0)
+    assert result[2, 2] == 0.0 and result[3, 3] == 0.0
+
+
+def test_diou_matrix_matches_scalar():
+    rng = np.random.RandomState(1)
+    bboxes, candidates = random_boxes(rng, 20), random_boxes(rng, 25)
+    result = iou_matching.diou_matrix(bboxes, candidates)
+    expected = np.stack([diou_scalar(bbox, candidates) for bbox in bboxes])
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(iou_matching.diou(bboxes[3], candidates), expected[3])
+
+
+@pytest.mark.parametrize('size', [1, 10, 60])
+def test_iou_cost_matches_scalar(size):
+    kf, tracks, detections = build_scene(size)
+    track_indices = list(range(len(tracks)))
+    detection_indices = list(range(len(detections)))
+    result = iou_matching.iou_cost(tracks, detections, track_indices, detection_indices)
+    expected = iou_cost_scalar(tracks, detections, track_indices, detection_indices)
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_iou_cost_without_detections():
+    kf, tracks, detections = build_scene(5)
+    assert iou_matching.iou_cost(tracks, detections, [0, 1], []).shape == (2, 0)
+
+
+@pytest.mark.parametrize('only_position', [False, True])
+@pytest.mark.parametrize('size', [1, 10, 60])
+def test_gate_cost_matrix_matches_per_track(size, only_position):
+    kf, tracks, detections = build_scene(size, seed=size)
+    # 打乱目标和检测的顺序，确认按索引取值
+    rng = np.random.RandomState(2)
+    track_indices = list(rng.permutation(len(tracks)))
+    detection_indices = list(rng.permutation(len(detections)))
+    base_cost = rng.uniform(0, 0.3, (len(track_indices), len(detection_indices)))
+
+    result = linear_assignment.gate_cost_matrix(
+        kf, base_cost.copy(), tracks, detections, track_indices, detection_indices,
+        only_position=only_position)
+
+    expected = base_cost.copy()
+    threshold = kalman_filter.chi2inv95[2 if only_position else 4]
+    measurements = np.asarray([detections[i].to_xyah() for i in detection_indices])
+    for row, track_idx in enumerate(track_indices):
+        track = tracks[track_idx]
+        distance = gating_distance_scalar(kf, track.mean, track.covariance, measurements, only_position)
+        expected[row, distance > threshold] = linear_assignment.INFTY_COST
+    np.testing.assert_array_equal(result, expected)
+    # 每个目标附近的检测不应被门控掉
+    assert (result < linear_assignment.INFTY_COST).any()
+
+
+def test_batched_gating_distance_matches_scalar():
+    kf, tracks, detections = build_scene(20, seed=3)
+    mean = np.stack([track.mean for track in tracks])
+    covariance = np.stack([track.covariance for track in tracks])
+    measurements = np.asarray([detection.to_xyah() for detection in detections])
+    result = kf.gating_distance(mean, covariance, measurements)
+    expected = np.stack([gating_distance_scalar(kf, m, c, measurements) for m, c in zip(mean, covariance)])
+    np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize('size', [1, 10, 60, 200])
+def test_min_cost_matching_matches_scalar_cost(size):
+    kf, tracks, detections = build_scene(size, seed=size + 7)
+    track_indices = list(range(len(tracks)))
+    detection_indices = list(range(len(detections)))
+
+    result = linear_assignment.min_cost_matching(
+        iou_matching.iou_cost, 0.7, tracks, detections, track_indices, detection_indices)
+    expected = linear_assignment.min_cost_matching(
+        iou_cost_scalar, 0.7, tracks, detections, track_indices, detection_indices)
+
+    matches, unmatched_tracks, unmatched_detections = result
+    assert sorted(matches) == sorted(expected[0])
+    assert sorted(unmatched_tracks) == sorted(expected[1])
+    assert sorted(unmatched_detections) == sorted(expected[2])
+    # 每个目标和检测恰好出现一次
+    assert sorted([t for t, _ in matches] + list(unmatched_tracks)) == track_indices
+    assert sorted([d for _, d in matches] + list(unmatched_detections)) == detection_indices
+
+
+def test_min_cost_matching_rejects_costs_above_threshold():
+    cost = np.array([[0.1, 0.9], [0.95, 0.8]])
+
+    def metric(tracks, detections, track_indices, detection_indices):
+        return cost[np.ix_(track_indices, detection_indices)].copy()
+
+    matches, unmatched_tracks, unmatched_detections = linear_assignment.min_cost_matching(
+        metric, 0.5, [None, None], [None, None])
+    assert matches == [(0, 0)]
+    assert unmatched_tracks == [1]
+    assert unmatched_detections == [1]
@@ -0,0 +1,122 @@
+"""
+行为片段测试：编码 → 重建逐帧结果的往返一致性，以及同时写入逐帧结果行时统计不重复计数
+"""
+import pytest
+from flask import Flask
+
+from models.database import db, DetectionTask, BehaviorSegment
+from services.behavior_segments import BehaviorSegmentEncoder, BehaviorSegmentWriter, rebuild_frame_results
+from services.result_sink import DetectionRowWriter
+from services.rollups import _collect_counts
+
+
+def make_detections(frames: int = 60, fps: float = 30.0):
+    """
+    两个匀速运动的目标：目标1在第20帧从walk变为fall down，目标2在第30-34帧消失
+
+    Returns:
+        List[Dict]: 按帧顺序排列的检测结果
+    """
+    detections = []
+    for frame_number in range(1, frames + 1):
+        for object_id in (1, 2):
+            if object_id == 2 and 30 <= frame_number < 35:
+                continue
+            behavior = 'fall down' if object_id == 1 and frame_number >= 20 else 'walk'
+            x = 10.0 * object_id + 2.0 * frame_number
+            detections.append({
+                'frame_number': frame_number,
+                'timestamp': frame_number / fps,
+                'object_id': object_id,
+                'object_type': 'person',
+                'confidence': 0.5 + 0.01 * object_id,
+                'bbox': {'x1': x, 'y1': 20.0, 'x2': x + 40.0, 'y2': 140.0},
+                'behavior_type': behavior,
+                'is_anomaly': behavior == 'fall down'
+            })
+    return detections
+
+
+def encode(detections, keyframe_interval: int = 5, batch_size: int = 7):
+    """分批输入编码器，返回未入库的 BehaviorSegment 对象"""
+    encoder = BehaviorSegmentEncoder(keyframe_interval=keyframe_interval)
+    rows = []
+    for start in range(0, len(detections), batch_size):
+        rows.extend(encoder.push(detections[start:start + batch_size]))
+    rows.extend(encoder.flush())
+    return [BehaviorSegment(id=index + 1, task_id=1, **row) for index, row in enumerate(rows)]
+
+
+def test_segments_split_on_behavior_change_and_gap():
+    segments = encode(make_detections())
+    spans = sorted((s.object_id, s.behavior_type, s.start_frame, s.end_frame) for s in segments)
+    assert spans == [
+        (1, 'fall down', 20, 60),
+        (1, 'walk', 1, 19),
+        (2, 'walk', 1, 29),
+        (2, 'walk', 35, 60),
+    ]
+    assert sum(s.frame_count for s in segments) == len(make_detections())
+
+
+@pytest.mark.parametrize('fps', [25.0, 30.0, 12.5])
+def test_rebuild_round_trip(fps):
+    detections = make_detections(fps=fps)
+    rebuilt = rebuild_frame_results(encode(detections))
+
+    expected = sorted(detections, key=lambda d: (d['frame_number'], d['object_id']))
+    assert len(rebuilt) == len(expected)
+    for result, detection in zip(rebuilt, expected):
+        assert result['frame_number'] == detection['frame_number']
+        assert result['object_id'] == detection['object_id']
+        assert result['behavior_type'] == detection['behavior_type']
+        assert result['is_anomaly'] == detection['is_anomaly']
+        assert result['timestamp'] == pytest.approx(detection['timestamp'])
+        assert result['confidence'] == pytest.approx(detection['confidence'])
+        for key in ('x1', 'y1', 'x2', 'y2'):
+            assert result['bbox'][key] == pytest.approx(detection['bbox'][key])
+
+
+def test_rebuild_frame_range_and_limit():
+    segments = encode(make_detections())
+    window = rebuild_frame_results(segments, start_frame=28, end_frame=36)
+    assert {r['frame_number'] for r in window} == set(range(28, 37))
+    assert [r['object_id'] for r in window if r['frame_number'] == 32] == [1]
+
+    limited = rebuild_frame_results(segments, limit=5)
+    assert [(r['frame_number'], r['object_id']) for r in limited] == [(1, 1), (1, 2), (2, 1), (2, 2), (3, 1)]
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+
+
+def write_task(detections, store_detections: bool, with_segments: bool) -> int:
+    task = DetectionTask(task_name='test', source_type='video')
+    db.session.add(task)
+    db.session.commit()
+
+    writers = [DetectionRowWriter(task.id, store_detections=store_detections)]
+    if with_segments:
+        writers.append(BehaviorSegmentWriter(task.id))
+    for writer in writers:
+        writer.write_batch(detections)
+        writer.finish()
+    db.session.commit()
+    return task.id
+
+
+def test_rows_written_alongside_segments_are_counted_once(app):
+    detections = make_detections()
+    write_task(detections, store_detections=True, with_segments=True)
+    write_task(detections, store_detections=False, with_segments=True)
+    write_task(detections, store_detections=True, with_segments=False)  # 旧任务
+
+    detection_counts, _ = _collect_counts()
+    assert sum(detection_counts.values()) == 3 * len(detections)
@@ -0,0 +1,133 @@
+"""
+ClipRingBuffer 测试：环绕写入、BGR→RGB转换和零拷贝视图的生命周期
+"""
+import numpy as np
+import pytest
+
+from yolo_slowfast import ClipOverwrittenError, ClipRingBuffer
+
+
+def make_frame(index: int, height: int = 4, width: int = 6) -> np.ndarray:
+    """第index帧：B、G、R三个通道分别为 index、index+1、index+2（对256取模）"""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for channel in range(3):
+        frame[..., channel] = (index + channel) % 256
+    return frame
+
+
+def assert_clip_frames(clip, first: int, count: int):
+    """clip为 (C, T, H, W) 的RGB张量，依次对应 first 开始的 count 帧"""
+    assert tuple(clip.shape[:2]) == (3, count)
+    for t in range(count):
+        index = first + t
+        # RGB顺序：R=index+2, G=index+1, B=index
+        assert clip[:, t, 0, 0].tolist() == [(index + 2) % 256, (index + 1) % 256, index % 256]
+
+
+def test_wraps_around_banks():
+    ring = ClipRingBuffer(clip_len=4, banks=3)
+    for clip_index in range(7):
+        for t in range(4):
+            ring.append(make_frame(clip_index * 4 + t))
+        assert len(ring) == 4
+        clip = ring.pop_clip()
+        assert len(ring) == 0
+        assert_clip_frames(clip, clip_index * 4, 4)
+
+
+def test_view_valid_until_bank_rewritten():
+    ring = ClipRingBuffer(clip_len=4, banks=3)
+    for t in range(4):
+        ring.append(make_frame(t))
+    clip = ring.pop_clip()
+
+    # 之后 (banks-1)*clip_len 帧写入其他bank，视图保持有效
+    for t in range(4, 4 + 2 * 4):
+        ring.append(make_frame(t))
+        if len(ring) == ring.clip_len:
+            ring.pop_clip()
+        assert ClipRingBuffer.clip_valid(clip)
+    ClipRingBuffer.check_clip(clip)
+    assert_clip_frames(clip, 0, 4)
+
+    # 下一帧重新写入该bank
+    ring.append(make_frame(12))
+    assert not ClipRingBuffer.clip_valid(clip)
+    with pytest.raises(ClipOverwrittenError):
+        ClipRingBuffer.check_clip(clip)
+
+
+def test_copy_is_never_invalidated():
+    ring = ClipRingBuffer(clip_len=2, banks=2)
+    ring.append(make_frame(0))
+    ring.append(make_frame(1))
+    clip = ring.pop_clip(copy=True)
+    for t in range(2, 10):
+        ring.append(make_frame(t))
+        if len(ring) == ring.clip_len:
+            ring.pop_clip()
+    ClipRingBuffer.check_clip(clip)
+    assert_clip_frames(clip, 0, 2)
+
+
+def test_resolution_change_keeps_popped_views():
+    ring = ClipRingBuffer(clip_len=2, banks=2)
+    ring.append(make_frame(0))
+    ring.append(make_frame(1))
+    clip = ring.pop_clip()
+
+    # 分辨率变化时重新分配缓冲区，已取出的视图仍引用旧缓冲区
+    for t in range(2, 8):
+        ring.append(make_frame(t, height=8, width=8))
+    ClipRingBuffer.check_clip(clip)
+    assert_clip_frames(clip, 0, 2)
+
+
+def test_blank_frames_rewrite_bank():
+    ring = ClipRingBuffer(clip_len=2, banks=1)
+    ring.append(make_frame(0))
+    ring.append(make_frame(1))
+    clip = ring.pop_clip()
+    ring.append_blank()
+    assert not ClipRingBuffer.clip_valid(clip)
+
+
+def read_batched(ring: ClipRingBuffer, batch_size: int, num_frames: int):
+    """
+    按批读帧，整批读完后才使用批内的clip（与离线检测的顺序路径一致）
+
+    Returns:
+        List: 每个clip的 (最后一帧下标, 使用时是否仍然有效, 内容是否正确)
+    """
+    results = []
+    batch = []
+    for index in range(num_frames):
+        ring.append(make_frame(index))
+        batch.append((index, ring.pop_clip() if len(ring) == ring.clip_len else None))
+        if len(batch) == batch_size or index == num_frames - 1:
+            for last_index, clip in batch:
+                if clip is None:
+                    continue
+                first = last_index - ring.clip_len + 1
+                correct = clip[2, :, 0, 0].tolist() == [t % 256 for t in range(first, last_index + 1)]
+                results.append((last_index, ClipRingBuffer.clip_valid(clip), correct))
+            batch = []
+    return results
+
+
+@pytest.mark.parametrize('clip_len', [16, 25])
+@pytest.mark.parametrize('batch_size', [1, 8, 18, 25, 26, 60])
+def test_banks_for_covers_batched_reads(clip_len, batch_size):
+    ring = ClipRingBuffer(clip_len=clip_len, banks=ClipRingBuffer.banks_for(batch_size, clip_len))
+    results = read_batched(ring, batch_size, 8 * clip_len + batch_size)
+    assert len(results) >= 8
+    assert all(valid and correct for _, valid, correct in results)
+
+
+@pytest.mark.parametrize('clip_len, batch_size', [(16, 33), (25, 60)])
+def test_too_few_banks_is_detected(clip_len, batch_size):
+    """bank数不足时读到的是后面的帧，每个这样的clip都能被检查出来"""
+    ring = ClipRingBuffer(clip_len=clip_len, banks=2)
+    results = read_batched(ring, batch_size, 8 * clip_len + batch_size)
+    assert any(not correct for _, _, correct in results)
+    assert all(valid == correct for _, valid, correct in results)
@@ -0,0 +1,96 @@
+"""
+批量读帧测试
+按批次读取时每帧的帧号、clip以及clip的内容必须与逐帧读取一致
+"""
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from services.detection_service import BehaviorDetectionService
+from yolo_slowfast import ClipRingBuffer, MyVideoCapture
+
+
+CLIP_LEN = 8
+FRAMES = 50
+
+
+def frame_value(index: int) -> int:
+    """第index帧（从0开始）的像素值"""
+    return (index * 5) % 256
+
+
+@pytest.fixture(scope='module')
+def video_path(tmp_path_factory):
+    """纯色测试视频，第i帧的像素值为 frame_value(i)"""
+    path = str(tmp_path_factory.mktemp('video') / 'frames.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (64, 48))
+    for index in range(FRAMES):
+        writer.write(np.full((48, 64, 3), frame_value(index), dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.fixture(scope='module')
+def service():
+    return BehaviorDetectionService({'device': 'cpu'})
+
+
+def read_all(service, video_path, batch_size, **kwargs):
+    """读完整个视频，每批读完后才检查clip内容（与检测流程中使用clip的时机一致）"""
+    cap = MyVideoCapture(video_path, clip_len=CLIP_LEN,
+                         clip_banks=ClipRingBuffer.banks_for(batch_size, CLIP_LEN))
+    frames = []
+    for batch in service._iter_frame_batches(cap, None, batch_size, **kwargs):
+        assert len(batch) <= batch_size
+        for packet in batch:
+            clip = packet['clip']
+            first = None
+            if clip is not None:
+                # clip为 (C, T, H, W)，第一帧应是之前第 clip_len-1 帧
+                first = int(clip[0, 0, 0, 0])
+                assert abs(first - frame_value(packet['frame_number'] - CLIP_LEN)) <= 2
+            frames.append((packet['frame_number'], clip is not None))
+    cap.release()
+    return frames
+
+
+@pytest.mark.parametrize('batch_size', [2, 5, 8, 13])
+def test_batches_match_frame_by_frame(service, video_path, batch_size):
+    expected = read_all(service, video_path, 1)
+    assert [number for number, _ in expected] == list(range(1, FRAMES + 1))
+    assert [number for number, has_clip in expected if has_clip] == list(range(CLIP_LEN, FRAMES + 1, CLIP_LEN))
+    assert read_all(service, video_path, batch_size) == expected
+
+
+def test_last_frame_limits_the_range(service, video_path):
+    frames = read_all(service, video_path, 4, last_frame=30)
+    assert [number for number, _ in frames] == list(range(1, 31))
+
+
+def test_stop_event_ends_iteration(service, video_path):
+    cap = MyVideoCapture(video_path, clip_len=CLIP_LEN, clip_banks=ClipRingBuffer.banks_for(4, CLIP_LEN))
+    stop_event = threading.Event()
+    batches = service._iter_frame_batches(cap, None, 4, stop_event=stop_event)
+    assert len(next(batches)) == 4
+    stop_event.set()
+    assert list(batches) == []
+    cap.release()
+
+
+def test_waits_for_clip_slot_and_honours_stop(service, video_path):
+    """clip名额用完时停在下一个clip之前，停止后不再继续读"""
+    cap = MyVideoCapture(video_path, clip_len=CLIP_LEN, clip_banks=2)
+    stop_event = threading.Event()
+    clip_slots = threading.Semaphore(1)
+    timer = threading.Timer(0.3, stop_event.set)
+    timer.start()
+    frames = [packet['frame_number']
+              for batch in service._iter_frame_batches(cap, None, 1, stop_event=stop_event, clip_slots=clip_slots)
+              for packet in batch]
+    timer.cancel()
+    cap.release()
+    # 第一个clip拿到了唯一的名额，第二个clip（第16帧）一直等到停止
+    assert frames == list(range(1, 2 * CLIP_LEN))
+    assert stop_event.is_set()
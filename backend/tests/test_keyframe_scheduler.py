@@ -0,0 +1,133 @@
+"""
+关键帧调度测试
+自适应步长在批量检测和流水线模式下检测的帧、输出结果必须与逐帧顺序执行一致
+"""
+import cv2
+import numpy as np
+import pytest
+
+from deep_sort.deep_sort import DeepSort
+from services.action_profiles import resolve_action_profile
+from services.detection_service import BehaviorDetectionService
+from services.keyframe_scheduler import KeyframeScheduler
+
+
+FRAMES = 60
+WIDTH, HEIGHT = 320, 240
+
+
+def frame_value(index: int) -> int:
+    """第index帧（从0开始）的像素值，检测桩据此识别帧号"""
+    return index * 4
+
+
+def scene(index: int) -> np.ndarray:
+    """
+    第index帧的目标框 [x1, y1, x2, y2, conf, cls]：
+    人员A缓慢移动，第25帧出现人员B，第40帧起人员A快速移动
+    """
+    x = 40 + min(index, 40) + max(0, index - 40) * 8
+    boxes = [[x, 40, x + 40, 140, 0.9, 0]]
+    if index >= 25:
+        boxes.append([220, 60, 260, 170, 0.9, 0])
+    return np.array(boxes, dtype=np.float32)
+
+
+@pytest.fixture(scope='module')
+def video_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('video') / 'scene.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (WIDTH, HEIGHT))
+    for index in range(FRAMES):
+        writer.write(np.full((HEIGHT, WIDTH, 3), frame_value(index), dtype=np.uint8))
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def service(reid_checkpoint):
+    service = BehaviorDetectionService({'device': 'cpu'})
+    service.deepsort_tracker = DeepSort(reid_checkpoint, use_cuda=False)
+    service.ava_labelnames = {index: f'action_{index}' for index in range(1, 82)}
+    service._recognize_actions = lambda source_id, clip, tracks, profile: (
+        [int(tid) for tid in tracks[:, 5]], [int(tid) % 5 for tid in tracks[:, 5]])
+    return service
+
+
+def run(service, video_path, pipeline: bool, batch_size: int):
+    """以自适应步长运行一次检测，返回结果、YOLO检测过的帧和调度统计"""
+    detected = []
+
+    def detect_batch(imgs, config, crops=None):
+        indices = [int(round(img[0, 0, 0] / 4.0)) for img in imgs]
+        detected.extend(indices)
+        return [scene(index) for index in indices]
+
+    service._detect_batch = detect_batch
+    service.deepsort_tracker.reset()
+
+    task_id = f"{'pipeline' if pipeline else 'sequential'}_{batch_size}"
+    service.current_tasks[task_id] = {'status': 'running'}
+    config = type('Config', (), {})()
+    config.input = video_path
+    config.output = None
+    config.task_id = task_id
+    config.action_profile = resolve_action_profile('balanced')
+    config.options = {'adaptive_stride': True, 'max_detection_stride': 6}
+    config.batch_size = batch_size
+    config.queue_size = 2
+    config.pipeline = pipeline
+
+    results = service._run_detection(config, task_id)
+    return results, detected, service.current_tasks[task_id]['keyframe_stats']
+
+
+def test_plan_matches_decision_for_fixed_stride():
+    scheduler = KeyframeScheduler(stride=3)
+    plans = [scheduler.plan_keyframe(number) for number in range(1, 20)]
+    decisions = [scheduler.is_keyframe(number, plan) for number, plan in zip(range(1, 20), plans)]
+    assert plans == decisions
+    assert decisions[:7] == [True, False, False, True, False, False, True]
+    stats = scheduler.get_stats()
+    assert stats['promoted_keyframes'] == 0 and stats['discarded_detections'] == 0
+
+
+def test_decision_follows_observed_tracks_not_plan():
+    scheduler = KeyframeScheduler(adaptive=True, max_stride=4)
+    still = np.array([[0, 0, 10, 10, 0, 1, 0, 0]], dtype=np.float32)
+    two_people = np.array([[0, 0, 10, 10, 0, 1, 0, 0], [50, 50, 60, 60, 0, 2, 0, 0]], dtype=np.float32)
+    number = 0
+    while scheduler.current_stride < 4:
+        number += 1
+        if scheduler.is_keyframe(number, scheduler.plan_keyframe(number)):
+            scheduler.observe(still)
+
+    # 解码端领先跟踪端8帧，按当前步长4预判
+    frames = range(number + 1, number + 9)
+    plans = [scheduler.plan_keyframe(n) for n in frames]
+    assert plans == [False, False, False, True] * 2
+
+    # 第4帧出现新目标后步长回到1再逐步增大，关键帧按跟踪结果判定而不是预判
+    decisions = []
+    for n, plan in zip(frames, plans):
+        decisions.append(scheduler.is_keyframe(n, plan))
+        if decisions[-1]:
+            scheduler.observe(two_people)
+    assert decisions == [False, False, False, True, True, False, True, False]
+    stats = scheduler.get_stats()
+    assert stats['promoted_keyframes'] == 2
+    assert stats['discarded_detections'] == 1
+
+
+@pytest.mark.parametrize('pipeline, batch_size', [(False, 4), (True, 1), (True, 4)])
+def test_adaptive_stride_matches_frame_by_frame(service, video_path, pipeline, batch_size):
+    expected, expected_detected, expected_stats = run(service, video_path, False, 1)
+    results, detected, stats = run(service, video_path, pipeline, batch_size)
+
+    assert len(expected) > FRAMES
+    assert stats['keyframes'] == expected_stats['keyframes']
+    assert stats['skipped_frames'] == expected_stats['skipped_frames']
+    # 逐帧顺序执行没有预判偏差；其他模式最终检测的帧相同，只可能多做被丢弃的检测
+    assert expected_stats['promoted_keyframes'] == expected_stats['discarded_detections'] == 0
+    assert len(detected) == len(expected_detected) + stats['discarded_detections']
+    assert set(expected_detected) <= set(detected)
+    assert results == expected
@@ -0,0 +1,87 @@
+"""
+运动门控测试
+包括门控本身的判定，以及实时跟踪中目标离开画面后门控能重新关闭
+"""
+import cv2
+import numpy as np
+import pytest
+
+from deep_sort.deep_sort import DeepSort
+from services.detection_service import BehaviorDetectionService
+from services.motion_gate import MotionGate
+from services.stream_session import StreamSession
+
+
+WIDTH, HEIGHT = 640, 360
+PERSON = (200, 80, 280, 300)
+
+
+def background() -> np.ndarray:
+    """带固定纹理的静止背景"""
+    rng = np.random.default_rng(0)
+    return rng.integers(60, 120, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+
+def frame_with_person(offset: int) -> np.ndarray:
+    img = background()
+    x1, y1, x2, y2 = PERSON
+    cv2.rectangle(img, (x1 + offset, y1), (x2 + offset, y2), (230, 230, 230), -1)
+    return img
+
+
+@pytest.fixture
+def tracker(reid_checkpoint):
+    return DeepSort(reid_checkpoint, use_cuda=False, n_init=2, max_age=30)
+
+
+def test_static_frames_are_gated():
+    gate = MotionGate(max_gated_frames=1000)
+    img = background()
+    assert gate.should_detect(img, False)  # 第一帧没有参考帧
+    for _ in range(10):
+        assert not gate.should_detect(img, False)
+    assert gate.get_stats()['gated_frames'] == 10
+
+
+def test_motion_and_active_tracks_force_detection():
+    gate = MotionGate(max_gated_frames=1000)
+    assert gate.should_detect(background(), False)
+    assert gate.should_detect(frame_with_person(0), False)
+    # 画面不变但仍有活跃目标时继续检测
+    assert gate.should_detect(frame_with_person(0), True)
+    assert not gate.should_detect(frame_with_person(0), False)
+
+
+def test_max_gated_frames_forces_periodic_detection():
+    gate = MotionGate(max_gated_frames=5)
+    img = background()
+    decisions = [gate.should_detect(img, False) for _ in range(13)]
+    assert decisions == [True] + [False] * 5 + [True] + [False] * 5 + [True]
+
+
+def test_gate_closes_after_tracks_expire(tracker):
+    service = BehaviorDetectionService({'device': 'cpu'})
+    session = StreamSession('camera-0', 0, tracker=tracker)
+    session.motion_gate = MotionGate(max_gated_frames=1000)
+
+    person_frames = 20
+    frames = [frame_with_person(index * 4) for index in range(person_frames)] + [background()] * 60
+
+    def realtime_detect(session, img):
+        index = realtime_detect.calls
+        realtime_detect.calls += 1
+        if index >= person_frames:
+            return None  # 目标离开后YOLO不再有检测结果
+        x1, y1, x2, y2 = PERSON
+        offset = index * 4
+        return np.array([[x1 + offset, y1, x2 + offset, y2, 0.9, 0]], dtype=np.float32)
+    realtime_detect.calls = 0
+    service._realtime_detect = realtime_detect
+
+    outputs = [service._realtime_track(session, img) for img in frames]
+
+    assert len(outputs[person_frames - 1]) == 1
+    assert not tracker.has_active_tracks()
+    # 目标离开后只需检测一两帧，之后静止画面全部被门控跳过
+    assert realtime_detect.calls <= person_frames + 2
+    assert session.motion_gate.get_stats()['gated_frames'] >= 58
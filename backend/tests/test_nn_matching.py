@@ -0,0 +1,123 @@
+"""
+外观特征库测试
+预分配的环形特征库在预算淘汰、目标离开后释放和复用行时，样本和距离必须与原来按列表保存的实现一致
+"""
+import numpy as np
+import pytest
+
+from deep_sort.deep_sort.sort import nn_matching
+from deep_sort.deep_sort.sort.nn_matching import NearestNeighborDistanceMetric
+
+
+class ListMetric:
+    """原来按目标保存样本列表的实现"""
+
+    def __init__(self, metric, budget=None):
+        self._metric = nn_matching._nn_cosine_distance if metric == 'cosine' \
+            else nn_matching._nn_euclidean_distance
+        self.budget = budget
+        self.samples = {}
+
+    def partial_fit(self, features, targets, active_targets):
+        for feature, target in zip(features, targets):
+            self.samples.setdefault(target, []).append(feature)
+            if self.budget is not None:
+                self.samples[target] = self.samples[target][-self.budget:]
+        self.samples = {k: self.samples[k] for k in active_targets}
+
+    def distance(self, features, targets):
+        cost_matrix = np.zeros((len(targets), len(features)))
+        for i, target in enumerate(targets):
+            cost_matrix[i, :] = self._metric(self.samples[target], features)
+        return cost_matrix
+
+
+def normalized(features):
+    features = np.asarray(features, dtype=np.float32)
+    return features / np.linalg.norm(features, axis=1, keepdims=True)
+
+
+def assert_same_samples(metric, reference, cosine):
+    samples = metric.samples
+    assert set(samples) == set(reference.samples)
+    for target, expected in reference.samples.items():
+        expected = normalized(expected) if cosine else np.asarray(expected, dtype=np.float32)
+        np.testing.assert_allclose(np.asarray(samples[target]), expected, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('budget', [None, 1, 5, 100])
+@pytest.mark.parametrize('metric_name', ['cosine', 'euclidean'])
+def test_gallery_matches_list_metric(metric_name, budget):
+    """随机的目标出现、离开和重新出现序列，覆盖环形覆盖、行释放复用和扩容"""
+    rng = np.random.RandomState(0)
+    cosine = metric_name == 'cosine'
+    metric = NearestNeighborDistanceMetric(metric_name, 0.2, budget)
+    reference = ListMetric(metric_name, budget)
+    next_target = 1
+    active = []
+
+    for _ in range(120):
+        # 新目标进入、部分目标离开，最多约60个目标（超过初始的32行）
+        if len(active) < 60:
+            count = rng.randint(0, 7)
+            active += list(range(next_target, next_target + count))
+            next_target += count
+        active = [t for t in active if rng.rand() > 0.05]
+
+        observed = [t for t in active if rng.rand() < 0.8]
+        features = rng.normal(size=(len(observed), 16)).astype(np.float32)
+        metric.partial_fit(features, np.array(observed, dtype=int), active)
+        reference.partial_fit(list(features), observed, [t for t in active if t in reference.samples
+                                                          or t in observed])
+        active = list(reference.samples)
+
+        assert_same_samples(metric, reference, cosine)
+        if active:
+            queries = rng.normal(size=(6, 16)).astype(np.float32)
+            targets = list(rng.permutation(active))
+            np.testing.assert_allclose(metric.distance(queries, targets),
+                                       reference.distance(list(queries), targets),
+                                       rtol=1e-4, atol=1e-4)
+
+
+def test_budget_evicts_oldest_samples():
+    metric = NearestNeighborDistanceMetric('euclidean', 0.2, budget=3)
+    for value in range(1, 8):
+        metric.partial_fit(np.full((1, 4), value, dtype=np.float32), np.array([1]), [1])
+    samples = metric.samples[1]
+    assert [sample[0] for sample in samples] == [5.0, 6.0, 7.0]
+    # 被淘汰的样本不再参与距离计算
+    assert metric.distance(np.full((1, 4), 1, dtype=np.float32), [1])[0, 0] == pytest.approx(64.0)
+
+
+def test_gallery_grows_without_budget():
+    metric = NearestNeighborDistanceMetric('euclidean', 0.2)
+    for value in range(40):
+        metric.partial_fit(np.full((1, 2), value, dtype=np.float32), np.array([1]), [1])
+    assert [sample[0] for sample in metric.samples[1]] == list(range(40))
+    assert metric.distance(np.zeros((1, 2), dtype=np.float32), [1])[0, 0] == pytest.approx(0.0)
+
+
+def test_inactive_targets_release_their_rows():
+    metric = NearestNeighborDistanceMetric('cosine', 0.2, budget=4)
+    first = np.eye(8, dtype=np.float32)[:2]
+    metric.partial_fit(first, np.array([1, 2]), [1, 2])
+    row = metric._rows[1]
+
+    metric.partial_fit(np.zeros((0, 8), dtype=np.float32), np.array([], dtype=int), [2])
+    assert set(metric.samples) == {2}
+    assert row in metric._free_rows
+
+    # 新目标复用释放的行时看不到旧目标留下的样本
+    metric.partial_fit(np.eye(8, dtype=np.float32)[5:6], np.array([3]), [2, 3])
+    assert metric._rows[3] == row
+    assert len(metric.samples[3]) == 1
+    distance = metric.distance(first[:1], [3])
+    assert distance[0, 0] == pytest.approx(1.0)
+
+
+def test_distance_without_targets_or_features():
+    metric = NearestNeighborDistanceMetric('cosine', 0.2, budget=4)
+    metric.partial_fit(np.ones((1, 8), dtype=np.float32), np.array([1]), [1])
+    assert metric.distance(np.ones((0, 8), dtype=np.float32), [1]).shape == (1, 0)
+    assert metric.distance(np.ones((2, 8), dtype=np.float32), []).shape == (0, 2)
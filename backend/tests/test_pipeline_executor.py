@@ -0,0 +1,102 @@
+"""
+PipelineExecutor 测试：输出顺序、丢弃数据项、异常传播和停止事件
+"""
+import random
+import threading
+import time
+
+import pytest
+
+from services.pipeline_executor import PipelineExecutor
+
+
+def test_preserves_order_across_stages():
+    rng = random.Random(0)
+    output = []
+
+    def jitter(item):
+        time.sleep(rng.uniform(0, 0.002))
+        return item
+
+    def collect(item):
+        output.append(item)
+        return None
+
+    executor = PipelineExecutor('source', range(200),
+                                [('a', jitter), ('b', lambda item: item * 2), ('c', jitter), ('sink', collect)],
+                                queue_size=2)
+    stats = executor.run()
+
+    assert output == [item * 2 for item in range(200)]
+    assert stats['source']['items'] == 200
+    assert stats['sink']['items'] == 200
+
+
+def test_none_result_drops_item():
+    output = []
+    executor = PipelineExecutor('source', range(10),
+                                [('even', lambda item: item if item % 2 == 0 else None),
+                                 ('sink', output.append)])
+    stats = executor.run()
+
+    assert output == [0, 2, 4, 6, 8]
+    assert stats['even']['items'] == 10
+    assert stats['sink']['items'] == 5
+
+
+def test_stage_error_stops_pipeline():
+    seen = []
+
+    def fail_at_five(item):
+        if item == 5:
+            raise ValueError('boom')
+        return item
+
+    # 数据源无限产生数据，只有出错后的停止信号能结束流水线
+    def endless():
+        item = 0
+        while True:
+            yield item
+            item += 1
+
+    executor = PipelineExecutor('source', endless(),
+                                [('fail', fail_at_five), ('sink', seen.append)], queue_size=2)
+    with pytest.raises(RuntimeError, match='fail'):
+        executor.run()
+
+    assert executor.stop_event.is_set()
+    assert seen == [0, 1, 2, 3, 4]
+
+
+def test_source_error_is_reported():
+    def broken():
+        yield 1
+        raise OSError('decode failed')
+
+    executor = PipelineExecutor('decode', broken(), [('sink', lambda item: None)])
+    with pytest.raises(RuntimeError, match='decode'):
+        executor.run()
+
+
+def test_external_stop_event():
+    stop_event = threading.Event()
+    seen = []
+
+    def stop_after_three(item):
+        seen.append(item)
+        if len(seen) == 3:
+            stop_event.set()
+        return None
+
+    def endless():
+        item = 0
+        while True:
+            yield item
+            item += 1
+
+    executor = PipelineExecutor('source', endless(), [('sink', stop_after_three)],
+                                queue_size=1, stop_event=stop_event)
+    executor.run()
+
+    # 停止后最多再处理已在队列中的数据项
+    assert 3 <= len(seen) <= 5
@@ -0,0 +1,108 @@
+"""
+IoU直接匹配测试
+只有没有争用的已确认目标/检测对才能跳过外观特征，由IoU直接匹配
+"""
+import numpy as np
+
+from deep_sort.deep_sort.sort.detection import Detection
+from deep_sort.deep_sort.sort.nn_matching import NearestNeighborDistanceMetric
+from deep_sort.deep_sort.sort.track import TrackState
+from deep_sort.deep_sort.sort.tracker import Tracker
+
+
+def detection(tlwh):
+    return Detection(np.asarray(tlwh, dtype=np.float64), 0.9, 0, None)
+
+
+def make_tracker(boxes, states=None, **params):
+    """
+    为每个框建立一个目标并预测一帧（time_since_update 为1）
+
+    Args:
+        boxes: 目标框列表 (x, y, w, h)
+        states: 各目标的状态，默认全部为已确认
+    """
+    tracker = Tracker(NearestNeighborDistanceMetric('cosine', 0.2, 100), **params)
+    for index, box in enumerate(boxes):
+        tracker._initiate_track(detection(box))
+        tracker.tracks[-1].state = (states or {}).get(index, TrackState.Confirmed)
+    tracker.predict()
+    return tracker
+
+
+def shifted(box, dx=3, dy=2):
+    x, y, w, h = box
+    return [x + dx, y + dy, w, h]
+
+
+PERSON_A = [100, 100, 50, 120]
+PERSON_B = [400, 120, 60, 140]
+
+
+def test_isolated_pairs_match():
+    tracker = make_tracker([PERSON_A, PERSON_B])
+    detections = [detection(shifted(PERSON_B)), detection(shifted(PERSON_A))]
+    assert sorted(tracker.unambiguous_matches(detections)) == [(0, 1), (1, 0)]
+
+
+def test_no_candidates_or_detections():
+    assert make_tracker([PERSON_A]).unambiguous_matches([]) == []
+    assert make_tracker([]).unambiguous_matches([detection(PERSON_A)]) == []
+
+
+def test_overlapping_tracks_are_contended():
+    # 两人靠近：两个目标框互相重叠，各自的检测都同时与两个目标重叠
+    neighbour = [130, 100, 50, 120]
+    tracker = make_tracker([PERSON_A, neighbour, PERSON_B])
+    detections = [detection(shifted(PERSON_A)), detection(shifted(neighbour)), detection(shifted(PERSON_B))]
+    assert tracker.unambiguous_matches(detections) == [(2, 2)]
+
+
+def test_second_detection_on_track_is_contended():
+    # 同一目标上出现两个检测（例如上半身误检），目标一侧有争用
+    tracker = make_tracker([PERSON_A, PERSON_B])
+    upper_body = [105, 100, 45, 60]
+    detections = [detection(shifted(PERSON_A)), detection(upper_body), detection(shifted(PERSON_B))]
+    assert tracker.unambiguous_matches(detections) == [(1, 2)]
+
+
+def test_overlap_below_contention_threshold_is_ignored():
+    tracker = make_tracker([PERSON_A, PERSON_B], contention_iou=0.1)
+    # 与目标A略有接触的检测（IoU低于contention_iou）不构成争用
+    edge = [148, 200, 40, 100]
+    detections = [detection(shifted(PERSON_A)), detection(edge)]
+    assert tracker.unambiguous_matches(detections) == [(0, 0)]
+
+    strict = make_tracker([PERSON_A, PERSON_B], contention_iou=0.0)
+    assert strict.unambiguous_matches(detections) == []
+
+
+def test_lost_and_tentative_tracks_contend_but_never_match():
+    tracker = make_tracker([PERSON_A, [110, 105, 50, 120], PERSON_B, [700, 100, 50, 120]],
+                           states={1: TrackState.Tentative, 3: TrackState.Tentative})
+    # 目标2上一帧未匹配（已丢失），目标3为未确认目标
+    tracker.tracks[2].time_since_update = 3
+    detections = [detection(shifted(PERSON_A)), detection(shifted(PERSON_B)), detection([702, 101, 50, 120])]
+    # 目标0与未确认的目标1重叠，不能直接匹配；目标2和目标3不是候选
+    assert tracker.unambiguous_matches(detections) == []
+
+
+def test_low_iou_is_left_to_the_cascade():
+    tracker = make_tracker([PERSON_A], shortcut_min_iou=0.5)
+    # 大幅位移后IoU约0.33
+    detections = [detection([125, 100, 50, 120])]
+    assert tracker.unambiguous_matches(detections) == []
+    assert make_tracker([PERSON_A], shortcut_min_iou=0.3).unambiguous_matches(detections) == [(0, 0)]
+
+
+def test_mahalanobis_gate_is_applied():
+    tracker = make_tracker([PERSON_A])
+    # 已稳定跟踪多帧的目标，卡尔曼滤波的不确定度较小
+    track, kf = tracker.tracks[0], tracker.kf
+    for _ in range(10):
+        track.mean, track.covariance = kf.update(track.mean, track.covariance, detection(PERSON_A).to_xyah())
+        track.mean, track.covariance = kf.predict(track.mean, track.covariance)
+    # 检测框突然变高：IoU仍为0.75，但超出门限
+    taller = [100, 100, 50, 160]
+    assert tracker.unambiguous_matches([detection(taller)]) == []
+    assert tracker.unambiguous_matches([detection(shifted(PERSON_A, 1, 1))]) == [(0, 0)]
@@ -1,8 +1,8 @@
 import torch
-import torchvision.transforms as transforms
 import numpy as np
 import cv2
 import logging
+import threading
 
 from .model import Net
 
@@ -16,33 +16,54 @@ class Extractor(object):
         logger.info("Loading weights from {}... Done!".format(model_path))
         self.net.to(self.device)
         self.size = (64, 128)
-        self.norm = transforms.Compose([
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
-        ])
+        # ImageNet statistics on the 0-255 scale, applied to the whole batch at once
+        self.mean = torch.tensor([0.485, 0.456, 0.406], device=self.device).view(1, 3, 1, 1) * 255.
+        self.std = torch.tensor([0.229, 0.224, 0.225], device=self.device).view(1, 3, 1, 1) * 255.
+        # Reusable uint8 batch buffer (N x 128 x 64 x 3), grown when a frame has more crops.
+        # Per thread, since trackers spawned for several streams share this extractor.
+        self._local = threading.local()
         
 
 
-    def _preprocess(self, im_crops):
+    def _preprocess(self, im_crops, bgr=False):
         """
-        TODO:
-            1. to float with scale from 0 to 1
-            2. resize to (64, 128) as Market1501 dataset did
-            3. concatenate to a numpy array
-            3. to torch Tensor
-            4. normalize
+        1. resize the uint8 crops to (64, 128) as Market1501 dataset did,
+           straight into the reusable batch buffer
+        2. convert each resized crop to RGB if the crops are BGR
+        3. to torch Tensor and normalize the whole batch in one step
         """
-        def _resize(im, size):
-            return cv2.resize(im.astype(np.float32)/255., size)
+        count = len(im_crops)
+        buffer = getattr(self._local, 'batch', None)
+        if buffer is None or buffer.shape[0] < count:
+            capacity = max(count, 2 * buffer.shape[0] if buffer is not None else 16)
+            buffer = self._local.batch = np.empty((capacity, self.size[1], self.size[0], 3), dtype=np.uint8)
+        batch = buffer[:count]
+        for im, out in zip(im_crops, batch):
+            if im.dtype == np.uint8:
+                cv2.resize(im, self.size, dst=out)
+            else:
+                out[:] = np.clip(cv2.resize(im, self.size), 0, 255)
+            if bgr:
+                cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)
 
-        im_batch = torch.cat([self.norm(_resize(im, self.size)).unsqueeze(0) for im in im_crops], dim=0).float()
-        return im_batch
+        im_batch = torch.from_numpy(batch).to(self.device).permute(0, 3, 1, 2).float()
+        return im_batch.sub_(self.mean).div_(self.std)
 
 
-    def __call__(self, im_crops):
-        im_batch = self._preprocess(im_crops)
+    def __call__(self, im_crops, bgr=False):
+        """
+        Extract ReID features.
+
+        Parameters
+        ----------
+        im_crops : List[ndarray]
+            uint8 image crops of arbitrary size.
+        bgr : bool
+            True if the crops are in OpenCV BGR order (e.g. sliced from a
+            decoded frame); only the resized crops are colour-converted.
+        """
+        im_batch = self._preprocess(im_crops, bgr=bgr)
         with torch.no_grad():
-            im_batch = im_batch.to(self.device)
             features = self.net(im_batch)
         return features.cpu().numpy()
 
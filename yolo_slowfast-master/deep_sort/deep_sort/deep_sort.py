@@ -1,3 +1,5 @@
+import copy
+
 import numpy as np
 import torch
 
@@ -12,27 +14,58 @@ __all__ = ['DeepSort']
 
 
 class DeepSort(object):
-    def __init__(self, model_path, max_dist=0.2, min_confidence=0.3, nms_max_overlap=3.0, max_iou_distance=0.7, max_age=70, n_init=2, nn_budget=100, use_cuda=True, use_appearence=True):
+    def __init__(self, model_path, max_dist=0.2, min_confidence=0.3, nms_max_overlap=3.0, max_iou_distance=0.7, max_age=70, n_init=2, nn_budget=100, use_cuda=True, use_appearence=True,
+                 selective_reid=False, reid_refresh_interval=10):
+        """
+        With `selective_reid`, appearance features are only extracted for
+        detections that IoU cannot associate on its own (contended regions,
+        tracks returning from occlusion, new objects) and, every
+        `reid_refresh_interval` updates, for stable tracks; other detections
+        are matched by IoU and the tracks keep their cached features.
+        """
         self.min_confidence = min_confidence
         self.nms_max_overlap = nms_max_overlap
         self.use_appearence=use_appearence
+        self.selective_reid = selective_reid
+        self.reid_refresh_interval = reid_refresh_interval
         self.extractor = Extractor(model_path, use_cuda=use_cuda)
 
-        max_cosine_distance = max_dist
-        nn_budget = nn_budget
-        metric = NearestNeighborDistanceMetric("cosine", max_cosine_distance, nn_budget)
-        self.tracker = Tracker(metric, max_iou_distance=max_iou_distance, max_age=max_age, n_init=n_init)
+        self.max_dist = max_dist
+        self.nn_budget = nn_budget
+        self.max_iou_distance = max_iou_distance
+        self.max_age = max_age
+        self.n_init = n_init
+        self.reset()
+
+    def reset(self):
+        """Drop all tracks and restart track ids from 1, keeping the ReID model."""
+        max_cosine_distance = self.max_dist
+        metric = NearestNeighborDistanceMetric("cosine", max_cosine_distance, self.nn_budget)
+        self.tracker = Tracker(metric, max_iou_distance=self.max_iou_distance, max_age=self.max_age, n_init=self.n_init)
+        self.reid_stats = {'frames': 0, 'detections': 0, 'extracted': 0, 'shortcut': 0}
+
+    def spawn(self):
+        """
+        Create an independent tracker (own tracks and id counter) that shares
+        this tracker's ReID model, so several streams can be tracked at once
+        without loading the weights again.
+        """
+        tracker = copy.copy(self)
+        tracker.reset()
+        return tracker
 
     def update(self, bbox_xywh, confidences, labels, ori_img):
+        """
+        Track one frame. `ori_img` is the BGR frame as decoded by OpenCV;
+        only the detection crops are colour-converted for the ReID model.
+        """
         self.height, self.width = ori_img.shape[:2]
-        # generate detections
-        
-        if self.use_appearence:
-            features = self._get_features(bbox_xywh, ori_img)
-        else:
-            features = np.array([np.array([0.5,0.5]) for _ in range(len(bbox_xywh))])
+        # generate detections (features are filled in below); callers may pass
+        # the confidences as an (N, 1) column
+        confidences = np.asarray(confidences, dtype=np.float64).reshape(-1)
+        keep = [i for i, conf in enumerate(confidences) if conf > self.min_confidence]
         bbox_tlwh = self._xywh_to_tlwh(bbox_xywh)
-        detections = [Detection(bbox_tlwh[i], conf, labels[i], features[i]) for i,conf in enumerate(confidences) if conf>self.min_confidence]
+        detections = [Detection(bbox_tlwh[i], confidences[i], labels[i], None) for i in keep]
 
         # run on non-maximum supression
         # boxes = np.array([d.tlwh for d in detections])
@@ -40,10 +73,69 @@ class DeepSort(object):
         # indices = non_max_suppression(boxes, self.nms_max_overlap, scores)
         # detections = [detections[i] for i in indices]
 
+        self.tracker.predict()
+
+        # Pick the detections that need an appearance feature.
+        shortcut_matches = None
+        need = list(range(len(detections)))
+        if self.use_appearence and self.selective_reid:
+            shortcut_matches = self.tracker.unambiguous_matches(detections)
+            cached = set(j for k, j in shortcut_matches
+                         if self.tracker.tracks[k].time_since_feature + 1 < self.reid_refresh_interval)
+            need = [j for j in need if j not in cached]
+            self.reid_stats['shortcut'] += len(shortcut_matches)
+
+        if self.use_appearence:
+            features = self._get_features(bbox_xywh[[keep[j] for j in need]], ori_img) if need else []
+        else:
+            features = [np.array([0.5,0.5]) for _ in need]
+        for j, feature in zip(need, features):
+            detections[j].feature = feature
+        self.reid_stats['frames'] += 1
+        self.reid_stats['detections'] += len(detections)
+        self.reid_stats['extracted'] += len(need) if self.use_appearence else 0
+
         # update tracker
+        self.tracker.update(detections, shortcut_matches)
+
+        return self._collect_outputs()
+
+    def get_reid_stats(self):
+        """Counts of ReID crops extracted versus detections seen."""
+        stats = dict(self.reid_stats)
+        frames = max(1, stats['frames'])
+        stats['selective'] = bool(self.selective_reid)
+        stats['extracted_per_frame'] = round(stats['extracted'] / frames, 2)
+        stats['detections_per_frame'] = round(stats['detections'] / frames, 2)
+        return stats
+
+    def propagate(self):
+        """
+        Advance all tracks one frame with the Kalman filter only, for frames
+        on which the detector was skipped. Returns the propagated boxes in the
+        same format as `update`.
+        """
+        self.tracker.predict(coast=True)
+        return self._collect_outputs()
+
+    def skip_frame(self):
+        """
+        Age all tracks by one frame on which the detector was gated off
+        because nothing moved. Unlike `propagate`, the frame counts as an
+        observation without detections: tentative tracks are dropped and
+        lost tracks move towards `max_age` exactly as if the detector had
+        run and found nothing.
+        """
         self.tracker.predict()
-        self.tracker.update(detections)
+        self.tracker.update([])
+        return self._collect_outputs()
+
+    def has_active_tracks(self):
+        """Whether any confirmed track was matched on the last frame."""
+        return any(track.is_confirmed() and track.time_since_update <= 1
+                   for track in self.tracker.tracks)
 
+    def _collect_outputs(self):
         # output bbox identities
         outputs = []
         for track in self.tracker.tracks:
@@ -114,7 +206,7 @@ class DeepSort(object):
             im = ori_img[y1:y2,x1:x2]
             im_crops.append(im)
         if im_crops:
-            features = self.extractor(im_crops)
+            features = self.extractor(im_crops, bgr=True)
         else:
             features = np.array([])
         return features
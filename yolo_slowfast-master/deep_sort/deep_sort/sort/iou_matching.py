@@ -2,6 +2,67 @@
 from __future__ import absolute_import
 import numpy as np
 from . import linear_assignment
+from .track import stack_states
+
+
+def diou_matrix(bboxes, candidates):
+    """Computer pairwise distance intersection over union, called diou
+    (imporved on iou).
+
+    Parameters
+    ----------
+    bboxes : ndarray
+        An Nx4 matrix of bounding boxes in format `(top left x, top left y,
+        width, height)`.
+    candidates : ndarray
+        An Mx4 matrix of candidate bounding boxes in the same format.
+
+    Returns
+    -------
+    ndarray
+        The NxM matrix of diou values in [0, 1], where entry (i, j) compares
+        `bboxes[i]` with `candidates[j]`.
+    """
+    center_a = bboxes[:, np.newaxis, :2] + bboxes[:, np.newaxis, 2:] / 2
+    center_b = candidates[np.newaxis, :, :2] + candidates[np.newaxis, :, 2:] / 2
+    center_dis = np.sum((center_a - center_b) ** 2, axis=-1)
+    enclose_tl = np.minimum(bboxes[:, np.newaxis, :2], candidates[np.newaxis, :, :2])
+    enclose_br = np.maximum(bboxes[:, np.newaxis, :2] + bboxes[:, np.newaxis, 2:],
+                            candidates[np.newaxis, :, :2] + candidates[np.newaxis, :, 2:])
+    max_dis = np.sum((enclose_br - enclose_tl) ** 2, axis=-1)
+    rela_dis = center_dis / max_dis
+    return (1 + iou_matrix(bboxes, candidates) - rela_dis) / 2
+
+
+def iou_matrix(bboxes, candidates):
+    """Computer pairwise intersection over union.
+
+    Parameters
+    ----------
+    bboxes : ndarray
+        An Nx4 matrix of bounding boxes in format `(top left x, top left y,
+        width, height)`.
+    candidates : ndarray
+        An Mx4 matrix of candidate bounding boxes in the same format.
+
+    Returns
+    -------
+    ndarray
+        The NxM matrix of intersection over union values in [0, 1], where
+        entry (i, j) compares `bboxes[i]` with `candidates[j]`.
+
+    """
+    bboxes_tl = bboxes[:, np.newaxis, :2]
+    bboxes_br = bboxes_tl + bboxes[:, np.newaxis, 2:]
+    candidates_tl = candidates[np.newaxis, :, :2]
+    candidates_br = candidates_tl + candidates[np.newaxis, :, 2:]
+
+    wh = np.maximum(0., np.minimum(bboxes_br, candidates_br) -
+                    np.maximum(bboxes_tl, candidates_tl))
+    area_intersection = wh[..., 0] * wh[..., 1]
+    area_bboxes = bboxes[:, 2:].prod(axis=1)[:, np.newaxis]
+    area_candidates = candidates[:, 2:].prod(axis=1)[np.newaxis, :]
+    return area_intersection / (area_bboxes + area_candidates - area_intersection)
 
 
 def diou(box,candis):
@@ -22,16 +83,7 @@ def diou(box,candis):
         candidate. A higher score means a larger fraction of the `bbox` is
         occluded by the candidate.
     """
-    centerA=np.array([box[0]+box[2]/2,box[1]+box[3]/2])
-    centerB=np.array([candis[:,0]+candis[:,2]/2,candis[:,1]+candis[:,3]/2]).T
-    center_dis=np.sum((centerA-centerB)**2,axis=-1)
-    max_x=np.maximum(box[0]+box[2], candis[:,0]+candis[:,2])
-    min_x=np.minimum(box[0], candis[:,0])
-    max_y=np.maximum(box[1]+box[3], candis[:,1]+candis[:,3])
-    min_y=np.minimum(box[1], candis[:,1])
-    max_dis=(max_x-min_x)**2+(max_y-min_y)**2
-    rela_dis=center_dis/max_dis
-    return (1+iou(box,candis)-rela_dis)/2
+    return diou_matrix(np.asarray(box)[np.newaxis], candis)[0]
 
 # %%
 def iou(bbox, candidates):
@@ -53,20 +105,7 @@ def iou(bbox, candidates):
         occluded by the candidate.
 
     """
-    bbox_tl, bbox_br = bbox[:2], bbox[:2] + bbox[2:]
-    candidates_tl = candidates[:, :2]
-    candidates_br = candidates[:, :2] + candidates[:, 2:]
-
-    tl = np.c_[np.maximum(bbox_tl[0], candidates_tl[:, 0])[:, np.newaxis],
-               np.maximum(bbox_tl[1], candidates_tl[:, 1])[:, np.newaxis]]
-    br = np.c_[np.minimum(bbox_br[0], candidates_br[:, 0])[:, np.newaxis],
-               np.minimum(bbox_br[1], candidates_br[:, 1])[:, np.newaxis]]
-    wh = np.maximum(0., br - tl)
-
-    area_intersection = wh.prod(axis=1)
-    area_bbox = bbox[2:].prod()
-    area_candidates = candidates[:, 2:].prod(axis=1)
-    return area_intersection / (area_bbox + area_candidates - area_intersection)
+    return iou_matrix(np.asarray(bbox)[np.newaxis], candidates)[0]
 # %%
 
 def iou_cost(tracks, detections, track_indices=None,
@@ -99,13 +138,18 @@ def iou_cost(tracks, detections, track_indices=None,
     if detection_indices is None:
         detection_indices = np.arange(len(detections))
 
-    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
-    for row, track_idx in enumerate(track_indices):
-        if tracks[track_idx].time_since_update > 1:
-            cost_matrix[row, :] = linear_assignment.INFTY_COST
-            continue
+    # Tracks that were not updated in the last frame cannot be matched by IoU.
+    cost_matrix = np.full(
+        (len(track_indices), len(detection_indices)), linear_assignment.INFTY_COST)
+    recent = np.array(
+        [tracks[i].time_since_update <= 1 for i in track_indices], dtype=bool)
+    if not recent.any() or len(detection_indices) == 0:
+        return cost_matrix
 
-        bbox = tracks[track_idx].to_tlwh()
-        candidates = np.asarray([detections[i].tlwh for i in detection_indices])
-        cost_matrix[row, :] = 1. - iou(bbox, candidates)
+    mean, _ = stack_states([tracks[i] for i in np.asarray(track_indices)[recent]])
+    bboxes = mean[:, :4].copy()
+    bboxes[:, 2] *= bboxes[:, 3]
+    bboxes[:, :2] -= bboxes[:, 2:] / 2
+    candidates = np.asarray([detections[i].tlwh for i in detection_indices])
+    cost_matrix[recent] = 1. - iou_matrix(bboxes, candidates)
     return cost_matrix
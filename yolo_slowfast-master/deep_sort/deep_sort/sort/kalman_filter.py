@@ -1,6 +1,5 @@
 # vim: expandtab:ts=4:sw=4
 import numpy as np
-import scipy.linalg
 
 
 """
@@ -20,6 +19,69 @@ chi2inv95 = {
     9: 16.919}
 
 
+def _diag(std):
+    """Stack of diagonal covariance matrices from (..., n) standard deviations.
+    """
+    n = std.shape[-1]
+    out = np.zeros(std.shape + (n,))
+    idx = np.arange(n)
+    out[..., idx, idx] = np.square(std)
+    return out
+
+
+class TrackStates(object):
+    """
+    Structure-of-arrays storage for the state distributions of all tracks.
+
+    Means and covariances live in two stacked arrays so that the Kalman
+    filter can propagate and correct every track with a handful of batched
+    matrix operations. Each track owns one row (slot); freed slots are reused
+    and the arrays double in size when full.
+
+    Parameters
+    ----------
+    capacity : int
+        Initial number of slots.
+
+    Attributes
+    ----------
+    mean : ndarray
+        The (capacity, 8) array of state means.
+    covariance : ndarray
+        The (capacity, 8, 8) array of state covariances.
+
+    """
+
+    def __init__(self, capacity=32):
+        capacity = max(1, int(capacity))
+        self.mean = np.zeros((capacity, 8))
+        self.covariance = np.zeros((capacity, 8, 8))
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return self.mean.shape[0] - len(self._free)
+
+    def _grow(self):
+        capacity = self.mean.shape[0]
+        self.mean = np.concatenate([self.mean, np.zeros_like(self.mean)])
+        self.covariance = np.concatenate(
+            [self.covariance, np.zeros_like(self.covariance)])
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, mean, covariance):
+        """Store a state distribution and return its slot."""
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        self.mean[slot] = mean
+        self.covariance[slot] = covariance
+        return slot
+
+    def remove(self, slot):
+        """Release a slot for reuse."""
+        self._free.append(slot)
+
+
 class KalmanFilter(object):
     """
     A simple Kalman filter for tracking bounding boxes in image space.
@@ -35,6 +97,11 @@ class KalmanFilter(object):
     (x, y, a, h) is taken as direct observation of the state space (linear
     observation model).
 
+    `predict`, `project` and `update` accept either a single state (8
+    dimensional mean, 8x8 covariance) or a stack of N states ((N, 8) means,
+    (N, 8, 8) covariances) and process the whole stack with batched matrix
+    products.
+
     """
 
     def __init__(self):
@@ -92,10 +159,10 @@ class KalmanFilter(object):
         ----------
         mean : ndarray
             The 8 dimensional mean vector of the object state at the previous
-            time step.
+            time step, or an (N, 8) stack of them.
         covariance : ndarray
             The 8x8 dimensional covariance matrix of the object state at the
-            previous time step.
+            previous time step, or an (N, 8, 8) stack of them.
 
         Returns
         -------
@@ -104,21 +171,16 @@ class KalmanFilter(object):
             state. Unobserved velocities are initialized to 0 mean.
 
         """
-        std_pos = [
-            self._std_weight_position * mean[3],
-            self._std_weight_position * mean[3],
-            1e-2,
-            self._std_weight_position * mean[3]]
-        std_vel = [
-            self._std_weight_velocity * mean[3],
-            self._std_weight_velocity * mean[3],
-            1e-5,
-            self._std_weight_velocity * mean[3]]
-        motion_cov = np.diag(np.square(np.r_[std_pos, std_vel]))
+        height = mean[..., 3]
+        pos = self._std_weight_position * height
+        vel = self._std_weight_velocity * height
+        motion_cov = _diag(np.stack([
+            pos, pos, np.full_like(height, 1e-2), pos,
+            vel, vel, np.full_like(height, 1e-5), vel], axis=-1))
 
-        mean = np.dot(self._motion_mat, mean)
-        covariance = np.linalg.multi_dot((
-            self._motion_mat, covariance, self._motion_mat.T)) + motion_cov
+        mean = mean @ self._motion_mat.T
+        covariance = self._motion_mat @ covariance @ self._motion_mat.T \
+            + motion_cov
 
         return mean, covariance
 
@@ -128,9 +190,10 @@ class KalmanFilter(object):
         Parameters
         ----------
         mean : ndarray
-            The state's mean vector (8 dimensional array).
+            The state's mean vector (8 dimensional array), or an (N, 8) stack.
         covariance : ndarray
-            The state's covariance matrix (8x8 dimensional).
+            The state's covariance matrix (8x8 dimensional), or an (N, 8, 8)
+            stack.
 
         Returns
         -------
@@ -139,16 +202,13 @@ class KalmanFilter(object):
             estimate.
 
         """
-        std = [
-            self._std_weight_position * mean[3],
-            self._std_weight_position * mean[3],
-            1e-1,
-            self._std_weight_position * mean[3]]
-        innovation_cov = np.diag(np.square(std))
-
-        mean = np.dot(self._update_mat, mean)
-        covariance = np.linalg.multi_dot((
-            self._update_mat, covariance, self._update_mat.T))
+        height = mean[..., 3]
+        pos = self._std_weight_position * height
+        innovation_cov = _diag(np.stack([
+            pos, pos, np.full_like(height, 1e-1), pos], axis=-1))
+
+        mean = mean @ self._update_mat.T
+        covariance = self._update_mat @ covariance @ self._update_mat.T
         return mean, covariance + innovation_cov
 
     def update(self, mean, covariance, measurement):
@@ -157,13 +217,15 @@ class KalmanFilter(object):
         Parameters
         ----------
         mean : ndarray
-            The predicted state's mean vector (8 dimensional).
+            The predicted state's mean vector (8 dimensional), or an (N, 8)
+            stack.
         covariance : ndarray
-            The state's covariance matrix (8x8 dimensional).
+            The state's covariance matrix (8x8 dimensional), or an (N, 8, 8)
+            stack.
         measurement : ndarray
             The 4 dimensional measurement vector (x, y, a, h), where (x, y)
             is the center position, a the aspect ratio, and h the height of the
-            bounding box.
+            bounding box; or an (N, 4) stack, one per state.
 
         Returns
         -------
@@ -173,16 +235,14 @@ class KalmanFilter(object):
         """
         projected_mean, projected_cov = self.project(mean, covariance)
 
-        chol_factor, lower = scipy.linalg.cho_factor(
-            projected_cov, lower=True, check_finite=False)
-        kalman_gain = scipy.linalg.cho_solve(
-            (chol_factor, lower), np.dot(covariance, self._update_mat.T).T,
-            check_finite=False).T
+        # K = P H^T S^-1, solved as S K^T = H P^T (S and P are symmetric).
+        kalman_gain = np.swapaxes(np.linalg.solve(
+            projected_cov, self._update_mat @ covariance), -1, -2)
         innovation = measurement - projected_mean
 
-        new_mean = mean + np.dot(innovation, kalman_gain.T)
-        new_covariance = covariance - np.linalg.multi_dot((
-            kalman_gain, projected_cov, kalman_gain.T))
+        new_mean = mean + np.einsum('...ij,...j->...i', kalman_gain, innovation)
+        new_covariance = covariance - \
+            kalman_gain @ projected_cov @ np.swapaxes(kalman_gain, -1, -2)
         return new_mean, new_covariance
 
     def gating_distance(self, mean, covariance, measurements,
@@ -196,11 +256,13 @@ class KalmanFilter(object):
         Parameters
         ----------
         mean : ndarray
-            Mean vector over the state distribution (8 dimensional).
+            Mean vector over the state distribution (8 dimensional), or an
+            (N, 8) stack of them.
         covariance : ndarray
-            Covariance of the state distribution (8x8 dimensional).
+            Covariance of the state distribution (8x8 dimensional), or an
+            (N, 8, 8) stack of them.
         measurements : ndarray
-            An Nx4 dimensional matrix of N measurements, each in
+            An Mx4 dimensional matrix of M measurements, each in
             format (x, y, a, h) where (x, y) is the bounding box center
             position, a the aspect ratio, and h the height.
         only_position : Optional[bool]
@@ -210,20 +272,26 @@ class KalmanFilter(object):
         Returns
         -------
         ndarray
-            Returns an array of length N, where the i-th element contains the
-            squared Mahalanobis distance between (mean, covariance) and
-            `measurements[i]`.
+            For a single state, returns an array of length M, where the i-th
+            element contains the squared Mahalanobis distance between
+            (mean, covariance) and `measurements[i]`. For a stack of N states,
+            returns the NxM matrix of these distances.
 
         """
+        if mean.ndim == 1:
+            return self.gating_distance(
+                mean[np.newaxis], covariance[np.newaxis], measurements,
+                only_position)[0]
+
         mean, covariance = self.project(mean, covariance)
         if only_position:
-            mean, covariance = mean[:2], covariance[:2, :2]
+            mean, covariance = mean[:, :2], covariance[:, :2, :2]
             measurements = measurements[:, :2]
 
-        cholesky_factor = np.linalg.cholesky(covariance)
-        d = measurements - mean
-        z = scipy.linalg.solve_triangular(
-            cholesky_factor, d.T, lower=True, check_finite=False,
-            overwrite_b=True)
-        squared_maha = np.sum(z * z, axis=0)
+        # Invert the small Cholesky factors once per state, then whiten all
+        # measurement residuals with a single batched product.
+        inv_cholesky_factor = np.linalg.inv(np.linalg.cholesky(covariance))
+        d = measurements[np.newaxis, :, :] - mean[:, np.newaxis, :]
+        z = d @ np.swapaxes(inv_cholesky_factor, 1, 2)
+        squared_maha = np.sum(z * z, axis=2)
         return squared_maha
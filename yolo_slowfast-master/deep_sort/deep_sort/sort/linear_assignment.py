@@ -4,6 +4,7 @@ import numpy as np
 # from sklearn.utils.linear_assignment_ import linear_assignment
 from scipy.optimize import linear_sum_assignment as linear_assignment
 from . import kalman_filter
+from .track import stack_states
 
 
 INFTY_COST = 1e+5
@@ -59,21 +60,20 @@ def min_cost_matching(
 
     row_indices, col_indices = linear_assignment(cost_matrix)
 
-    matches, unmatched_tracks, unmatched_detections = [], [], []
-    for col, detection_idx in enumerate(detection_indices):
-        if col not in col_indices:
-            unmatched_detections.append(detection_idx)
-    for row, track_idx in enumerate(track_indices):
-        if row not in row_indices:
-            unmatched_tracks.append(track_idx)
-    for row, col in zip(row_indices, col_indices):
-        track_idx = track_indices[row]
-        detection_idx = detection_indices[col]
-        if cost_matrix[row, col] > max_distance:
-            unmatched_tracks.append(track_idx)
-            unmatched_detections.append(detection_idx)
-        else:
-            matches.append((track_idx, detection_idx))
+    # Rows/columns the solver left out come first, followed by assigned pairs
+    # whose cost exceeds the threshold (in assignment order).
+    assigned_rows = np.zeros(len(track_indices), dtype=bool)
+    assigned_rows[row_indices] = True
+    assigned_cols = np.zeros(len(detection_indices), dtype=bool)
+    assigned_cols[col_indices] = True
+    rejected = cost_matrix[row_indices, col_indices] > max_distance
+
+    unmatched_detections = [detection_indices[col] for col in np.flatnonzero(~assigned_cols)]
+    unmatched_detections += [detection_indices[col] for col in col_indices[rejected]]
+    unmatched_tracks = [track_indices[row] for row in np.flatnonzero(~assigned_rows)]
+    unmatched_tracks += [track_indices[row] for row in row_indices[rejected]]
+    matches = [(track_indices[row], detection_indices[col]) for row, col in
+               zip(row_indices[~rejected], col_indices[~rejected])]
     return matches, unmatched_tracks, unmatched_detections
 
 
@@ -180,13 +180,15 @@ def gate_cost_matrix(
         Returns the modified cost matrix.
 
     """
+    if len(track_indices) == 0 or len(detection_indices) == 0:
+        return cost_matrix
+
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
     measurements = np.asarray(
         [detections[i].to_xyah() for i in detection_indices])
-    for row, track_idx in enumerate(track_indices):
-        track = tracks[track_idx]
-        gating_distance = kf.gating_distance(
-            track.mean, track.covariance, measurements, only_position)
-        cost_matrix[row, gating_distance > gating_threshold] = gated_cost
+    mean, covariance = stack_states([tracks[i] for i in track_indices])
+    gating_distance = kf.gating_distance(
+        mean, covariance, measurements, only_position)
+    cost_matrix[gating_distance > gating_threshold] = gated_cost
     return cost_matrix
@@ -101,6 +101,12 @@ class NearestNeighborDistanceMetric(object):
     A nearest neighbor distance metric that, for each target, returns
     the closest distance to any sample that has been observed so far.
 
+    Samples are kept in a gallery: one preallocated (targets x budget x dim)
+    float32 array used as a ring buffer per target, plus a validity mask.
+    Cosine samples are normalized once when they are added, so `distance`
+    computes the nearest-neighbor distance of all targets with a single
+    matrix product and its cost does not grow with the age of the tracks.
+
     Parameters
     ----------
     metric : str
@@ -110,29 +116,83 @@ class NearestNeighborDistanceMetric(object):
         invalid match.
     budget : Optional[int]
         If not None, fix samples per class to at most this number. Removes
-        the oldest samples when the budget is reached.
+        the oldest samples when the budget is reached. If None, the gallery
+        grows as needed.
 
     Attributes
     ----------
     samples : Dict[int -> List[ndarray]]
         A dictionary that maps from target identities to the list of samples
-        that have been observed so far.
+        that have been observed so far (oldest first, normalized for the
+        cosine metric).
 
     """
 
     def __init__(self, metric, matching_threshold, budget=None):
 
 
-        if metric == "euclidean":
-            self._metric = _nn_euclidean_distance
-        elif metric == "cosine":
-            self._metric = _nn_cosine_distance
-        else:
+        if metric not in ("euclidean", "cosine"):
             raise ValueError(
                 "Invalid metric; must be either 'euclidean' or 'cosine'")
+        self._cosine = metric == "cosine"
         self.matching_threshold = matching_threshold
         self.budget = budget
-        self.samples = {}
+
+        # Gallery storage, allocated on the first `partial_fit` once the
+        # feature dimensionality is known.
+        self._gallery = None  # (target rows, samples per target, dim)
+        self._sq_norms = None  # squared sample norms (euclidean metric)
+        self._valid = None  # (target rows, samples per target) bool
+        self._next = None  # ring write position per target row
+        self._rows = {}  # target identity -> row
+        self._free_rows = []
+
+    def _allocate(self, dim, rows=32):
+        capacity = self.budget if self.budget is not None else 16
+        self._gallery = np.zeros((rows, capacity, dim), dtype=np.float32)
+        self._sq_norms = np.zeros((rows, capacity), dtype=np.float32)
+        self._valid = np.zeros((rows, capacity), dtype=bool)
+        self._next = np.zeros(rows, dtype=np.int64)
+        self._free_rows = list(range(rows - 1, -1, -1))
+
+    def _grow_rows(self):
+        rows = self._gallery.shape[0]
+        self._gallery = np.concatenate([self._gallery, np.zeros_like(self._gallery)])
+        self._sq_norms = np.concatenate([self._sq_norms, np.zeros_like(self._sq_norms)])
+        self._valid = np.concatenate([self._valid, np.zeros_like(self._valid)])
+        self._next = np.concatenate([self._next, np.zeros_like(self._next)])
+        self._free_rows.extend(range(2 * rows - 1, rows - 1, -1))
+
+    def _grow_samples(self):
+        # Only used without a budget: samples are never overwritten.
+        pad = lambda a: np.concatenate([a, np.zeros_like(a)], axis=1)
+        self._gallery = pad(self._gallery)
+        self._sq_norms = pad(self._sq_norms)
+        self._valid = pad(self._valid)
+
+    def _row(self, target):
+        row = self._rows.get(target)
+        if row is None:
+            if not self._free_rows:
+                self._grow_rows()
+            row = self._rows[target] = self._free_rows.pop()
+        return row
+
+    def _prepare(self, features):
+        features = np.asarray(features, dtype=np.float32)
+        if self._cosine:
+            features = features / np.linalg.norm(features, axis=1, keepdims=True)
+        return features
+
+    @property
+    def samples(self):
+        samples = {}
+        for target, row in self._rows.items():
+            order = np.roll(np.arange(self._valid.shape[1]), -int(self._next[row])) \
+                if self.budget is not None else np.arange(self._valid.shape[1])
+            order = order[self._valid[row, order]]
+            samples[target] = list(self._gallery[row, order])
+        return samples
 
     def partial_fit(self, features, targets, active_targets):
         """Update the distance metric with new data.
@@ -147,11 +207,29 @@ class NearestNeighborDistanceMetric(object):
             A list of targets that are currently present in the scene.
 
         """
-        for feature, target in zip(features, targets):
-            self.samples.setdefault(target, []).append(feature)
-            if self.budget is not None:
-                self.samples[target] = self.samples[target][-self.budget:]
-        self.samples = {k: self.samples[k] for k in active_targets}
+        if len(features):
+            features = self._prepare(features)
+            if self._gallery is None:
+                self._allocate(features.shape[1])
+            sq_norms = np.square(features).sum(axis=1)
+            for feature, sq_norm, target in zip(features, sq_norms, targets):
+                row = self._row(target)
+                slot = self._next[row]
+                if slot == self._gallery.shape[1]:
+                    self._grow_samples()
+                self._gallery[row, slot] = feature
+                self._sq_norms[row, slot] = sq_norm
+                self._valid[row, slot] = True
+                slot += 1
+                self._next[row] = slot % self.budget if self.budget is not None else slot
+
+        # Release the rows of targets that left the scene.
+        active_targets = set(active_targets)
+        for target in [k for k in self._rows if k not in active_targets]:
+            row = self._rows.pop(target)
+            self._valid[row] = False
+            self._next[row] = 0
+            self._free_rows.append(row)
 
     def distance(self, features, targets):
         """Compute distance between features and targets.
@@ -172,6 +250,23 @@ class NearestNeighborDistanceMetric(object):
 
         """
         cost_matrix = np.zeros((len(targets), len(features)))
-        for i, target in enumerate(targets):
-            cost_matrix[i, :] = self._metric(self.samples[target], features)
+        if len(targets) == 0 or len(features) == 0:
+            return cost_matrix
+
+        features = self._prepare(features)
+        rows = np.array([self._rows[target] for target in targets])
+
+        # One product against the gallery rows in use (a view, no copy).
+        used = rows.max() + 1
+        gallery = self._gallery[:used]
+        products = gallery.reshape(-1, gallery.shape[2]) @ features.T
+        products = products.reshape(used, gallery.shape[1], len(features))[rows]
+        if self._cosine:
+            distances = 1. - products
+        else:
+            distances = np.maximum(
+                0.0, self._sq_norms[rows][:, :, np.newaxis] - 2. * products
+                + np.square(features).sum(axis=1)[np.newaxis, np.newaxis, :])
+        distances[~self._valid[rows]] = np.inf
+        cost_matrix[:] = distances.min(axis=1)
         return cost_matrix
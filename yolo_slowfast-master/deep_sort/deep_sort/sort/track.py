@@ -1,4 +1,31 @@
 # vim: expandtab:ts=4:sw=4
+import numpy as np
+
+from .kalman_filter import TrackStates
+
+
+def stack_states(tracks):
+    """Gather the means and covariances of several tracks.
+
+    Parameters
+    ----------
+    tracks : List[Track]
+        The tracks.
+
+    Returns
+    -------
+    (ndarray, ndarray)
+        The (N, 8) means and (N, 8, 8) covariances, in the order of `tracks`.
+
+    """
+    if not tracks:
+        return np.zeros((0, 8)), np.zeros((0, 8, 8))
+    states = tracks[0].states
+    if all(track.states is states for track in tracks):
+        slots = [track.slot for track in tracks]
+        return states.mean[slots], states.covariance[slots]
+    return (np.array([track.mean for track in tracks]),
+            np.array([track.covariance for track in tracks]))
 
 
 class TrackState:
@@ -40,13 +67,18 @@ class Track:
     feature : Optional[ndarray]
         Feature vector of the detection this track originates from. If not None,
         this feature is added to the `features` cache.
+    states : Optional[kalman_filter.TrackStates]
+        Shared state storage the track's mean and covariance are kept in. If
+        None, the track gets a storage of its own.
 
     Attributes
     ----------
     mean : ndarray
-        Mean vector of the initial state distribution.
+        Mean vector of the state distribution, a view into `states`.
     covariance : ndarray
-        Covariance matrix of the initial state distribution.
+        Covariance matrix of the state distribution, a view into `states`.
+    slot : int
+        The track's row in `states`.
     track_id : int
         A unique track identifier.
     hits : int
@@ -60,13 +92,16 @@ class Track:
     features : List[ndarray]
         A cache of features. On each measurement update, the associated feature
         vector is added to this list.
+    time_since_feature : int
+        Number of measurement updates since the last one that carried an
+        appearance feature.
 
     """
 
     def __init__(self, mean, covariance, track_id, n_init, max_age,
-                 feature=None,label=None):
-        self.mean = mean
-        self.covariance = covariance
+                 feature=None,label=None, states=None):
+        self.states = states if states is not None else TrackStates(1)
+        self.slot = self.states.add(mean, covariance)
         self.track_id = track_id
         self.hits = 1
         self.age = 1
@@ -75,12 +110,29 @@ class Track:
         self.state = TrackState.Tentative
         self.features = []
         self.label=label if label is not None else -1
+        self.time_since_feature = 0
         if feature is not None:
             self.features.append(feature)
 
         self._n_init = n_init
         self._max_age = max_age
 
+    @property
+    def mean(self):
+        return self.states.mean[self.slot]
+
+    @mean.setter
+    def mean(self, value):
+        self.states.mean[self.slot] = value
+
+    @property
+    def covariance(self):
+        return self.states.covariance[self.slot]
+
+    @covariance.setter
+    def covariance(self, value):
+        self.states.covariance[self.slot] = value
+
     def to_tlwh(self):
         """Get current position in bounding box format `(top left x, top left y,
         width, height)`.
@@ -110,7 +162,7 @@ class Track:
         ret[2:] = ret[:2] + ret[2:]
         return ret
 
-    def predict(self, kf):
+    def predict(self, kf, coast=False):
         """Propagate the state distribution to the current time step using a
         Kalman filter prediction step.
 
@@ -118,11 +170,22 @@ class Track:
         ----------
         kf : kalman_filter.KalmanFilter
             The Kalman filter.
+        coast : bool
+            If True, this is a frame on which no detector was run. The state
+            is propagated but `time_since_update` is left unchanged, so the
+            track is neither counted as missed nor hidden from the output.
 
         """
         self.mean, self.covariance = kf.predict(self.mean, self.covariance)
+        self.mark_predicted(coast)
+
+    def mark_predicted(self, coast=False):
+        """Advance the track's age after its state was propagated (the
+        tracker predicts all tracks at once and then calls this per track).
+        """
         self.age += 1
-        self.time_since_update += 1
+        if not coast:
+            self.time_since_update += 1
 
     def update(self, kf, detection):
         """Perform Kalman filter measurement update step and update the feature
@@ -138,7 +201,18 @@ class Track:
         """
         self.mean, self.covariance = kf.update(
             self.mean, self.covariance, detection.to_xyah())
-        self.features.append(detection.feature)
+        self.mark_hit(detection)
+
+    def mark_hit(self, detection):
+        """Record an associated detection after the state was corrected
+        (the tracker corrects all matched tracks at once and then calls this
+        per track).
+        """
+        if detection.feature is not None:
+            self.features.append(detection.feature)
+            self.time_since_feature = 0
+        else:
+            self.time_since_feature += 1
         self.label=detection.label
         self.hits += 1
         self.time_since_update = 0
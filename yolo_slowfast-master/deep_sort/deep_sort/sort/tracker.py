@@ -4,7 +4,7 @@ import numpy as np
 from . import kalman_filter
 from . import linear_assignment
 from . import iou_matching
-from .track import Track
+from .track import Track, stack_states
 
 
 class Tracker:
@@ -21,6 +21,15 @@ class Tracker:
         Number of consecutive detections before the track is confirmed. The
         track state is set to `Deleted` if a miss occurs within the first
         `n_init` frames.
+    iou_shortcut : bool
+        If True, `update` first associates confirmed tracks and detections
+        that IoU matches without contention (see `unambiguous_matches`) and
+        only runs the appearance cascade on the rest.
+    shortcut_min_iou : float
+        Minimum IoU between a track and a detection for an IoU-only match.
+    contention_iou : float
+        A track or detection overlapping more than one counterpart by more
+        than this IoU is contended and goes through the full cascade.
 
     Attributes
     ----------
@@ -32,50 +41,82 @@ class Tracker:
         Number of frames that a track remains in initialization phase.
     kf : kalman_filter.KalmanFilter
         A Kalman filter to filter target trajectories in image space.
+    states : kalman_filter.TrackStates
+        Stacked means and covariances of all tracks, filtered in one batch.
     tracks : List[Track]
         The list of active tracks at the current time step.
 
     """
 
-    def __init__(self, metric, max_iou_distance=0.7, max_age=70, n_init=3):
+    def __init__(self, metric, max_iou_distance=0.7, max_age=70, n_init=3,
+                 iou_shortcut=False, shortcut_min_iou=0.5, contention_iou=0.1):
         self.metric = metric
         self.max_iou_distance = max_iou_distance
         self.max_age = max_age
         self.n_init = n_init
+        self.iou_shortcut = iou_shortcut
+        self.shortcut_min_iou = shortcut_min_iou
+        self.contention_iou = contention_iou
 
         self.kf = kalman_filter.KalmanFilter()
+        self.states = kalman_filter.TrackStates()
         self.tracks = []
         self._next_id = 1
 
-    def predict(self):
+    def predict(self, coast=False):
         """Propagate track state distributions one time step forward.
 
         This function should be called once every time step, before `update`.
+        On frames without detections (e.g. between detector keyframes) call it
+        with `coast=True` and skip `update`.
         """
+        if not self.tracks:
+            return
+        slots = [track.slot for track in self.tracks]
+        mean, covariance = self.kf.predict(
+            self.states.mean[slots], self.states.covariance[slots])
+        self.states.mean[slots] = mean
+        self.states.covariance[slots] = covariance
         for track in self.tracks:
-            track.predict(self.kf)
+            track.mark_predicted(coast)
 
-    def update(self, detections):
+    def update(self, detections, shortcut_matches=None):
         """Perform measurement update and track management.
 
         Parameters
         ----------
         detections : List[deep_sort.detection.Detection]
             A list of detections at the current time step.
+        shortcut_matches : Optional[List[(int, int)]]
+            Track/detection pairs to associate by IoU alone, as returned by
+            `unambiguous_matches` for the same detections. If None, they are
+            computed when `iou_shortcut` is enabled. Every detection outside
+            these pairs must carry a feature.
 
         """
         # Run matching cascade.
         matches, unmatched_tracks, unmatched_detections = \
-            self._match(detections)
+            self._match(detections, shortcut_matches)
 
         # Update track set.
+        if matches:
+            slots = [self.tracks[track_idx].slot for track_idx, _ in matches]
+            measurements = np.asarray(
+                [detections[detection_idx].to_xyah() for _, detection_idx in matches])
+            mean, covariance = self.kf.update(
+                self.states.mean[slots], self.states.covariance[slots],
+                measurements)
+            self.states.mean[slots] = mean
+            self.states.covariance[slots] = covariance
         for track_idx, detection_idx in matches:
-            self.tracks[track_idx].update(
-                self.kf, detections[detection_idx])
+            self.tracks[track_idx].mark_hit(detections[detection_idx])
         for track_idx in unmatched_tracks:
             self.tracks[track_idx].mark_missed()
         for detection_idx in unmatched_detections:
             self._initiate_track(detections[detection_idx])
+        for t in self.tracks:
+            if t.is_deleted():
+                self.states.remove(t.slot)
         self.tracks = [t for t in self.tracks if not t.is_deleted()]
 
         # Update distance metric.
@@ -90,29 +131,101 @@ class Tracker:
         self.metric.partial_fit(
             np.asarray(features), np.asarray(targets), active_targets)
 
-    def _match(self, detections):
+    def unambiguous_matches(self, detections):
+        """Find track/detection pairs that IoU alone associates.
 
-        def gated_metric(tracks, dets, track_indices, detection_indices):
-            features = np.array([dets[i].feature for i in detection_indices])
-            targets = np.array([tracks[i].track_id for i in track_indices])
-            cost_matrix = self.metric.distance(features, targets)
-            cost_matrix = linear_assignment.gate_cost_matrix(
-                self.kf, cost_matrix, tracks, dets, track_indices,
-                detection_indices)
+        A pair qualifies if the track is confirmed and was matched on the
+        previous frame, their IoU is at least `shortcut_min_iou`, the
+        detection passes the track's Mahalanobis gate, and neither of them
+        overlaps any other track or detection by more than `contention_iou`.
+        Call this after `predict`.
+
+        Parameters
+        ----------
+        detections : List[deep_sort.detection.Detection]
+            A list of detections at the current time step (features are not
+            needed).
 
-            return cost_matrix
+        Returns
+        -------
+        List[(int, int)]
+            Pairs of track and detection indices.
+
+        """
+        candidates = [i for i, t in enumerate(self.tracks)
+                      if t.is_confirmed() and t.time_since_update == 1]
+        if not candidates or not detections:
+            return []
+
+        # Contention is checked against every track, including lost and
+        # tentative ones.
+        mean, covariance = stack_states(self.tracks)
+        boxes = mean[:, :4].copy()
+        boxes[:, 2] *= boxes[:, 3]
+        boxes[:, :2] -= boxes[:, 2:] / 2
+        overlap = iou_matching.iou_matrix(
+            boxes, np.asarray([d.tlwh for d in detections]))
+        contended = overlap > self.contention_iou
+        track_overlaps = contended.sum(axis=1)
+        detection_overlaps = contended.sum(axis=0)
+
+        best = overlap[candidates].argmax(axis=1)
+        measurements = np.asarray([detections[j].to_xyah() for j in best])
+        gating_distance = self.kf.gating_distance(
+            mean[candidates], covariance[candidates], measurements)
+        gating_threshold = kalman_filter.chi2inv95[4]
+
+        pairs = []
+        for row, (track_idx, detection_idx) in enumerate(zip(candidates, best)):
+            if overlap[track_idx, detection_idx] >= self.shortcut_min_iou and \
+                    track_overlaps[track_idx] == 1 and \
+                    detection_overlaps[detection_idx] == 1 and \
+                    gating_distance[row, row] <= gating_threshold:
+                pairs.append((track_idx, int(detection_idx)))
+        return pairs
+
+    def _match(self, detections, shortcut_matches=None):
+
+        # IoU-first: pairs without contention skip the appearance cascade.
+        if shortcut_matches is None:
+            shortcut_matches = self.unambiguous_matches(detections) \
+                if self.iou_shortcut else []
+        shortcut_tracks = set(k for k, _ in shortcut_matches)
+        shortcut_detections = set(j for _, j in shortcut_matches)
+        detection_indices = [
+            j for j in range(len(detections)) if j not in shortcut_detections]
 
         # Split track set into confirmed and unconfirmed tracks.
         confirmed_tracks = [
-            i for i, t in enumerate(self.tracks) if t.is_confirmed()]
+            i for i, t in enumerate(self.tracks)
+            if t.is_confirmed() and i not in shortcut_tracks]
         unconfirmed_tracks = [
             i for i, t in enumerate(self.tracks) if not t.is_confirmed()]
 
+        # Appearance cost and Mahalanobis gating of all confirmed tracks
+        # against all detections, computed once; each cascade level takes a
+        # sub-matrix.
+        gated_cost = None
+        rows = {track_idx: row for row, track_idx in enumerate(confirmed_tracks)}
+        cols = {detection_idx: col for col, detection_idx in enumerate(detection_indices)}
+        if confirmed_tracks and detection_indices:
+            features = np.array([detections[j].feature for j in detection_indices])
+            targets = np.array([self.tracks[i].track_id for i in confirmed_tracks])
+            gated_cost = linear_assignment.gate_cost_matrix(
+                self.kf, self.metric.distance(features, targets), self.tracks,
+                detections, confirmed_tracks, detection_indices)
+
+        def gated_metric(tracks, dets, track_indices, detection_indices):
+            return gated_cost[np.ix_(
+                [rows[i] for i in track_indices],
+                [cols[j] for j in detection_indices])]
+
         # Associate confirmed tracks using appearance features.
         matches_a, unmatched_tracks_a, unmatched_detections = \
             linear_assignment.matching_cascade(
                 gated_metric, self.metric.matching_threshold, self.max_age,
-                self.tracks, detections, confirmed_tracks)
+                self.tracks, detections, confirmed_tracks, detection_indices)
+        matches_a = list(shortcut_matches) + matches_a
 
         # Associate remaining tracks together with unconfirmed tracks using IOU.
         iou_track_candidates = unconfirmed_tracks + [
@@ -134,5 +247,5 @@ class Tracker:
         mean, covariance = self.kf.initiate(detection.to_xyah())
         self.tracks.append(Track(
             mean, covariance, self._next_id, self.n_init, self.max_age,
-            detection.feature,detection.label))
+            detection.feature,detection.label, states=self.states))
         self._next_id += 1
@@ -22,9 +22,141 @@ from pytorchvideo.models.hub import slowfast_r50_detection
 from deep_sort.deep_sort import DeepSort
 
 
+class ClipOverwrittenError(RuntimeError):
+    """clip视图所在的bank在使用前或使用中被重新写入"""
+
+
+class ClipRingBuffer:
+    """
+    预分配的uint8环形clip缓冲区
+
+    形状为 banks×T×H×W×3，首帧到达时按分辨率分配一次，之后逐帧原地写入。
+    取clip时整段做一次原地BGR→RGB转换，并返回 (C, T, H, W) 的零拷贝张量视图。
+
+    视图的生命周期：取出后缓冲区切换到下一个bank继续写入，该视图所在的bank在之后
+    再追加 (banks-1)×clip_len 帧时被重新写入，视图内容随之失效（不会报错，读到的是新帧）。
+    因此调用方必须在追加这么多帧之前用完视图，或按读入到使用之间最多相隔的帧数用
+    banks_for() 确定bank数，或用 pop_clip(copy=True) 取独立副本。
+    每个bank带有写入代次，调试模式（未使用 python -O）下 check_clip() 据此检查视图
+    是否已失效，失效时抛出 ClipOverwrittenError。
+    """
+
+    def __init__(self, clip_len=25, banks=2):
+        self.clip_len = clip_len
+        self.banks = max(1, banks)
+        self._buffer = None
+        self._generations = None
+        self._bank = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    @staticmethod
+    def banks_for(frames_ahead, clip_len):
+        """
+        计算clip视图在取出后再读入 frames_ahead 帧时仍然有效所需的bank数
+
+        Args:
+            frames_ahead: 取出clip到使用完之间最多再追加的帧数
+            clip_len: clip长度
+
+        Returns:
+            int: bank数
+        """
+        return max(0, int(frames_ahead)) // clip_len + 2
+
+    def _ensure_buffer(self, shape):
+        if self._buffer is None or self._buffer.shape[2:] != shape:
+            # 分辨率变化时丢弃未完成的clip并重新分配（已取出的视图仍引用旧缓冲区，保持有效）
+            self._buffer = np.empty((self.banks, self.clip_len) + shape, dtype=np.uint8)
+            self._generations = [0] * self.banks
+            self._bank = 0
+            self._count = 0
+
+    def _next_slot(self):
+        if self._count >= self.clip_len:
+            # 上一个clip未被取走，丢弃它重新开始累积
+            self._count = 0
+        if self._count == 0:
+            # 开始重新写入该bank，之前从它取出的视图失效
+            self._generations[self._bank] += 1
+        return self._buffer[self._bank, self._count]
+
+    def append(self, img):
+        self._ensure_buffer(img.shape)
+        np.copyto(self._next_slot(), img)
+        self._count += 1
+
+    def append_blank(self):
+        """写入一帧黑色占位图像（尚未收到有效帧时忽略）"""
+        if self._buffer is None:
+            return
+        self._next_slot().fill(0)
+        self._count += 1
+
+    def pop_clip(self, copy=False):
+        """
+        取出当前累积的clip并切换到下一个bank
+
+        返回的零拷贝视图在之后再追加 (banks-1)×clip_len 帧后失效，见类说明。
+
+        Args:
+            copy: 是否返回独立副本（clip需要跨线程长时间持有时使用）
+
+        Returns:
+            torch.Tensor: (C, T, H, W) 的uint8 RGB张量
+        """
+        frames = self._buffer[self._bank, :self._count]
+        flat = frames.reshape(-1, frames.shape[2], 3)
+        cv2.cvtColor(flat, cv2.COLOR_BGR2RGB, dst=flat)
+        clip = torch.from_numpy(frames).permute(3, 0, 1, 2)
+        if copy:
+            clip = clip.clone()
+        else:
+            # 记录视图所在的bank及其写入代次，供 check_clip 检查
+            clip._ring_lease = (self._generations, self._bank, self._generations[self._bank])
+
+        self._bank = (self._bank + 1) % self.banks
+        self._count = 0
+        return clip
+
+    @staticmethod
+    def clip_valid(clip):
+        """clip是否仍然有效（副本和非本缓冲区的张量始终有效）"""
+        lease = getattr(clip, '_ring_lease', None)
+        if lease is None:
+            return True
+        generations, bank, generation = lease
+        return generations[bank] == generation
+
+    @staticmethod
+    def check_clip(clip):
+        """
+        调试模式下检查clip视图是否已被覆盖
+
+        Raises:
+            ClipOverwrittenError: 视图所在的bank已被重新写入
+        """
+        if __debug__ and not ClipRingBuffer.clip_valid(clip):
+            raise ClipOverwrittenError("clip视图所在的bank已被重新写入，"
+                                       "请增加clip_banks（见 ClipRingBuffer.banks_for）或使用 copy=True")
+
+    def discard(self):
+        """丢弃当前累积的clip（不做颜色转换），从头开始累积下一个"""
+        self._count = 0
+
+
 class MyVideoCapture:
 
-    def __init__(self, source):
+    def __init__(self, source, clip_len=25, clip_banks=2):
+        """
+        Args:
+            source: 摄像头编号或视频文件路径
+            clip_len: clip长度（帧）
+            clip_banks: 环形缓冲区的bank数，get_video_clip() 返回的视图在之后再读入
+                        (clip_banks-1)×clip_len 帧后失效，见 ClipRingBuffer
+        """
         # 区分摄像头和视频文件
         if isinstance(source, int):
             # 添加CAP_DSHOW后端以解决Windows摄像头访问问题
@@ -46,7 +178,7 @@ class MyVideoCapture:
         print(f"视频源分辨率: {actual_width}x{actual_height}")
         self.idx = -1
         self.end = False
-        self.stack = []
+        self.stack = ClipRingBuffer(clip_len, clip_banks)
 
     def read(self):
         self.idx += 1
@@ -57,7 +189,7 @@ class MyVideoCapture:
             return ret, None
         if img is None or img.size == 0:
             print(f"警告: 读取到空图像 {self.idx}")
-            self.stack.append(np.zeros((480, 640, 3), dtype=np.uint8))  # 返回黑色占位图像
+            self.stack.append_blank()  # 返回黑色占位图像
             return ret, img
         # 显示原始摄像头帧用于调试 (仅在GUI模式下)
         if ENABLE_GUI:
@@ -74,13 +206,26 @@ class MyVideoCapture:
         img = torch.from_numpy(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
         return img.unsqueeze(0)
 
-    def get_video_clip(self):
+    def clip_ready(self):
+        return len(self.stack) == self.stack.clip_len
+
+    def get_video_clip(self, copy=False):
+        """
+        取出当前clip
+
+        Args:
+            copy: 是否返回独立副本；默认返回环形缓冲区的零拷贝视图，
+                  在之后再读入 (clip_banks-1)×clip_len 帧后失效
+
+        Returns:
+            torch.Tensor: (C, T, H, W) 的uint8 RGB张量
+        """
         assert len(self.stack) > 0, "clip length must large than 0 !"
-        self.stack = [self.to_tensor(img) for img in self.stack]
-        clip = torch.cat(self.stack).permute(-1, 0, 1, 2)
-        del self.stack
-        self.stack = []
-        return clip
+        return self.stack.pop_clip(copy=copy)
+
+    def skip_video_clip(self):
+        """本clip没有需要识别的目标时丢弃它，不构建clip张量"""
+        self.stack.discard()
 
     def release(self):
         """释放摄像头资源，确保完全关闭"""
@@ -106,6 +251,149 @@ class MyVideoCapture:
             self.end = True
 
 
+class LatestFrameCapture(MyVideoCapture):
+    """
+    后台采集线程版本的视频捕获
+
+    采集线程持续读取视频源并写入clip环形缓冲，只保留最新一帧；处理循环每次 read()
+    拿到的都是最新帧，处理不过来的旧帧直接丢弃，画面不会越来越落后于实时。
+    视频文件按原始帧率读取以模拟实时源。
+    """
+
+    def __init__(self, source, clip_len=25, clip_banks=3):
+        super().__init__(source, clip_len, clip_banks)
+        if isinstance(source, int):
+            # 摄像头只保留最少的驱动缓冲
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self._frame_interval = 0.0
+        else:
+            fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self._frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self._cond = threading.Condition()
+        self._stopped = threading.Event()
+        self._latest = None
+        self._latest_at = 0.0
+        self._ready_clip = None
+
+        # 统计
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+        self.frame_captured_at = None
+        self._latency_count = 0
+        self._latency_total = 0.0
+        self._latency_recent = 0.0
+        self._latency_max = 0.0
+
+        self._thread = threading.Thread(target=self._capture_loop, name='latest-frame-capture', daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self):
+        next_time = time.perf_counter()
+        while not self._stopped.is_set():
+            cap = self.cap
+            if cap is None:
+                break
+            ret, img = cap.read()
+            captured_at = time.perf_counter()
+            if not ret:
+                print("警告: 采集线程无法读取视频帧，视频源已结束或断开连接")
+                with self._cond:
+                    self.end = True
+                    self._cond.notify_all()
+                break
+
+            with self._cond:
+                if img is None or img.size == 0:
+                    self.stack.append_blank()
+                    continue
+                self.stack.append(img)
+                if len(self.stack) == self.stack.clip_len:
+                    # clip满了立即取出，保证SlowFast拿到的是最近的连续帧
+                    self._ready_clip = self.stack.pop_clip()
+                if self._latest is not None:
+                    self.dropped += 1
+                self._latest = img
+                self._latest_at = captured_at
+                self.captured += 1
+                self._cond.notify_all()
+
+            if self._frame_interval:
+                next_time += self._frame_interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    self._stopped.wait(delay)
+                else:
+                    next_time = time.perf_counter()
+
+    def read(self, timeout=1.0):
+        """
+        取最新一帧（没有新帧时最多等待timeout秒）
+
+        Returns:
+            (bool, ndarray): 是否取到新帧及图像
+        """
+        with self._cond:
+            if self._latest is None and not self.end:
+                self._cond.wait(timeout)
+            img = self._latest
+            if img is None:
+                return False, None
+            self._latest = None
+            self.idx += 1
+            self.processed += 1
+            self.frame_captured_at = self._latest_at
+        return True, img
+
+    def clip_ready(self):
+        with self._cond:
+            return self._ready_clip is not None
+
+    def get_video_clip(self, copy=False):
+        with self._cond:
+            clip = self._ready_clip
+            self._ready_clip = None
+        assert clip is not None, "clip is not ready !"
+        return clip.clone() if copy else clip
+
+    def skip_video_clip(self):
+        with self._cond:
+            self._ready_clip = None
+
+    def record_output(self):
+        """当前帧已输出（编码发送完毕），记录从采集到输出的延迟"""
+        if self.frame_captured_at is None:
+            return
+        latency = time.perf_counter() - self.frame_captured_at
+        self._latency_count += 1
+        self._latency_total += latency
+        self._latency_max = max(self._latency_max, latency)
+        self._latency_recent = latency if self._latency_count == 1 else 0.9 * self._latency_recent + 0.1 * latency
+
+    def get_stats(self):
+        """采集、处理、丢弃帧数及采集到输出的延迟（毫秒）"""
+        count = self._latency_count
+        return {
+            'captured_frames': self.captured,
+            'processed_frames': self.processed,
+            'dropped_frames': self.dropped,
+            'drop_rate': round(self.dropped / self.captured, 3) if self.captured else 0.0,
+            'avg_latency_ms': round(self._latency_total / count * 1000, 1) if count else 0.0,
+            'recent_latency_ms': round(self._latency_recent * 1000, 1),
+            'max_latency_ms': round(self._latency_max * 1000, 1)
+        }
+
+    def release(self):
+        """先停止采集线程再释放视频源"""
+        self._stopped.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        with self._cond:
+            self._cond.notify_all()
+        super().release()
+
+
 def tensor_to_numpy(tensor):
     img = tensor.cpu().numpy().transpose((1, 2, 0))
     return img
@@ -120,10 +408,14 @@ def ava_inference_transform(
         data_std=[0.225, 0.225, 0.225],
         slow_fast_alpha=4,  # if using slowfast_r50_detection, change this to 4, None for slow
 ):
+    # clip可能是环形缓冲区的视图，读取前后各检查一次是否已被覆盖
+    ClipRingBuffer.check_clip(clip)
+    source_clip = clip
     boxes = np.array(boxes)
     roi_boxes = boxes.copy()
     clip = uniform_temporal_subsample(clip, num_frames)
     clip = clip.float()
+    ClipRingBuffer.check_clip(source_clip)
     clip = clip / 255.0
     height, width = clip.shape[2], clip.shape[3]
     boxes = clip_boxes_to_image(boxes, height, width)
@@ -154,7 +446,8 @@ def plot_one_box(x, img, color=[100, 100, 100], text_info="None",
 
 
 def deepsort_update(Tracker, pred, xywh, np_img):
-    outputs = Tracker.update(xywh, pred[:, 4:5], pred[:, 5].tolist(), cv2.cvtColor(np_img, cv2.COLOR_BGR2RGB))
+    # ReID只对检测框裁剪图做颜色转换，不再转换整帧
+    outputs = Tracker.update(xywh, pred[:, 4:5], pred[:, 5].tolist(), np_img)
     # 修正后的跟踪信息打印
     print(f"\n跟踪结果 - 目标数: {len(outputs)}")
     for i, output in enumerate(outputs):